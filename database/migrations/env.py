@@ -1,3 +1,4 @@
+import os
 from logging.config import fileConfig
 
 from alembic import context
@@ -13,9 +14,20 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+# (skipped when run programmatically by a caller with its own logging)
+if config.config_file_name is not None and config.attributes.get(
+    "configure_logger", True
+):
     fileConfig(config.config_file_name)
 
+# `-x database_url=...` (e.g. a per-location database, see seed_db.py), then
+# DATABASE_URL (docker-compose.yml), take precedence over alembic.ini
+database_url = context.get_x_argument(as_dictionary=True).get(
+    "database_url", os.environ.get("DATABASE_URL")
+)
+if database_url:
+    config.set_main_option("sqlalchemy.url", database_url)
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -0,0 +1,47 @@
+"""keyset pagination indexes
+
+Revision ID: 8c1f0e2a7d34
+Revises: 357a74ba46e5
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c1f0e2a7d34"
+down_revision: Union[str, None] = "357a74ba46e5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("idx_order_created_id", "order", ["created", "id"], unique=False)
+    op.create_index(
+        "idx_order_menu_created_id",
+        "order",
+        ["menu_id", "created", "id"],
+        unique=False,
+    )
+    # the single-column stock indexes are prefixes of these, so they're replaced
+    op.drop_index("idx_stock_delivery_date", table_name="stock")
+    op.drop_index("idx_stock_ingredient", table_name="stock")
+    op.create_index(
+        "idx_stock_delivery_date_id", "stock", ["delivery_date", "id"], unique=False
+    )
+    op.create_index(
+        "idx_stock_ingredient_delivery_date",
+        "stock",
+        ["ingredient_id", "delivery_date", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_stock_ingredient_delivery_date", table_name="stock")
+    op.drop_index("idx_stock_delivery_date_id", table_name="stock")
+    op.create_index("idx_stock_ingredient", "stock", ["ingredient_id"], unique=False)
+    op.create_index("idx_stock_delivery_date", "stock", ["delivery_date"], unique=False)
+    op.drop_index("idx_order_menu_created_id", table_name="order")
+    op.drop_index("idx_order_created_id", table_name="order")
@@ -0,0 +1,29 @@
+"""stock version
+
+Revision ID: b4e7d2c91a05
+Revises: 8c1f0e2a7d34
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b4e7d2c91a05"
+down_revision: Union[str, None] = "8c1f0e2a7d34"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "stock",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("stock") as batch_op:
+        batch_op.drop_column("version")
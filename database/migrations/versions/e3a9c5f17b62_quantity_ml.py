@@ -0,0 +1,47 @@
+"""quantity in millilitres
+
+Revision ID: e3a9c5f17b62
+Revises: b4e7d2c91a05
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e3a9c5f17b62"
+down_revision: Union[str, None] = "b4e7d2c91a05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# millilitres in one of each unit (as stored by the Enum column)
+_MILLILITRES = "CASE unit WHEN 'liter' THEN 1000 WHEN 'deciliter' THEN 100 \
+WHEN 'centiliter' THEN 10 WHEN 'milliliter' THEN 1 END"
+
+
+def upgrade() -> None:
+    for table in ("stock", "recipe_ingredients"):
+        op.add_column(
+            table,
+            sa.Column("quantity_ml", sa.Float(), nullable=False, server_default="0"),
+        )
+        op.execute(f"UPDATE {table} SET quantity_ml = quantity * {_MILLILITRES}")
+        # the default only fills existing rows; new ones get theirs from the
+        # model (StockModel / RecipeIngredientModel), as the column declares
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column("quantity_ml", server_default=None)
+    op.create_index(
+        "idx_stock_ingredient_quantity_ml",
+        "stock",
+        ["ingredient_id", "quantity_ml"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_stock_ingredient_quantity_ml", table_name="stock")
+    for table in ("recipe_ingredients", "stock"):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("quantity_ml")
@@ -0,0 +1,92 @@
+"""stock archive and live-lot indexes
+
+Revision ID: f2c8a4d6e913
+Revises: e3a9c5f17b62
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f2c8a4d6e913"
+down_revision: Union[str, None] = "e3a9c5f17b62"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_LIVE = sa.text("quantity_ml > 0")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_archive",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("ingredient_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "unit",
+            sa.Enum(
+                "liter",
+                "deciliter",
+                "centiliter",
+                "milliliter",
+                name="unitofmeasure",
+            ),
+            nullable=False,
+        ),
+        sa.Column("quantity", sa.Float(), nullable=False),
+        sa.Column("quantity_ml", sa.Float(), nullable=False),
+        sa.Column("cost", sa.Float(), nullable=False),
+        sa.Column("delivery_date", sa.DateTime(), nullable=True),
+        sa.Column("created_on", sa.DateTime(), nullable=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("archived_on", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["ingredient_id"],
+            ["ingredients.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "idx_stock_archive_ingredient_delivery_date",
+        "stock_archive",
+        ["ingredient_id", "delivery_date"],
+        unique=False,
+    )
+    op.create_index(
+        "idx_stock_live_ingredient_delivery_date",
+        "stock",
+        ["ingredient_id", "delivery_date", "id"],
+        unique=False,
+        sqlite_where=_LIVE,
+    )
+    op.drop_index("idx_stock_ingredient_quantity_ml", table_name="stock")
+    op.create_index(
+        "idx_stock_ingredient_quantity_ml",
+        "stock",
+        ["ingredient_id", "quantity_ml"],
+        unique=False,
+        sqlite_where=_LIVE,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_stock_ingredient_quantity_ml", table_name="stock")
+    op.create_index(
+        "idx_stock_ingredient_quantity_ml",
+        "stock",
+        ["ingredient_id", "quantity_ml"],
+        unique=False,
+    )
+    op.drop_index("idx_stock_live_ingredient_delivery_date", table_name="stock")
+    # archived lots go back into stock rather than being dropped
+    columns = (
+        "id, ingredient_id, unit, quantity, quantity_ml, cost, delivery_date, "
+        "created_on, version"
+    )
+    op.execute(f"INSERT INTO stock ({columns}) SELECT {columns} FROM stock_archive")
+    op.drop_index(
+        "idx_stock_archive_ingredient_delivery_date", table_name="stock_archive"
+    )
+    op.drop_table("stock_archive")
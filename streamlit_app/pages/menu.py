@@ -5,10 +5,12 @@ import streamlit as st
 
 def fetch_menu_items():
     """
-    GET menu items
+    GET menu items (with available portions)
     """
     try:
-        response = requests.get("http://fastapi:8000/menu/")
+        response = requests.get(
+            "http://fastapi:8000/menu/availability", params={"on_menu": True}
+        )
         response.raise_for_status()
         data = response.json()
         return data.get("items", [])
@@ -75,7 +77,12 @@ def display_menu():
 
             with cols[1]:
                 button_key = f"order_{row['id']}"
-                if st.button("Order", key=button_key):
+                sold_out = row.get("available_portions", 0) < 1
+                if st.button(
+                    "Sold out" if sold_out else "Order",
+                    key=button_key,
+                    disabled=sold_out,
+                ):
                     # Place the order and get the response
                     st.session_state.order_status = place_order(row["id"])
                     st.session_state.current_order = row["name"]
@@ -18,6 +18,8 @@ def display_order_report():
             st.write("No data.")
         else:
             st.table(df)
+            if data.get("next_cursor"):
+                st.caption(f"Showing the {len(df)} most recent orders.")
 
     except requests.exceptions.RequestException as e:
         st.write("Failed to connect to FastAPI:", e)
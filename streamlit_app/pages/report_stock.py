@@ -21,6 +21,8 @@ def display_stock_items():
             st.write("No stock data available.")
         else:
             st.table(df_stock)
+            if data.get("next_cursor"):
+                st.caption(f"Showing the {len(df_stock)} oldest deliveries.")
 
     except requests.exceptions.RequestException as e:
         st.write("Failed to connect to FastAPI:", e)
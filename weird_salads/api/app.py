@@ -1,11 +1,42 @@
-from fastapi import FastAPI, HTTPException
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Annotated, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
 from starlette import status
+from starlette.concurrency import run_in_threadpool
 
+from weird_salads.api.conditional import (
+    AvailabilityCacheHeaders,
+    MenuCacheHeaders,
+    StockCacheHeaders,
+)
+from weird_salads.api.export import (
+    ORDER_EXPORT_FIELDS,
+    STOCK_EXPORT_FIELDS,
+    export_chunks,
+    export_response,
+)
+from weird_salads.api.locations import LocationMiddleware
+from weird_salads.api.metrics import (
+    CONTENT_TYPE,
+    MetricsMiddleware,
+    QueryStatsMiddleware,
+    request_metrics,
+)
+from weird_salads.api.responses import json_response
 from weird_salads.api.schemas import (
+    CompactStockSchema,
+    CreateOrderBatchSchema,
     CreateOrderSchema,
     CreateStockSchema,
+    ExportFormat,
+    GetMenuAvailabilitySchema,
     GetMenuItemAvailabilitySchema,
     GetMenuItemSchema,
+    GetOrderBatchSchema,
     GetOrderSchema,
     GetOrdersSchema,
     GetSimpleMenuSchema,
@@ -21,25 +52,82 @@ from weird_salads.inventory.inventory_service.exceptions import (
 )
 from weird_salads.inventory.inventory_service.inventory_service import MenuService
 from weird_salads.inventory.repository.inventory_repository import MenuRepository
+from weird_salads.inventory.repository.menu_tree_cache import menu_tree_cache
+from weird_salads.orders.orders_service.inventory_client import (
+    HTTPInventoryClient,
+    LocalInventoryClient,
+)
 from weird_salads.orders.orders_service.orders_service import OrdersService
 from weird_salads.orders.repository.orders_repository import OrdersRepository
-from weird_salads.utils.unit_of_work import UnitOfWork
+from weird_salads.utils.database.compact_db import COMPACTION_BATCH_SIZE, compact_stock
+from weird_salads.utils.engine import pool_statistics
+from weird_salads.utils.exceptions import ConcurrencyError
+from weird_salads.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    InvalidCursorError,
+)
+from weird_salads.utils.sharding import SHARDED
+from weird_salads.utils.unit_of_work import UnitOfWork, retry_statistics, run_with_retry
+from weird_salads.utils.wal_checkpoint import wal_checkpointer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # periodic WAL checkpoints (WAL_CHECKPOINT_INTERVAL), see utils/wal_checkpoint.py
+    wal_checkpointer.start()
+    yield
+    await run_in_threadpool(wal_checkpointer.stop)
+
+
+app = FastAPI(lifespan=lifespan)
+
+# e.g. http://inventory:8000; unset to place orders in-process
+INVENTORY_SERVICE_URL = os.environ.get("INVENTORY_SERVICE_URL")
 
-app = FastAPI()
+# "async" serves the read-only endpoints from api/async_routes.py
+API_MODE = os.environ.get("API_MODE", "sync")
+
+# per-route latency, status and database time, served on /metrics
+METRICS = os.environ.get("METRICS", "1") == "1"
+if METRICS:
+    app.add_middleware(MetricsMiddleware)
+
+# statement counts per request, warning on likely N+1s (QUERY_REPEAT_WARNING);
+# API_DEBUG=1 also returns them as X-DB-Queries / X-DB-Time-Ms headers
+API_DEBUG = os.environ.get("API_DEBUG", "0") == "1"
+app.add_middleware(QueryStatsMiddleware, headers=API_DEBUG)
+
+# with LOCATION_IDS, each request is served from its location's database
+# (X-Location-Id header), see utils/sharding.py; added last, so outermost
+if SHARDED:
+    app.add_middleware(LocationMiddleware)
 
 
 # Menu
 @app.get("/menu", response_model=GetSimpleMenuSchema, tags=["Menu"])
-def get_menu():
+def get_menu(cache_headers: MenuCacheHeaders):
     with UnitOfWork() as unit_of_work:
         repo = MenuRepository(unit_of_work.session)
         inventory_service = MenuService(repo)
         results = inventory_service.list_menu()
-    return {"items": [result.dict() for result in results]}
+    return json_response({"items": results}, GetSimpleMenuSchema, cache_headers)
+
+
+# registered before /menu/{item_id} so "availability" isn't parsed as an id
+@app.get("/menu/availability", response_model=GetMenuAvailabilitySchema, tags=["Menu"])
+def get_menu_availability(
+    cache_headers: AvailabilityCacheHeaders, on_menu: Optional[bool] = None
+):
+    with UnitOfWork() as unit_of_work:
+        repo = MenuRepository(unit_of_work.session)
+        inventory_service = MenuService(repo)
+        results = inventory_service.list_menu_availability(on_menu=on_menu)
+    return json_response({"items": results}, GetMenuAvailabilitySchema, cache_headers)
 
 
 @app.get("/menu/{item_id}", response_model=GetMenuItemSchema, tags=["Menu"])
-def get_order(item_id: int):
+def get_order(item_id: int, cache_headers: MenuCacheHeaders):
     try:
         with UnitOfWork() as unit_of_work:
             repo = MenuRepository(unit_of_work.session)
@@ -57,7 +145,7 @@ def get_order(item_id: int):
     response_model=GetMenuItemAvailabilitySchema,
     tags=["Menu"],
 )
-def get_availability(item_id: int):
+def get_availability(item_id: int, cache_headers: AvailabilityCacheHeaders):
     try:
         with UnitOfWork() as unit_of_work:
             repo = MenuRepository(unit_of_work.session)
@@ -71,18 +159,55 @@ def get_availability(item_id: int):
 
 
 @app.get("/inventory", response_model=GetStockSchema, tags=["Inventory"])
-def get_stock():
+def get_stock(
+    cache_headers: StockCacheHeaders,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    ingredient_id: Optional[int] = None,
+    in_stock: Optional[bool] = None,
+):
+    try:
+        with UnitOfWork() as unit_of_work:
+            repo = MenuRepository(unit_of_work.session)
+            inventory_service = MenuService(repo)
+            results, next_cursor = inventory_service.list_stock(
+                limit=limit,
+                cursor=cursor,
+                ingredient_id=ingredient_id,
+                in_stock=in_stock,
+            )
+        return json_response(
+            {"items": results, "next_cursor": next_cursor},
+            GetStockSchema,
+            cache_headers,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _export_stock(format: ExportFormat, **filters):
+    # the session lives as long as the response is being streamed
     with UnitOfWork() as unit_of_work:
-        repo = MenuRepository(unit_of_work.session)
-        inventory_service = MenuService(repo)
-        results = inventory_service.list_stock()
-    return {"items": [result.dict() for result in results]}
+        inventory_service = MenuService(MenuRepository(unit_of_work.session))
+        yield from export_chunks(
+            inventory_service.export_stock(**filters), format, STOCK_EXPORT_FIELDS
+        )
+
+
+@app.get("/inventory/export", tags=["Inventory"])
+def export_stock(
+    format: ExportFormat = ExportFormat.ndjson,
+    ingredient_id: Optional[int] = None,
+    in_stock: Optional[bool] = None,
+):
+    chunks = _export_stock(format, ingredient_id=ingredient_id, in_stock=in_stock)
+    return export_response(chunks, format, "stock")
 
 
 @app.get(
     "/inventory/stock/{stock_id}", response_model=GetStockItemSchema, tags=["Inventory"]
 )
-def get_stock_item(stock_id: str):
+def get_stock_item(stock_id: str, cache_headers: StockCacheHeaders):
     try:
         with UnitOfWork() as unit_of_work:
             repo = MenuRepository(unit_of_work.session)
@@ -100,13 +225,15 @@ def get_stock_item(stock_id: str):
     response_model=GetStockSchema,
     tags=["Inventory"],
 )
-def get_ingredient(ingredient_id: int):
+def get_ingredient(ingredient_id: int, cache_headers: StockCacheHeaders):
     try:
         with UnitOfWork() as unit_of_work:
             repo = MenuRepository(unit_of_work.session)
             inventory_service = MenuService(repo)
             ingredient = inventory_service.get_ingredient(ingredient_id=ingredient_id)
-        return {"items": [record.dict() for record in ingredient]}
+        return json_response(
+            {"items": ingredient, "next_cursor": None}, GetStockSchema, cache_headers
+        )
     except IngredientNotFoundError:
         raise HTTPException(
             status_code=404, detail=f"Ingredient Item with ID {ingredient_id} not found"
@@ -141,7 +268,11 @@ def create_stock(payload: CreateStockSchema):
 
 
 # Approach:
-# -  HTTP Requests Between Services
+# - OrdersService talks to the inventory through an InventoryClient.
+#   By default this is in-process (LocalInventoryClient), sharing the
+#   UnitOfWork so the order and all stock deductions are one transaction.
+#   Setting INVENTORY_SERVICE_URL switches to HTTP requests between services
+#   (HTTPInventoryClient), for split deployments.
 #
 # Other Options:
 # - Mediator Pattern:
@@ -157,42 +288,114 @@ def create_stock(payload: CreateStockSchema):
 def update_stock(payload: UpdateStockSchema):
     # UpdateStockSchema enforces quantity < 0 (only allows for deductions)
 
-    try:
-        with UnitOfWork() as unit_of_work:
-            ingredient_id = payload.ingredient_id
-            quantity_to_deduct = abs(payload.quantity)
-            unit = payload.unit  # Enum value, no need to convert
-            inventory_repo = MenuRepository(unit_of_work.session)
-            inventory_service = MenuService(inventory_repo)
-
-            # Update stock quantity
-            total_deducted = inventory_service.deduct_stock(
-                ingredient_id, quantity_to_deduct, unit
-            )
+    def deduct(unit_of_work):
+        ingredient_id = payload.ingredient_id
+        quantity_to_deduct = abs(payload.quantity)
+        unit = payload.unit  # Enum value, no need to convert
+        inventory_repo = MenuRepository(unit_of_work.session)
+        inventory_service = MenuService(inventory_repo)
+
+        # Update stock quantity
+        total_deducted = inventory_service.deduct_stock(
+            ingredient_id, quantity_to_deduct, unit
+        )
+
+        unit_of_work.commit()
+        return total_deducted
 
-            unit_of_work.commit()
+    try:
+        total_deducted = run_with_retry(deduct)
         return {"status": "success", "total_deducted": total_deducted}
     except InsufficientStockError as e:
         raise HTTPException(status_code=500, detail=str(e))
+    except ConcurrencyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception:
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
 
+@app.post("/inventory/compact", response_model=CompactStockSchema, tags=["Inventory"])
+def compact_inventory(
+    batch_size: Annotated[int, Query(ge=1, le=10_000)] = COMPACTION_BATCH_SIZE,
+):
+    # moves depleted lots to stock_archive, one transaction per batch
+    return compact_stock(batch_size)
+
+
 # Orders
+def _inventory_client(unit_of_work):
+    """
+    HTTP if INVENTORY_SERVICE_URL is set, otherwise in-process (same transaction)
+    """
+    if INVENTORY_SERVICE_URL:
+        return HTTPInventoryClient(INVENTORY_SERVICE_URL)
+    inventory_repo = MenuRepository(unit_of_work.session)
+    return LocalInventoryClient(MenuService(inventory_repo))
+
+
+def _order_attempts():
+    """
+    How often an order may be retried (see run_with_retry). Remote deductions
+    are committed by the inventory service, so retrying would repeat them.
+    """
+    return 1 if INVENTORY_SERVICE_URL else None
+
+
 @app.get(
     "/order",
     response_model=GetOrdersSchema,
     tags=["Order"],
 )
-def get_orders():
+def get_orders(
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    menu_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+):
+    try:
+        with UnitOfWork() as unit_of_work:
+            repo = OrdersRepository(unit_of_work.session)
+            orders_service = OrdersService(repo)
+            results, next_cursor = orders_service.list_orders(
+                limit=limit,
+                cursor=cursor,
+                menu_id=menu_id,
+                created_after=created_after,
+                created_before=created_before,
+            )
+        return json_response(
+            {"orders": results, "next_cursor": next_cursor}, GetOrdersSchema
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _export_orders(format: ExportFormat, **filters):
+    # the session lives as long as the response is being streamed
     with UnitOfWork() as unit_of_work:
-        repo = OrdersRepository(unit_of_work.session)
-        orders_service = OrdersService(repo)
-        results = orders_service.list_orders()
-    return {"orders": [result.dict() for result in results]}
+        orders_service = OrdersService(OrdersRepository(unit_of_work.session))
+        yield from export_chunks(
+            orders_service.export_orders(**filters), format, ORDER_EXPORT_FIELDS
+        )
+
+
+@app.get("/order/export", tags=["Order"])
+def export_orders(
+    format: ExportFormat = ExportFormat.ndjson,
+    menu_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+):
+    chunks = _export_orders(
+        format,
+        menu_id=menu_id,
+        created_after=created_after,
+        created_before=created_before,
+    )
+    return export_response(chunks, format, "orders")
 
 
-# Not sure if this is the best way or if we should be hitting endpoints.
 @app.post(
     "/order",
     status_code=status.HTTP_201_CREATED,
@@ -200,21 +403,117 @@ def get_orders():
     tags=["Order"],
 )
 def create_order(payload: CreateOrderSchema):
+    def place(unit_of_work):
+        orders_repo = OrdersRepository(unit_of_work.session)
+        orders_service = OrdersService(orders_repo, _inventory_client(unit_of_work))
+
+        order_data = payload.model_dump()
+        order = orders_service.place_order(order_data)
+
+        unit_of_work.commit()  # Commit the order and stock deduction
+
+        return order.dict()
+
     try:
-        with UnitOfWork() as unit_of_work:
-            orders_repo = OrdersRepository(unit_of_work.session)
-            orders_service = OrdersService(orders_repo)
+        # availability is re-checked on every attempt
+        return run_with_retry(place, attempts=_order_attempts())
+    except MenuItemNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"Menu Item with ID {payload.menu_id} not found"
+        )
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except ConcurrencyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"An unexpected error occurred: {e}"
+        )
+
+
+@app.post(
+    "/order/batch",
+    status_code=status.HTTP_201_CREATED,
+    response_model=GetOrderBatchSchema,
+    tags=["Order"],
+)
+def create_order_batch(payload: CreateOrderBatchSchema):
+    def place(unit_of_work):
+        orders_repo = OrdersRepository(unit_of_work.session)
+        orders_service = OrdersService(orders_repo, _inventory_client(unit_of_work))
 
-            order_data = payload.model_dump()
-            order = orders_service.place_order(order_data)
+        batch = payload.model_dump()
+        outcomes = orders_service.place_orders(batch["items"], partial=batch["partial"])
 
-            unit_of_work.commit()  # Commit the order and stock deduction
+        unit_of_work.commit()  # Commit every order and stock deduction
 
-            return_payload = order.dict()
-        return return_payload
+        for outcome in outcomes:
+            outcome["orders"] = [order.dict() for order in outcome["orders"]]
+        return outcomes
+
+    try:
+        lines = run_with_retry(place, attempts=_order_attempts())
     except InsufficientStockError as e:
         raise HTTPException(status_code=500, detail=str(e))
+    except ConcurrencyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"An unexpected error occurred: {e}"
         )
+    if not any(line["placed"] for line in lines):
+        # nothing was placed: the lines say why
+        raise HTTPException(
+            status_code=409, detail=jsonable_encoder(GetOrderBatchSchema(lines=lines))
+        )
+    return {"lines": lines}
+
+
+# Status
+@app.get("/status/database", tags=["Status"])
+def get_database_status():
+    return {
+        "pools": pool_statistics(),
+        "retries": retry_statistics(),
+        "menu_tree_cache": menu_tree_cache.statistics(),
+        "wal_checkpoints": wal_checkpointer.statistics(),
+    }
+
+
+@app.get("/metrics", tags=["Status"], include_in_schema=False)
+def get_metrics():
+    # Prometheus text format (see api/metrics.py)
+    return Response(request_metrics.render(), media_type=CONTENT_TYPE)
+
+
+def _use_async_routes(app: FastAPI) -> None:
+    """
+    Replace the sync GET routes with their `async def` versions
+    """
+    from fastapi.routing import APIRoute
+
+    from weird_salads.api.async_routes import router
+
+    replaced = {
+        (route.path, method)
+        for route in router.routes
+        if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+    app.router.routes = [
+        route
+        for route in app.router.routes
+        if not (
+            isinstance(route, APIRoute)
+            and any((route.path, method) in replaced for method in route.methods)
+        )
+    ]
+    app.include_router(router)
+
+
+if API_MODE == "async":
+    _use_async_routes(app)
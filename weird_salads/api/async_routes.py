@@ -0,0 +1,257 @@
+"""
+Async (`async def`) versions of the read-only endpoints, used when API_MODE=async
+
+Each request awaits an AsyncSession instead of holding a threadpool worker
+while it waits on the database. Writes (stock ingestion, updates and orders)
+stay on the sync routes in app.py.
+"""
+
+from datetime import datetime
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from weird_salads.api.conditional import (
+    AvailabilityCacheHeaders,
+    MenuCacheHeaders,
+    StockCacheHeaders,
+)
+from weird_salads.api.export import (
+    ORDER_EXPORT_FIELDS,
+    STOCK_EXPORT_FIELDS,
+    async_export_chunks,
+    export_response,
+)
+from weird_salads.api.responses import json_response
+from weird_salads.api.schemas import (
+    ExportFormat,
+    GetMenuAvailabilitySchema,
+    GetMenuItemAvailabilitySchema,
+    GetMenuItemSchema,
+    GetOrdersSchema,
+    GetSimpleMenuSchema,
+    GetStockItemSchema,
+    GetStockSchema,
+)
+from weird_salads.inventory.inventory_service.async_inventory_service import (
+    AsyncMenuService,
+)
+from weird_salads.inventory.inventory_service.exceptions import (
+    IngredientNotFoundError,
+    MenuItemNotFoundError,
+    StockItemNotFoundError,
+)
+from weird_salads.inventory.repository.async_inventory_repository import (
+    AsyncMenuRepository,
+)
+from weird_salads.orders.orders_service.async_orders_service import AsyncOrdersService
+from weird_salads.orders.repository.async_orders_repository import AsyncOrdersRepository
+from weird_salads.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    InvalidCursorError,
+)
+from weird_salads.utils.unit_of_work import AsyncUnitOfWork
+
+__all__ = ["router"]
+
+router = APIRouter()
+
+
+# Menu
+@router.get("/menu", response_model=GetSimpleMenuSchema, tags=["Menu"])
+async def get_menu(cache_headers: MenuCacheHeaders):
+    async with AsyncUnitOfWork() as unit_of_work:
+        repo = AsyncMenuRepository(unit_of_work.session)
+        inventory_service = AsyncMenuService(repo)
+        results = await inventory_service.list_menu()
+    return json_response({"items": results}, GetSimpleMenuSchema, cache_headers)
+
+
+# registered before /menu/{item_id} so "availability" isn't parsed as an id
+@router.get(
+    "/menu/availability", response_model=GetMenuAvailabilitySchema, tags=["Menu"]
+)
+async def get_menu_availability(
+    cache_headers: AvailabilityCacheHeaders, on_menu: Optional[bool] = None
+):
+    async with AsyncUnitOfWork() as unit_of_work:
+        repo = AsyncMenuRepository(unit_of_work.session)
+        inventory_service = AsyncMenuService(repo)
+        results = await inventory_service.list_menu_availability(on_menu=on_menu)
+    return json_response({"items": results}, GetMenuAvailabilitySchema, cache_headers)
+
+
+@router.get("/menu/{item_id}", response_model=GetMenuItemSchema, tags=["Menu"])
+async def get_order(item_id: int, cache_headers: MenuCacheHeaders):
+    try:
+        async with AsyncUnitOfWork() as unit_of_work:
+            repo = AsyncMenuRepository(unit_of_work.session)
+            inventory_service = AsyncMenuService(repo)
+            order = await inventory_service.get_item(item_id=item_id)
+        return order
+    except MenuItemNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"Menu Item with ID {item_id} not found"
+        )
+
+
+@router.get(
+    "/menu/{item_id}/availability",
+    response_model=GetMenuItemAvailabilitySchema,
+    tags=["Menu"],
+)
+async def get_availability(item_id: int, cache_headers: AvailabilityCacheHeaders):
+    try:
+        async with AsyncUnitOfWork() as unit_of_work:
+            repo = AsyncMenuRepository(unit_of_work.session)
+            inventory_service = AsyncMenuService(repo)
+            order = await inventory_service.get_recipe_item_availability(
+                item_id=item_id
+            )
+        return order
+    except MenuItemNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"Menu Item with ID {item_id} not found"
+        )
+
+
+# Inventory
+@router.get("/inventory", response_model=GetStockSchema, tags=["Inventory"])
+async def get_stock(
+    cache_headers: StockCacheHeaders,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    ingredient_id: Optional[int] = None,
+    in_stock: Optional[bool] = None,
+):
+    try:
+        async with AsyncUnitOfWork() as unit_of_work:
+            repo = AsyncMenuRepository(unit_of_work.session)
+            inventory_service = AsyncMenuService(repo)
+            results, next_cursor = await inventory_service.list_stock(
+                limit=limit,
+                cursor=cursor,
+                ingredient_id=ingredient_id,
+                in_stock=in_stock,
+            )
+        return json_response(
+            {"items": results, "next_cursor": next_cursor},
+            GetStockSchema,
+            cache_headers,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _export_stock(format: ExportFormat, **filters):
+    async with AsyncUnitOfWork() as unit_of_work:
+        inventory_service = AsyncMenuService(AsyncMenuRepository(unit_of_work.session))
+        async for chunk in async_export_chunks(
+            inventory_service.export_stock(**filters), format, STOCK_EXPORT_FIELDS
+        ):
+            yield chunk
+
+
+@router.get("/inventory/export", tags=["Inventory"])
+async def export_stock(
+    format: ExportFormat = ExportFormat.ndjson,
+    ingredient_id: Optional[int] = None,
+    in_stock: Optional[bool] = None,
+):
+    chunks = _export_stock(format, ingredient_id=ingredient_id, in_stock=in_stock)
+    return export_response(chunks, format, "stock")
+
+
+@router.get(
+    "/inventory/stock/{stock_id}", response_model=GetStockItemSchema, tags=["Inventory"]
+)
+async def get_stock_item(stock_id: str, cache_headers: StockCacheHeaders):
+    try:
+        async with AsyncUnitOfWork() as unit_of_work:
+            repo = AsyncMenuRepository(unit_of_work.session)
+            inventory_service = AsyncMenuService(repo)
+            order = await inventory_service.get_stock_item(stock_id=stock_id)
+        return order
+    except StockItemNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"Stock Item with ID {stock_id} not found"
+        )
+
+
+@router.get(
+    "/inventory/ingredient/{ingredient_id}",
+    response_model=GetStockSchema,
+    tags=["Inventory"],
+)
+async def get_ingredient(ingredient_id: int, cache_headers: StockCacheHeaders):
+    try:
+        async with AsyncUnitOfWork() as unit_of_work:
+            repo = AsyncMenuRepository(unit_of_work.session)
+            inventory_service = AsyncMenuService(repo)
+            ingredient = await inventory_service.get_ingredient(
+                ingredient_id=ingredient_id
+            )
+        return json_response(
+            {"items": ingredient, "next_cursor": None}, GetStockSchema, cache_headers
+        )
+    except IngredientNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"Ingredient Item with ID {ingredient_id} not found"
+        )
+
+
+# Orders
+@router.get(
+    "/order",
+    response_model=GetOrdersSchema,
+    tags=["Order"],
+)
+async def get_orders(
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    menu_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+):
+    try:
+        async with AsyncUnitOfWork() as unit_of_work:
+            repo = AsyncOrdersRepository(unit_of_work.session)
+            orders_service = AsyncOrdersService(repo)
+            results, next_cursor = await orders_service.list_orders(
+                limit=limit,
+                cursor=cursor,
+                menu_id=menu_id,
+                created_after=created_after,
+                created_before=created_before,
+            )
+        return json_response(
+            {"orders": results, "next_cursor": next_cursor}, GetOrdersSchema
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _export_orders(format: ExportFormat, **filters):
+    async with AsyncUnitOfWork() as unit_of_work:
+        orders_service = AsyncOrdersService(AsyncOrdersRepository(unit_of_work.session))
+        async for chunk in async_export_chunks(
+            orders_service.export_orders(**filters), format, ORDER_EXPORT_FIELDS
+        ):
+            yield chunk
+
+
+@router.get("/order/export", tags=["Order"])
+async def export_orders(
+    format: ExportFormat = ExportFormat.ndjson,
+    menu_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+):
+    chunks = _export_orders(
+        format,
+        menu_id=menu_id,
+        created_after=created_after,
+        created_before=created_before,
+    )
+    return export_response(chunks, format, "orders")
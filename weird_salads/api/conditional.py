@@ -0,0 +1,77 @@
+"""
+Conditional GET (ETag / If-None-Match) for the polled read endpoints
+
+`conditional_get(*families)` is a route dependency. It builds the
+response's ETag from the data versions of `families` in the request's
+database (see utils/data_versions.py) and, if the request's If-None-Match already holds
+it, answers 304 Not Modified before the route opens a unit of work.
+Otherwise it returns the ETag and Cache-Control headers for the route to
+send (pass them to `json_response`, which may build its own Response).
+
+CACHE_MAX_AGE (seconds, default 0) is how long clients may reuse a
+response before revalidating it.
+"""
+
+import os
+from typing import Annotated, Callable, Dict
+
+from fastapi import Depends, HTTPException, Request, Response
+
+from weird_salads.utils.data_versions import MENU, STOCK, data_versions
+from weird_salads.utils.engine import database_key, get_database_url
+from weird_salads.utils.sharding import shard_database_url
+
+__all__ = [
+    "CACHE_MAX_AGE",
+    "AvailabilityCacheHeaders",
+    "MenuCacheHeaders",
+    "StockCacheHeaders",
+    "conditional_get",
+]
+
+CACHE_MAX_AGE = int(os.environ.get("CACHE_MAX_AGE", 0))
+
+_CACHE_CONTROL = f"max-age={CACHE_MAX_AGE}, must-revalidate"
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # weak comparison (RFC 9110 13.1.2), over a list of tags or "*"
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(",")
+    )
+
+
+def conditional_get(*families: str) -> Callable[..., Dict[str, str]]:
+    """
+    A dependency answering 304 when the client's copy of a response read
+    from `families` is current
+    """
+
+    # async, so a 304 is answered on the event loop without a threadpool hop
+    async def dependency(request: Request, response: Response) -> Dict[str, str]:
+        if not data_versions.enabled:
+            return {}
+        headers = {
+            "ETag": data_versions.etag(
+                database_key(shard_database_url() or get_database_url()), *families
+            ),
+            "Cache-Control": _CACHE_CONTROL,
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, headers["ETag"]):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return headers
+
+    return dependency
+
+
+# route parameters, e.g. `def get_menu(cache_headers: MenuCacheHeaders)`
+MenuCacheHeaders = Annotated[Dict[str, str], Depends(conditional_get(MENU))]
+StockCacheHeaders = Annotated[Dict[str, str], Depends(conditional_get(STOCK))]
+AvailabilityCacheHeaders = Annotated[
+    Dict[str, str], Depends(conditional_get(MENU, STOCK))
+]
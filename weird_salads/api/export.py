@@ -0,0 +1,132 @@
+"""
+Streaming NDJSON/CSV encoding for the export endpoints
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterable, Dict, Iterable, Iterator, List, Sequence
+
+from fastapi.responses import StreamingResponse
+
+from weird_salads.api.schemas import ExportFormat
+
+__all__ = [
+    "EXPORT_CHUNK_ROWS",
+    "ORDER_EXPORT_FIELDS",
+    "STOCK_EXPORT_FIELDS",
+    "export_chunks",
+    "async_export_chunks",
+    "export_response",
+]
+
+# rows encoded per chunk written to the response
+EXPORT_CHUNK_ROWS = 500
+
+# columns, in order (as in GetOrderSchema / GetStockItemSchema)
+ORDER_EXPORT_FIELDS = ("id", "menu_id", "created")
+STOCK_EXPORT_FIELDS = (
+    "id",
+    "ingredient_id",
+    "unit",
+    "quantity",
+    "cost",
+    "delivery_date",
+    "created_on",
+)
+
+_MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+class _Encoder:
+    def __init__(self, format: ExportFormat, fieldnames: Sequence[str]):
+        self.format = format
+        self.fieldnames = list(fieldnames)
+
+    def header(self) -> str:
+        if self.format == ExportFormat.csv:
+            return self.encode([dict(zip(self.fieldnames, self.fieldnames))])
+        return ""
+
+    def encode(self, rows: List[Dict[str, Any]]) -> str:
+        if self.format == ExportFormat.ndjson:
+            return "".join(
+                json.dumps({k: _value(row[k]) for k in self.fieldnames}) + "\n"
+                for row in rows
+            )
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerows([[_value(row[k]) for k in self.fieldnames] for row in rows])
+        return buffer.getvalue()
+
+
+def export_chunks(
+    rows: Iterable[Dict[str, Any]],
+    format: ExportFormat,
+    fieldnames: Sequence[str],
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> Iterator[str]:
+    """
+    Encode `rows` as NDJSON or CSV, `chunk_rows` at a time
+    """
+    encoder = _Encoder(format, fieldnames)
+    header = encoder.header()
+    if header:
+        yield header
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield encoder.encode(chunk)
+            chunk = []
+    if chunk:
+        yield encoder.encode(chunk)
+
+
+async def async_export_chunks(
+    rows: AsyncIterable[Dict[str, Any]],
+    format: ExportFormat,
+    fieldnames: Sequence[str],
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+):
+    """
+    `export_chunks` over an async iterable of rows
+    """
+    encoder = _Encoder(format, fieldnames)
+    header = encoder.header()
+    if header:
+        yield header
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield encoder.encode(chunk)
+            chunk = []
+    if chunk:
+        yield encoder.encode(chunk)
+
+
+def export_response(chunks, format: ExportFormat, name: str) -> StreamingResponse:
+    """
+    Stream `chunks` as an attachment called `name`.ndjson / `name`.csv
+    """
+    return StreamingResponse(
+        chunks,
+        media_type=_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{format.value}"'
+        },
+    )
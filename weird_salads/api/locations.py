@@ -0,0 +1,64 @@
+"""
+Routing requests to their location's database (see utils/sharding.py)
+"""
+
+from urllib.parse import parse_qs
+
+from starlette.responses import JSONResponse
+
+from weird_salads.utils.sharding import (
+    LOCATION_HEADER,
+    UnknownLocationError,
+    resolve_location,
+    use_location,
+)
+
+__all__ = ["LocationMiddleware"]
+
+_HEADER = LOCATION_HEADER.lower().encode()
+
+# not about any one location: served without one
+_UNROUTED_PATHS = {"/metrics", "/status/database", "/docs", "/redoc", "/openapi.json"}
+
+
+class LocationMiddleware:
+    """
+    Serve each HTTP request against the database of the location named in
+    its X-Location-Id header (or `location_id` query parameter), answering
+    400 when it's missing (or invalid) and 404 when it's not served here.
+
+    Responses vary on the header, so caches keep one copy per location.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        value = dict(scope["headers"]).get(_HEADER, b"").decode()
+        if not value:
+            query = parse_qs(scope.get("query_string", b"").decode())
+            value = query.get("location_id", [""])[0]
+        if not value and scope["path"] in _UNROUTED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        try:
+            location_id = resolve_location(value)
+        except UnknownLocationError as e:
+            status_code = 404 if value.isdigit() else 400
+            response = JSONResponse({"detail": str(e)}, status_code=status_code)
+            await response(scope, receive, send)
+            return
+
+        async def send_with_vary(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"vary", _HEADER)
+                ]
+            await send(message)
+
+        with use_location(location_id):
+            await self.app(scope, receive, send_with_vary)
@@ -0,0 +1,259 @@
+"""
+Per-route request metrics, exposed in the Prometheus text format
+
+`MetricsMiddleware` (a plain ASGI middleware, so it adds no task or thread
+per request) records for every request, labelled by method and route
+template (e.g. /menu/{item_id}):
+
+* http_requests_total{method, route, status}
+* http_request_duration_seconds{method, route} (histogram)
+* http_request_db_duration_seconds{method, route} (histogram of the time
+  spent in database calls, from utils/query_stats.py)
+* http_request_db_queries_total{method, route}
+* http_requests_in_progress{method}
+
+Requests that match no route are recorded as route="unmatched".
+
+`QueryStatsMiddleware` tracks the statements each request runs, logging
+likely N+1 queries and (in debug mode) reporting them in response headers.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+
+from weird_salads.utils.query_stats import track_queries
+
+__all__ = [
+    "CONTENT_TYPE",
+    "LATENCY_BUCKETS",
+    "MetricsMiddleware",
+    "QueryStatsMiddleware",
+    "RequestMetrics",
+    "request_metrics",
+]
+
+# upper bounds (seconds) of the histogram buckets; +Inf is implied
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Histogram:
+    __slots__ = ("counts", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+
+
+class RequestMetrics:
+    """
+    Thread-safe counters, gauges and histograms for the API's requests
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, int], int] = {}
+        self._latency: Dict[Tuple[str, str], _Histogram] = {}
+        self._database: Dict[Tuple[str, str], _Histogram] = {}
+        self._queries: Dict[Tuple[str, str], int] = {}
+        self._in_progress: Dict[str, int] = {}
+
+    def started(self, method: str) -> None:
+        with self._lock:
+            self._in_progress[method] = self._in_progress.get(method, 0) + 1
+
+    def finished(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        database: float,
+        queries: int,
+    ) -> None:
+        key = (method, route)
+        with self._lock:
+            self._in_progress[method] -= 1
+            self._requests[key + (status,)] = self._requests.get(key + (status,), 0) + 1
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = _Histogram()
+                self._database[key] = _Histogram()
+            latency.observe(seconds)
+            self._database[key].observe(database)
+            self._queries[key] = self._queries.get(key, 0) + queries
+
+    def reset(self) -> None:
+        with self._lock:
+            self._requests.clear()
+            self._latency.clear()
+            self._database.clear()
+            self._queries.clear()
+            self._in_progress = {m: n for m, n in self._in_progress.items() if n}
+
+    def render(self) -> str:
+        """
+        Every metric in the Prometheus text exposition format
+        """
+        with self._lock:
+            requests = dict(self._requests)
+            in_progress = dict(self._in_progress)
+            queries = dict(self._queries)
+            histograms = {
+                "http_request_duration_seconds": self._copy(self._latency),
+                "http_request_db_duration_seconds": self._copy(self._database),
+            }
+
+        lines = [
+            "# HELP http_requests_total Requests handled, by route and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(requests.items()):
+            labels = _labels(method=method, route=route, status=status)
+            lines.append(f"http_requests_total{{{labels}}} {count}")
+
+        lines += [
+            "# HELP http_request_db_queries_total SQL statements run, by route.",
+            "# TYPE http_request_db_queries_total counter",
+        ]
+        for (method, route), count in sorted(queries.items()):
+            labels = _labels(method=method, route=route)
+            lines.append(f"http_request_db_queries_total{{{labels}}} {count}")
+
+        lines += [
+            "# HELP http_requests_in_progress Requests being handled.",
+            "# TYPE http_requests_in_progress gauge",
+        ]
+        for method, count in sorted(in_progress.items()):
+            lines.append(
+                f"http_requests_in_progress{{{_labels(method=method)}}} {count}"
+            )
+
+        descriptions = {
+            "http_request_duration_seconds": "Request latency, by route.",
+            "http_request_db_duration_seconds": "Database time per request, by route.",
+        }
+        for name, histogram in histograms.items():
+            lines += [
+                f"# HELP {name} {descriptions[name]}",
+                f"# TYPE {name} histogram",
+            ]
+            for (method, route), (counts, total) in sorted(histogram.items()):
+                labels = _labels(method=method, route=route)
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {total}")
+                lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _copy(histograms: Dict[Tuple[str, str], _Histogram]):
+        return {key: (list(h.counts), h.total) for key, h in histograms.items()}
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """
+    Record every HTTP request in `metrics` (default: `request_metrics`)
+    """
+
+    def __init__(self, app, metrics: Optional[RequestMetrics] = None):
+        self.app = app
+        self.metrics = metrics or request_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.started(method)
+        start = time.perf_counter()
+        with track_queries(f"{method} {scope['path']}") as stats:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", "unmatched")
+                self.metrics.finished(
+                    method,
+                    route,
+                    status,
+                    time.perf_counter() - start,
+                    stats.seconds,
+                    stats.queries,
+                )
+
+
+class QueryStatsMiddleware:
+    """
+    Track the SQL statements of every HTTP request (see utils/query_stats.py),
+    logging a warning for any statement repeated enough to suggest an N+1.
+
+    With `headers=True` (debug mode) each response also carries
+    X-DB-Queries and X-DB-Time-Ms, counted up to when its headers are sent.
+    """
+
+    def __init__(self, app, headers: bool = False):
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(f"{scope['method']} {scope['path']}") as stats:
+            if not self.headers:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-queries", str(stats.queries).encode()),
+                        (b"x-db-time-ms", f"{stats.seconds * 1e3:.3f}".encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,86 @@
+"""
+Opt-in fast JSON path for the list endpoints
+
+By default a list endpoint returns plain dicts, which FastAPI validates
+against the route's `response_model` and serializes with the stdlib
+encoder. With FAST_JSON=1 (and orjson installed, the `fast` extra)
+`json_response` instead serializes the domain objects directly with orjson
+(calling their `dict()`), skipping the validation: these objects come from
+our own repositories, not from clients. FAST_JSON_STRICT=1 keeps the
+orjson path but validates every response against its schema first (for
+tests and staging).
+
+`python weird_salads/benchmarks/bench_serialization.py` measures both.
+"""
+
+import logging
+import os
+from typing import Any, Mapping, Optional, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+__all__ = ["FAST_JSON", "FAST_JSON_STRICT", "dumps", "json_response", "plain"]
+
+logger = logging.getLogger(__name__)
+
+FAST_JSON_STRICT = os.environ.get("FAST_JSON_STRICT", "0") == "1"
+FAST_JSON = FAST_JSON_STRICT or os.environ.get("FAST_JSON", "0") == "1"
+
+if FAST_JSON and orjson is None:
+    logger.warning("FAST_JSON is set but orjson is not installed, ignoring it")
+    FAST_JSON = FAST_JSON_STRICT = False
+
+
+def _default(value: Any) -> Any:
+    # domain objects (SimpleMenuItem, StockItem, Order, ...)
+    if hasattr(value, "dict"):
+        return value.dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    `content` (dicts and lists of domain objects) as JSON, with orjson
+    """
+    return orjson.dumps(content, default=_default)
+
+
+def plain(content: Any) -> Any:
+    """
+    `content` with every domain object replaced by its `dict()` (whose
+    values are already plain)
+    """
+    if isinstance(content, dict):
+        return {key: plain(value) for key, value in content.items()}
+    if isinstance(content, (list, tuple)):
+        return [plain(value) for value in content]
+    if hasattr(content, "dict") and not isinstance(content, BaseModel):
+        return content.dict()
+    return content
+
+
+def json_response(
+    content: Any,
+    schema: Type[BaseModel],
+    headers: Optional[Mapping[str, str]] = None,
+) -> Any:
+    """
+    The response for `content` (dicts and lists of domain objects), which
+    must match `schema` (the route's response_model).
+
+    Returns plain dicts for FastAPI to validate and serialize, or with
+    FAST_JSON a Response already serialized by orjson, carrying `headers`
+    (FastAPI drops headers set on the injected Response when a route
+    returns its own).
+    """
+    if not FAST_JSON:
+        return plain(content)
+    if FAST_JSON_STRICT:
+        schema.model_validate(plain(content))
+    return Response(dumps(content), media_type="application/json", headers=headers)
@@ -2,13 +2,15 @@
 Pydantic Schemas for API
 """
 
-from datetime import datetime, timezone
+from datetime import datetime
 from enum import Enum
 from typing import List, Optional
 
 from pydantic import BaseModel, Field, field_validator
 from typing_extensions import Annotated
 
+from weird_salads.utils.utils import utc_now
+
 # from typing_extensions import Annotated
 
 
@@ -34,7 +36,7 @@ class SimpleMenuItemSchema(BaseModel):
     name: str
     description: Optional[str] = None
     price: Annotated[float, Field(ge=0.0, strict=True)]
-    created_on: datetime = datetime.now(timezone.utc)
+    created_on: datetime = Field(default_factory=utc_now)
     on_menu: bool = True
 
     class Config:
@@ -127,6 +129,21 @@ class GetMenuItemAvailabilitySchema(GetSimpleMenuItemSchema):
         extra = "forbid"
 
 
+# Schema for the availability of every menu item (no ingredient breakdown)
+class GetMenuAvailabilityItemSchema(GetSimpleMenuItemSchema):
+    available_portions: int = 0
+
+    class Config:
+        extra = "forbid"
+
+
+class GetMenuAvailabilitySchema(BaseModel):
+    items: List[GetMenuAvailabilityItemSchema]
+
+    class Config:
+        extra = "forbid"
+
+
 # =================================
 # Orders-related Schema for the API
 # =================================
@@ -148,6 +165,49 @@ class GetOrderSchema(CreateOrderSchema):
 
 class GetOrdersSchema(BaseModel):
     orders: List[GetOrderSchema]
+    # pass as `cursor` to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+    class Config:
+        extra = "forbid"
+
+
+# Batch orders (e.g. a whole table from a kiosk)
+class OrderLineSchema(BaseModel):
+    menu_id: int
+    quantity: Annotated[int, Field(ge=1)] = 1
+
+    class Config:
+        extra = "forbid"
+
+
+class CreateOrderBatchSchema(BaseModel):
+    items: Annotated[List[OrderLineSchema], Field(min_length=1)]
+    # False: all-or-nothing, True: place whatever fits, line by line
+    partial: bool = False
+
+    class Config:
+        extra = "forbid"
+
+
+class OrderLineStatus(str, Enum):
+    placed = "placed"
+    partial = "partial"
+    rejected = "rejected"
+
+
+class GetOrderLineSchema(OrderLineSchema):
+    placed: int
+    status: OrderLineStatus
+    detail: Optional[str] = None
+    orders: List[GetOrderSchema]
+
+    class Config:
+        extra = "forbid"
+
+
+class GetOrderBatchSchema(BaseModel):
+    lines: List[GetOrderLineSchema]
 
     class Config:
         extra = "forbid"
@@ -159,8 +219,8 @@ class StockSchema(BaseModel):
     quantity: Annotated[float, Field(ge=0.0, strict=True)]
     cost: Annotated[float, Field(ge=0.0, strict=True)]
     # expiry_date: datetime
-    delivery_date: Optional[datetime] = datetime.now(timezone.utc)
-    created_on: Optional[datetime] = datetime.now(timezone.utc)
+    delivery_date: Optional[datetime] = Field(default_factory=utc_now)
+    created_on: Optional[datetime] = Field(default_factory=utc_now)
 
     class Config:
         extra = "forbid"
@@ -172,6 +232,7 @@ class GetStockItemSchema(StockSchema):
 
 class GetStockSchema(BaseModel):
     items: List[GetStockItemSchema]
+    next_cursor: Optional[str] = None
 
 
 class CreateStockSchema(BaseModel):
@@ -185,3 +246,16 @@ class UpdateStockSchema(BaseModel):
     ingredient_id: int
     quantity: Annotated[float, Field(le=0.0, strict=True)]  # negative values only
     unit: UnitOfMeasure
+
+
+# Compaction (depleted lots moved to the archive)
+class CompactStockSchema(BaseModel):
+    archived: int
+    batches: int
+    seconds: float
+
+
+# Exports
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
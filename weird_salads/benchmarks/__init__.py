@@ -0,0 +1,3 @@
+"""
+This module contains package benchmarks.
+"""
@@ -0,0 +1,331 @@
+"""
+Load-test the API: latency percentiles and throughput per endpoint, written
+as JSON so runs can be compared.
+
+    python weird_salads/benchmarks/bench_api.py --base_path data/ --output run.json
+    python weird_salads/benchmarks/bench_api.py --serve --concurrency 8
+    python weird_salads/benchmarks/bench_api.py --baseline run.json
+
+A fresh database is migrated and seeded (bulk mode) from `data/` in a
+temporary directory. By default `weird_salads.api.app:app` is driven
+in-process through the ASGI test client; `--serve` starts it under uvicorn
+and drives it over HTTP instead, as does `--url` for a server that is
+already running (and seeded).
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import cycle
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# (name, method, path template); {menu_id} cycles through the seeded menu
+ENDPOINTS = [
+    ("GET /menu", "GET", "/menu"),
+    ("GET /menu/{id}/availability", "GET", "/menu/{menu_id}/availability"),
+    ("GET /inventory", "GET", "/inventory"),
+    ("POST /order", "POST", "/order"),
+]
+
+PERCENTILES = (50, 95, 99)
+
+
+def seed_database(
+    directory: Path, base_path: Path, location_id: int, quantity: float
+) -> str:
+    """
+    Migrate and seed a SQLite database in `directory`, returning its URL
+    """
+    from weird_salads.utils.database import seed_db
+
+    database_url = f"sqlite:///{directory / 'bench.db'}"
+    seed_db.migrate(database_url, Path("alembic.ini"))
+    seed_db.main(location_id, quantity, base_path, database_url=database_url)
+    # start every run from a checkpointed database, not one whose seed data is
+    # still in the -wal (which every read would then search)
+    seed_db.close_databases()
+    # seed_db logs at DEBUG; keep the timed runs quiet
+    logging.getLogger().setLevel(logging.WARNING)
+    return database_url
+
+
+def menu_ids(base_path: Path, location_id: int) -> List[int]:
+    import pandas as pd
+
+    menus_df = pd.read_csv(base_path / "menus.csv")
+    return [
+        int(recipe_id)
+        for recipe_id in menus_df[menus_df["location_id"] == location_id]["recipe_id"]
+    ]
+
+
+# - clients (one per worker thread)
+def in_process_client():
+    from fastapi.testclient import TestClient
+
+    from weird_salads.api.app import app
+
+    return TestClient(app)
+
+
+def http_client(url: str):
+    import httpx
+
+    return httpx.Client(base_url=url, timeout=30.0)
+
+
+def run_endpoint(
+    make_client: Callable[[], Any],
+    method: str,
+    path: str,
+    ids: List[int],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """
+    Send `requests` requests from `concurrency` threads, returning the
+    latency percentiles (ms), errors and throughput (requests/s)
+    """
+    ids_cycle = cycle(ids)
+    ids_lock = threading.Lock()
+    counter = iter(range(requests))
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    results_lock = threading.Lock()
+
+    def worker() -> None:
+        client = make_client()
+        try:
+            while True:
+                with ids_lock:
+                    if next(counter, None) is None:
+                        return
+                    menu_id = next(ids_cycle)
+                kwargs = {"json": {"menu_id": menu_id}} if method == "POST" else {}
+                start = time.perf_counter()
+                try:
+                    response = client.request(
+                        method, path.format(menu_id=menu_id), **kwargs
+                    )
+                    error = None if response.status_code < 400 else response.status_code
+                except Exception as e:
+                    error = type(e).__name__
+                elapsed = time.perf_counter() - start
+                with results_lock:
+                    latencies.append(elapsed)
+                    if error is not None:
+                        errors[str(error)] = errors.get(str(error), 0) + 1
+        finally:
+            client.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1e3
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(wall, 4),
+        "throughput": round(len(latencies) / wall, 2),
+        "mean_ms": round(float(latencies_ms.mean()), 3),
+        "max_ms": round(float(latencies_ms.max()), 3),
+        **{
+            f"p{p}_ms": round(float(np.percentile(latencies_ms, p)), 3)
+            for p in PERCENTILES
+        },
+    }
+
+
+# - out of process
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(env: Dict[str, str], port: int, workers: int = 1) -> subprocess.Popen:
+    import httpx
+
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "weird_salads.api.app:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--workers",
+            str(workers),
+        ],
+        env=env,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/menu", timeout=1.0)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+# - comparing runs
+def regressions(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[Tuple[str, str, float, float]]:
+    """
+    (endpoint, metric, baseline, current) for every p95 latency or throughput
+    more than `tolerance` (a fraction) worse than in `baseline`
+    """
+    found = []
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            found.append((name, "p95_ms", previous["p95_ms"], current["p95_ms"]))
+        if current["throughput"] < previous["throughput"] * (1 - tolerance):
+            found.append(
+                (name, "throughput", previous["throughput"], current["throughput"])
+            )
+    return found
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args: argparse.Namespace) -> int:
+    ids = menu_ids(args.base_path, args.location_id)
+    with tempfile.TemporaryDirectory() as directory:
+        if args.url:
+            mode, url, server = "http", args.url, None
+        else:
+            database_url = seed_database(
+                Path(directory), args.base_path, args.location_id, args.quantity
+            )
+            os.environ["DATABASE_URL"] = database_url
+            if args.serve:
+                port = free_port()
+                mode, url = "http", f"http://127.0.0.1:{port}"
+                server = start_server(dict(os.environ), port)
+            else:
+                mode, url, server = "in-process", None, None
+
+        make_client = in_process_client if url is None else lambda: http_client(url)
+        try:
+            endpoints = {}
+            for name, method, path in ENDPOINTS:
+                # warm up (connections, caches) before timing
+                run_endpoint(make_client, method, path, ids, args.warmup, 1)
+                endpoints[name] = run_endpoint(
+                    make_client, method, path, ids, args.requests, args.concurrency
+                )
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "mode": mode,
+        "api_mode": os.environ.get("API_MODE", "sync"),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "endpoints": endpoints,
+    }
+
+    print(f"{'endpoint':32} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8}  errors")
+    for name, stats in endpoints.items():
+        print(
+            f"{name:32} {stats['throughput']:9.1f} {stats['p50_ms']:8.2f} "
+            f"{stats['p95_ms']:8.2f} {stats['p99_ms']:8.2f}  {stats['errors'] or ''}"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        found = regressions(results, baseline, args.tolerance)
+        for name, metric, previous, current in found:
+            print(f"REGRESSION {name} {metric}: {previous} -> {current}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API load test")
+    parser.add_argument(
+        "--base_path",
+        type=Path,
+        default=Path("data"),
+        help="The base path for data files.",
+    )
+    parser.add_argument("--location_id", type=int, default=1, help="Location seeded.")
+    parser.add_argument(
+        "--quantity",
+        type=float,
+        default=100_000,
+        help="Stock seeded per ingredient (enough that orders don't run out).",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=500, help="Requests per endpoint."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Client threads per endpoint."
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=20, help="Untimed requests per endpoint."
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run the app under uvicorn and load it over HTTP.",
+    )
+    parser.add_argument(
+        "--url", default=None, help="Load an already running (seeded) server."
+    )
+    parser.add_argument("--output", type=Path, default=None, help="JSON results.")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=None,
+        help="Earlier JSON results; exit 1 if p95 or throughput regressed.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed regression against --baseline, as a fraction.",
+    )
+
+    sys.exit(main(parser.parse_args()))
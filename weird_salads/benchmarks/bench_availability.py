@@ -0,0 +1,119 @@
+"""
+Benchmark the AvailabilityEngine against the per-recipe Python loop, for the
+full `data/recipes.csv` catalogue.
+
+    python weird_salads/benchmarks/bench_availability.py --base_path data/
+"""
+
+import argparse
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from weird_salads.api.schemas import UnitOfMeasure
+from weird_salads.inventory.inventory_service.availability import (
+    AvailabilityEngine,
+    to_litres,
+)
+from weird_salads.inventory.inventory_service.inventory import UNIT_CONVERSIONS_TO_LITRE
+
+
+def load_catalogue(base_path: Path):
+    """
+    (recipe_id, ingredient_id, quantity, unit) rows for every recipe, using the
+    ingredient's unit (as seed_db.py does).
+    """
+    recipes_df = pd.read_csv(base_path / "recipes.csv")
+    ingredients_df = pd.read_csv(base_path / "ingredients.csv")
+    merged = recipes_df.merge(
+        ingredients_df[["ingredient_id", "unit"]], on="ingredient_id", how="inner"
+    )
+    return [
+        (int(r), int(g), float(q), UnitOfMeasure(u))
+        for r, g, q, u in merged[
+            ["recipe_id", "ingredient_id", "quantity", "unit"]
+        ].itertuples(index=False)
+    ]
+
+
+def loop_available_portions(requirements, stock_by_unit):
+    """
+    The previous MenuService approach: per recipe, per ingredient, convert the
+    stock to the recipe's unit and take the minimum of the floor divisions.
+    """
+    recipes = {}
+    for recipe_id, ingredient_id, quantity, unit in requirements:
+        recipes.setdefault(recipe_id, []).append((ingredient_id, quantity, unit))
+
+    portions = {}
+    for recipe_id, lines in recipes.items():
+        available = float("inf")
+        for ingredient_id, quantity, unit in lines:
+            total = sum(
+                q / UNIT_CONVERSIONS_TO_LITRE[u] * UNIT_CONVERSIONS_TO_LITRE[unit]
+                for u, q in stock_by_unit.get(ingredient_id, [])
+            )
+            if quantity > 0:
+                available = min(available, total // quantity)
+        portions[recipe_id] = 0 if available == float("inf") else int(available)
+    return portions
+
+
+def main(base_path: Path, repeat: int, seed: int) -> None:
+    requirements = load_catalogue(base_path)
+    rng = np.random.default_rng(seed)
+    ingredient_units = {g: u for _, g, _, u in requirements}
+    stock_by_unit = {
+        g: [(u, float(rng.uniform(0, 1000)))] for g, u in ingredient_units.items()
+    }
+    stock_litres = {
+        g: sum(to_litres(q, u) for u, q in totals)
+        for g, totals in stock_by_unit.items()
+    }
+
+    engine = AvailabilityEngine.from_requirements(requirements)
+    engine.set_stock(stock_litres)
+
+    expected = loop_available_portions(requirements, stock_by_unit)
+    result = engine.available_portions()
+    mismatches = sum(expected[r] != result.get(r) for r in expected)
+
+    loop_time = min(
+        timeit.repeat(
+            lambda: loop_available_portions(requirements, stock_by_unit),
+            number=1,
+            repeat=repeat,
+        )
+    )
+    engine_time = min(timeit.repeat(engine.available_portions, number=1, repeat=repeat))
+    build_time = min(
+        timeit.repeat(
+            lambda: AvailabilityEngine.from_requirements(requirements),
+            number=1,
+            repeat=repeat,
+        )
+    )
+
+    print(f"recipes: {len(expected)}, recipe lines: {len(requirements)}")
+    print(f"mismatches: {mismatches}")
+    print(f"python loop:          {loop_time * 1e3:8.3f} ms")
+    print(f"engine (compute):     {engine_time * 1e3:8.3f} ms")
+    print(f"engine (build once):  {build_time * 1e3:8.3f} ms")
+    print(f"speed-up (compute):   {loop_time / engine_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Availability benchmark")
+    parser.add_argument(
+        "--base_path",
+        type=Path,
+        default=Path("data"),
+        help="The base path for data files.",
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="Timing repeats.")
+    parser.add_argument("--seed", type=int, default=0, help="Random stock seed.")
+    args = parser.parse_args()
+
+    main(base_path=args.base_path, repeat=args.repeat, seed=args.seed)
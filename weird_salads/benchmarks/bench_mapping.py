@@ -0,0 +1,158 @@
+"""
+Benchmark repository row mapping: the previous ORM path (load StockModel /
+OrderModel objects, then `Item(**record.dict())`) against the column-tuple
+path (`Item(*row)` straight from Core rows), for `list_stock` and orders
+`list` over 100k rows. Reports time, rows/s, peak allocation while mapping
+and memory retained by the result, plus the size of one slotted domain
+object against a dict-backed one.
+
+    python weird_salads/benchmarks/bench_mapping.py --rows 100000
+"""
+
+import argparse
+import gc
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from weird_salads.inventory.inventory_service.inventory import StockItem
+from weird_salads.inventory.repository.inventory_repository import (
+    _STOCK_ITEM_COLUMNS,
+    MenuRepository,
+    _stock_query,
+)
+from weird_salads.inventory.repository.models import StockModel, UnitOfMeasure
+from weird_salads.orders.orders_service.orders import Order
+from weird_salads.orders.repository.models import OrderModel
+from weird_salads.orders.repository.orders_repository import (
+    OrdersRepository,
+    _orders_query,
+)
+from weird_salads.utils.sqlalchemy_base import Base
+
+
+def seed(engine, rows: int) -> None:
+    start = datetime(2024, 1, 1, 12, 0, 0)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(StockModel),
+            [
+                {
+                    "id": f"{i:08d}-0000-4000-8000-000000000000",
+                    "ingredient_id": i % 50,
+                    "unit": UnitOfMeasure.liter,
+                    "quantity": 1.5,
+                    "quantity_ml": 1500.0,
+                    "cost": 1.25,
+                    "delivery_date": start + timedelta(seconds=i),
+                    "created_on": start,
+                }
+                for i in range(rows)
+            ],
+        )
+        connection.execute(
+            insert(OrderModel),
+            [
+                {
+                    "id": f"{i:08d}-0000-4000-8000-000000000000",
+                    "menu_id": i % 30,
+                    "created": start + timedelta(seconds=i),
+                }
+                for i in range(rows)
+            ],
+        )
+
+
+# - the previous mapping, through ORM objects and their dict()
+def orm_list_stock(session):
+    records = session.scalars(_stock_query(columns=(StockModel,)))
+    return [StockItem(**record.dict()) for record in records]
+
+
+def orm_list_orders(session):
+    records = session.scalars(_orders_query(columns=(OrderModel,)))
+    return [Order(**record.dict()) for record in records]
+
+
+def measure(make_session, call):
+    """
+    (seconds, peak bytes allocated, bytes retained by the result, rows)
+    """
+    gc.collect()
+    session = make_session()
+    start = time.perf_counter()
+    items = call(session)
+    seconds = time.perf_counter() - start
+    session.close()
+    del items
+
+    gc.collect()
+    session = make_session()
+    tracemalloc.start()
+    items = call(session)
+    session.close()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, retained, len(items)
+
+
+def object_size(item) -> int:
+    """
+    Bytes for one object: the instance, plus its __dict__ if it has one
+    """
+    size = sys.getsizeof(item)
+    if hasattr(item, "__dict__"):
+        size += sys.getsizeof(item.__dict__)
+    return size
+
+
+def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{Path(directory) / 'bench.db'}")
+        Base.metadata.create_all(engine)
+        seed(engine, rows)
+        make_session = sessionmaker(bind=engine)
+
+        print(
+            f"{'call':28} {'rows':>7} {'seconds':>8} {'rows/s':>10} "
+            f"{'peak MB':>8} {'kept MB':>8}"
+        )
+        for name, call in (
+            ("list_stock (ORM + dict)", orm_list_stock),
+            ("list_stock (columns)", lambda s: MenuRepository(s).list_stock()),
+            ("orders list (ORM + dict)", orm_list_orders),
+            ("orders list (columns)", lambda s: OrdersRepository(s).list()),
+        ):
+            seconds, peak, retained, count = measure(make_session, call)
+            print(
+                f"{name:28} {count:7d} {seconds:8.3f} {count / seconds:10.0f} "
+                f"{peak / 2**20:8.1f} {retained / 2**20:8.1f}"
+            )
+
+        with make_session() as session:
+            row = session.execute(select(*_STOCK_ITEM_COLUMNS).limit(1)).one()
+        engine.dispose()
+
+    # the same __init__ on a class without __slots__
+    unslotted = type("StockItemDict", (), {"__init__": StockItem.__init__})
+    print(
+        f"\nStockItem: {object_size(StockItem(*row))} bytes slotted, "
+        f"{object_size(unslotted(*row))} bytes with a __dict__"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Repository mapping benchmark")
+    parser.add_argument(
+        "--rows", type=int, default=100_000, help="Stock lots and orders seeded."
+    )
+    args = parser.parse_args()
+
+    main(args.rows)
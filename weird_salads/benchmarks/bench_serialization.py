@@ -0,0 +1,118 @@
+"""
+Benchmark list-response serialization: FastAPI's validated path (plain
+dicts -> response_model validation -> stdlib json) against the FAST_JSON
+path (domain objects -> orjson), per item, for large /inventory and /order
+pages.
+
+    python weird_salads/benchmarks/bench_serialization.py --items 100 1000 10000
+"""
+
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+
+from pydantic import TypeAdapter
+
+from weird_salads.api.responses import dumps, plain
+from weird_salads.api.schemas import GetOrdersSchema, GetStockSchema
+from weird_salads.inventory.inventory_service.inventory import StockItem
+from weird_salads.inventory.repository.models import UnitOfMeasure
+from weird_salads.orders.orders_service.orders import Order
+
+
+def stock_page(items: int):
+    start = datetime(2024, 1, 1, 12, 0, 0, 123456)
+    return {
+        "items": [
+            StockItem(
+                id=f"{i:08d}-0000-4000-8000-000000000000",
+                ingredient_id=i % 50,
+                unit=UnitOfMeasure.liter,
+                quantity=float(i % 1000) + 0.5,
+                cost=1.25,
+                delivery_date=start + timedelta(minutes=i),
+                created_on=start,
+            )
+            for i in range(items)
+        ],
+        "next_cursor": "WyIyMDI0LTAxLTAxVDEyOjAwOjAwIiwgIjEiXQ==",
+    }
+
+
+def order_page(items: int):
+    start = datetime(2024, 1, 1, 12, 0, 0, 123456)
+    return {
+        "orders": [
+            Order(
+                id=f"{i:08d}-0000-4000-8000-000000000000",
+                created=start + timedelta(seconds=i),
+                menu_id=i % 30,
+            )
+            for i in range(items)
+        ],
+        "next_cursor": None,
+    }
+
+
+def validated(content, adapter: TypeAdapter) -> bytes:
+    """
+    What FastAPI does with a returned dict and a response_model
+    """
+    model = adapter.validate_python(plain(content))
+    return json.dumps(
+        adapter.dump_python(model, mode="json"),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def fast(content) -> bytes:
+    return dumps(content)
+
+
+def strict(content, adapter: TypeAdapter) -> bytes:
+    adapter.validate_python(plain(content))
+    return fast(content)
+
+
+def main(sizes, repeat: int) -> None:
+    print(f"{'page':10} {'items':>7} {'validated':>12} {'fast':>12} {'strict':>12}")
+    for name, make_page, schema in (
+        ("/inventory", stock_page, GetStockSchema),
+        ("/order", order_page, GetOrdersSchema),
+    ):
+        adapter = TypeAdapter(schema)
+        for items in sizes:
+            content = make_page(items)
+            assert json.loads(validated(content, adapter)) == json.loads(fast(content))
+            timings = {
+                label: min(timeit.repeat(call, number=1, repeat=repeat)) / items * 1e6
+                for label, call in (
+                    ("validated", lambda: validated(content, adapter)),
+                    ("fast", lambda: fast(content)),
+                    ("strict", lambda: strict(content, adapter)),
+                )
+            }
+            print(
+                f"{name:10} {items:7d} "
+                + " ".join(f"{timings[k]:9.2f} us" for k in timings)
+                + f"   ({timings['validated'] / timings['fast']:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serialization benchmark")
+    parser.add_argument(
+        "--items",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+        help="Items per page.",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats.")
+    args = parser.parse_args()
+
+    main(args.items, args.repeat)
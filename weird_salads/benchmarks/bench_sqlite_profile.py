@@ -0,0 +1,217 @@
+"""
+Benchmark SQLite connection profiles (SQLITE_PROFILE, see utils/engine.py)
+under concurrent reads and writes: readers GET `--read_path` while writers
+POST /order, at the same time, against a freshly seeded (and checkpointed)
+database per profile. Reports throughput and p50/p95 latency for each side,
+plus the "database is locked" errors retried (or given up on) by the writers.
+
+    python weird_salads/benchmarks/bench_sqlite_profile.py --base_path data/
+    python weird_salads/benchmarks/bench_sqlite_profile.py --scenario export
+    python weird_salads/benchmarks/bench_sqlite_profile.py --profiles rollback wal \\
+        --readers 8 --writers 8 --serve --workers 4
+
+"rollback" is SQLite's own rollback journal (what the API ran on before the
+profiles), "wal" the default profile.
+
+The "mixed" scenario (default) reads short pages, so a read transaction
+rarely overlaps a commit and the two profiles read at much the same rate.
+The "export" scenario is the write contention WAL is for: readers stream
+GET /inventory/export over `--lots` extra (depleted) stock lots, holding a
+read transaction open for the whole export. Under "rollback" a commit has
+to wait for every such reader to finish; under "wal" it doesn't.
+"""
+
+import argparse
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict
+
+from weird_salads.benchmarks.bench_api import (
+    free_port,
+    http_client,
+    in_process_client,
+    menu_ids,
+    run_endpoint,
+    seed_database,
+    start_server,
+)
+
+# what the readers GET in the "export" scenario
+EXPORT_PATH = "/inventory/export"
+
+
+def add_depleted_lots(database_url: str, count: int) -> None:
+    """
+    Insert `count` empty stock lots (they don't change availability, but
+    every stock export streams them), then checkpoint
+    """
+    from sqlalchemy import insert
+
+    from weird_salads.inventory.repository.models import StockModel, UnitOfMeasure
+    from weird_salads.utils.database.seed_db import close_databases
+    from weird_salads.utils.unit_of_work import UnitOfWork
+    from weird_salads.utils.utils import generate_str_uuid, utc_now
+
+    now = utc_now()
+    rows = [
+        {
+            "id": generate_str_uuid(),
+            "ingredient_id": 1,
+            "unit": UnitOfMeasure.liter,
+            "quantity": 0.0,
+            "quantity_ml": 0.0,
+            "cost": 0.0,
+            "delivery_date": now,
+            "created_on": now,
+        }
+        for _ in range(count)
+    ]
+    with UnitOfWork(database_url) as unit_of_work:
+        unit_of_work.session.execute(insert(StockModel), rows)
+        unit_of_work.commit()
+    close_databases()
+
+
+def run_profile(profile: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Seed a database under `profile` and load it with readers and writers
+    """
+    from weird_salads.utils.engine import dispose_engines
+    from weird_salads.utils.unit_of_work import retry_statistics
+
+    os.environ["SQLITE_PROFILE"] = profile
+    ids = menu_ids(args.base_path, args.location_id)
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = seed_database(
+            Path(directory), args.base_path, args.location_id, args.quantity
+        )
+        read_path = args.read_path
+        if args.scenario == "export":
+            add_depleted_lots(os.environ["DATABASE_URL"], args.lots)
+            read_path = EXPORT_PATH
+        server = None
+        make_client = in_process_client
+        if args.serve:
+            port = free_port()
+            server = start_server(dict(os.environ), port, args.workers)
+            make_client = partial(http_client, f"http://127.0.0.1:{port}")
+        retries = retry_statistics()
+        try:
+            run_endpoint(make_client, "GET", read_path, ids, args.warmup, 1)
+            run_endpoint(make_client, "POST", "/order", ids, args.warmup, 1)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                reads = executor.submit(
+                    run_endpoint,
+                    make_client,
+                    "GET",
+                    read_path,
+                    ids,
+                    args.requests,
+                    args.readers,
+                )
+                writes = executor.submit(
+                    run_endpoint,
+                    make_client,
+                    "POST",
+                    "/order",
+                    ids,
+                    args.requests,
+                    args.writers,
+                )
+                results = {"reads": reads.result(), "writes": writes.result()}
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+            dispose_engines()
+        if server is None:
+            # in-process only: the server's retries aren't visible here
+            after = retry_statistics()
+            results["locked"] = after["locked"] - retries["locked"]
+            results["aborts"] = after["aborts"] - retries["aborts"]
+    return results
+
+
+def main(args: argparse.Namespace) -> None:
+    results = {profile: run_profile(profile, args) for profile in args.profiles}
+
+    print(
+        f"{'profile':10} {'side':7} {'req/s':>9} {'p50':>8} {'p95':>8} {'max':>9}"
+        "  errors"
+    )
+    for profile, sides in results.items():
+        for side in ("reads", "writes"):
+            stats = sides[side]
+            print(
+                f"{profile:10} {side:7} {stats['throughput']:9.1f} "
+                f"{stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} "
+                f"{stats['max_ms']:9.2f}  {stats['errors'] or ''}"
+            )
+        if "locked" in sides:
+            print(
+                f"{profile:10} 'database is locked': {sides['locked']} retried, "
+                f"{sides['aborts']} given up"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite profile benchmark")
+    parser.add_argument(
+        "--base_path",
+        type=Path,
+        default=Path("data"),
+        help="The base path for data files.",
+    )
+    parser.add_argument("--location_id", type=int, default=1, help="Location seeded.")
+    parser.add_argument(
+        "--quantity",
+        type=float,
+        default=100_000,
+        help="Stock seeded per ingredient (enough that orders don't run out).",
+    )
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        default=["rollback", "wal"],
+        help="SQLITE_PROFILE values compared.",
+    )
+    parser.add_argument(
+        "--scenario",
+        choices=["mixed", "export"],
+        default="mixed",
+        help="mixed: readers GET --read_path; export: readers stream "
+        f"{EXPORT_PATH} (long read transactions).",
+    )
+    parser.add_argument(
+        "--read_path",
+        default="/inventory",
+        help="Endpoint the readers GET (mixed scenario).",
+    )
+    parser.add_argument(
+        "--lots",
+        type=int,
+        default=5_000,
+        help="Depleted stock lots added for the export scenario.",
+    )
+    parser.add_argument("--requests", type=int, default=500, help="Requests per side.")
+    parser.add_argument("--readers", type=int, default=4, help="Reader threads.")
+    parser.add_argument("--writers", type=int, default=4, help="Writer threads.")
+    parser.add_argument(
+        "--warmup", type=int, default=20, help="Untimed requests per side."
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run the app under uvicorn and load it over HTTP.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="uvicorn worker processes with --serve (sharing the database).",
+    )
+
+    main(parser.parse_args())
@@ -0,0 +1,143 @@
+"""
+Async counterpart of the MenuService reads
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from weird_salads.inventory.inventory_service.availability_cache import (
+    availability_cache_for,
+)
+from weird_salads.inventory.inventory_service.exceptions import (
+    IngredientNotFoundError,
+    MenuItemNotFoundError,
+    StockItemNotFoundError,
+)
+from weird_salads.inventory.inventory_service.inventory import (
+    MenuItem,
+    MenuItemAvailability,
+    StockItem,
+)
+from weird_salads.inventory.inventory_service.inventory_service import (
+    AVAILABILITY_ENGINE,
+    MenuService,
+)
+from weird_salads.inventory.repository.async_inventory_repository import (
+    AsyncMenuRepository,
+)
+from weird_salads.utils.pagination import decode_cursor, split_page
+
+__all__ = ["AsyncMenuService"]
+
+
+class AsyncMenuService(MenuService):
+    """
+    The read methods of MenuService, awaiting an AsyncMenuRepository.
+
+    Unit conversion and availability calculations are shared with
+    MenuService; stock writes remain on the sync MenuService.
+    """
+
+    def __init__(self, menu_repository: AsyncMenuRepository):
+        self.menu_repository = menu_repository
+        # each location's database has its own (see utils/sharding.py)
+        self.availability_cache = availability_cache_for(menu_repository.session)
+
+    async def get(self, item_id):
+        menu_item = await self.menu_repository.get(item_id)
+        if menu_item is not None:
+            return menu_item
+        raise MenuItemNotFoundError(f"Menu item with id {item_id} not found")
+
+    async def get_item(self, item_id: int) -> MenuItem:
+        menu_item = await self.menu_repository.get_tree(item_id)
+        if menu_item is not None:
+            return menu_item
+        raise MenuItemNotFoundError(f"Menu item with id {item_id} not found")
+
+    async def list_menu(self):
+        return await self.menu_repository.list()
+
+    async def _ensure_cache(self) -> None:
+        # loading uses the sync MenuRepository, run on this session's connection
+        if not self.availability_cache.loaded:
+            await self.menu_repository.run_sync(self.availability_cache.ensure_loaded)
+
+    async def _check_cache(self) -> None:
+        if self.availability_cache.check:
+            await self.menu_repository.run_sync(self.availability_cache.verify)
+
+    async def list_menu_availability(
+        self, on_menu: Optional[bool] = None
+    ) -> List[MenuItemAvailability]:
+        if AVAILABILITY_ENGINE == "sql" and not self.availability_cache.enabled:
+            return await self.menu_repository.list_availability(on_menu=on_menu)
+
+        menu_items = await self.menu_repository.list()
+        if self.availability_cache.enabled:
+            await self._ensure_cache()
+            portions = self.availability_cache.all_available_portions()
+            await self._check_cache()
+        else:
+            portions = self._compute_portions(
+                menu_items,
+                await self.menu_repository.list_recipe_requirements(),
+                await self.menu_repository.list_stock_totals(),
+            )
+        return self._menu_availability(menu_items, portions, on_menu)
+
+    async def get_recipe_item_availability(self, item_id: int) -> Dict[str, Any]:
+        menu_item_with_ingredients = await self.get_item(item_id)
+        ingredients = menu_item_with_ingredients.ingredients
+
+        if self.availability_cache.enabled:
+            await self._ensure_cache()
+            stock_totals = self._cached_stock_data(ingredients)
+            available_portions = self.availability_cache.available_portions(item_id)
+            await self._check_cache()
+        else:
+            stock_totals = self._stock_data(
+                ingredients,
+                await self.menu_repository.get_recipe_stock_totals(item_id),
+            )
+            available_portions = self._calculate_available_portions(
+                ingredients, stock_totals
+            )
+
+        return self._availability(
+            menu_item_with_ingredients, stock_totals, available_portions
+        )
+
+    # - Stock-related
+    async def get_ingredient(self, ingredient_id: int):
+        ingredient_item = await self.menu_repository.get_ingredient(ingredient_id)
+        if ingredient_item:
+            return ingredient_item
+        raise IngredientNotFoundError(f"items with id {ingredient_id} not found")
+
+    async def get_stock_item(self, stock_id: str):
+        stock_item = await self.menu_repository.get_stock(stock_id)
+        if stock_item is not None:
+            return stock_item
+        raise StockItemNotFoundError(f"stock with id {stock_id} not found")
+
+    async def list_stock(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        ingredient_id: Optional[int] = None,
+        in_stock: Optional[bool] = None,
+    ) -> Tuple[List[StockItem], Optional[str]]:
+        stock = await self.menu_repository.list_stock(
+            None if limit is None else limit + 1,
+            after=decode_cursor(cursor) if cursor else None,
+            ingredient_id=ingredient_id,
+            in_stock=in_stock,
+        )
+        return split_page(stock, limit, key=lambda item: (item.delivery_date, item.id))
+
+    def export_stock(
+        self, ingredient_id: Optional[int] = None, in_stock: Optional[bool] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        return self.menu_repository.stream_stock(
+            ingredient_id=ingredient_id, in_stock=in_stock
+        )
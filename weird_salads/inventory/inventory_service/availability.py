@@ -0,0 +1,171 @@
+"""
+Vectorized availability over a recipe x ingredient requirement matrix
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from weird_salads.api.schemas import UnitOfMeasure
+from weird_salads.inventory.inventory_service.inventory import UNIT_CONVERSIONS_TO_LITRE
+
+__all__ = ["AvailabilityEngine", "to_litres"]
+
+
+def to_litres(quantity: float, unit) -> float:
+    """
+    Convert `quantity` in `unit` (API or SQLAlchemy Enum, or str) to litres
+    """
+    return (
+        quantity
+        / UNIT_CONVERSIONS_TO_LITRE[UnitOfMeasure(getattr(unit, "value", unit))]
+    )
+
+
+class AvailabilityEngine:
+    """
+    Available portions for many recipes at once.
+
+    The requirement matrix is held sparsely (COO, sorted by recipe) with every
+    quantity in litres, so portions for all recipes are
+
+        floor(min_j(stock[j] / required[i, j]))
+
+    computed with one gather, one divide and one `np.minimum.reduceat`, for
+    every recipe or just a subset of them.
+    Recipe lines with a zero requirement are dropped, and recipes with no
+    remaining lines have 0 portions.
+    """
+
+    def __init__(
+        self,
+        recipe_ids: np.ndarray,
+        ingredient_ids: np.ndarray,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        required: np.ndarray,
+    ):
+        order = np.argsort(rows, kind="stable")
+        self.recipe_ids = recipe_ids
+        self.ingredient_ids = ingredient_ids
+        self.rows = rows[order]
+        self.cols = cols[order]
+        self.required = required[order]
+        self.stock = np.zeros(len(ingredient_ids), dtype=np.float64)
+
+        self._recipe_index = {int(r): i for i, r in enumerate(recipe_ids)}
+        self._ingredient_index = {int(g): j for j, g in enumerate(ingredient_ids)}
+        # each recipe's lines are the slice [_line_start[i], _line_end[i])
+        recipe_rows = np.arange(len(recipe_ids))
+        self._line_start = np.searchsorted(self.rows, recipe_rows, side="left")
+        self._line_end = np.searchsorted(self.rows, recipe_rows, side="right")
+
+    @classmethod
+    def from_requirements(
+        cls,
+        requirements: Iterable[Tuple[int, int, float, UnitOfMeasure]],
+        recipe_ids: Optional[Iterable[int]] = None,
+    ) -> "AvailabilityEngine":
+        """
+        Build from (recipe_id, ingredient_id, quantity, unit) rows.
+
+        `recipe_ids` can list recipes with no requirement rows, so they are
+        still reported (with 0 portions).
+        """
+        lines = [
+            (int(recipe_id), int(ingredient_id), to_litres(quantity, unit))
+            for recipe_id, ingredient_id, quantity, unit in requirements
+            if quantity > 0
+        ]
+        all_recipes = sorted(
+            {line[0] for line in lines} | {int(r) for r in (recipe_ids or [])}
+        )
+        all_ingredients = sorted({line[1] for line in lines})
+        recipe_index = {r: i for i, r in enumerate(all_recipes)}
+        ingredient_index = {g: j for j, g in enumerate(all_ingredients)}
+
+        return cls(
+            recipe_ids=np.asarray(all_recipes, dtype=np.int64),
+            ingredient_ids=np.asarray(all_ingredients, dtype=np.int64),
+            rows=np.asarray([recipe_index[r] for r, _, _ in lines], dtype=np.int64),
+            cols=np.asarray([ingredient_index[g] for _, g, _ in lines], dtype=np.int64),
+            required=np.asarray([q for _, _, q in lines], dtype=np.float64),
+        )
+
+    @property
+    def ingredients(self) -> List[int]:
+        return [int(g) for g in self.ingredient_ids]
+
+    def set_stock(self, stock_litres: Dict[int, float]) -> None:
+        """
+        Replace the stock vector from {ingredient_id: litres}
+        """
+        self.stock[:] = 0.0
+        for ingredient_id, litres in stock_litres.items():
+            self.update_stock(ingredient_id, litres)
+
+    def update_stock(self, ingredient_id: int, litres: float) -> None:
+        """
+        Set the stock (in litres) of a single ingredient
+        """
+        j = self._ingredient_index.get(int(ingredient_id))
+        if j is not None:
+            self.stock[j] = litres
+
+    def recipes_using(self, ingredient_id: int) -> List[int]:
+        """
+        recipe_ids with a (non-zero) requirement for `ingredient_id`
+        """
+        j = self._ingredient_index.get(int(ingredient_id))
+        if j is None:
+            return []
+        return self.recipe_ids[np.unique(self.rows[self.cols == j])].tolist()
+
+    def _portions(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Portions for the recipes at matrix rows `rows` (default: all)
+        """
+        if rows is None:
+            rows = np.arange(len(self.recipe_ids))
+            lines = slice(None)
+        else:
+            lines = None
+
+        portions = np.zeros(len(rows), dtype=np.int64)
+        lengths = self._line_end[rows] - self._line_start[rows]
+        has_lines = lengths > 0
+        if not has_lines.any():
+            return portions
+
+        lengths = lengths[has_lines]
+        segment_starts = np.cumsum(lengths) - lengths
+        if lines is None:
+            # gather the line indices of every selected recipe, segment by segment
+            starts = self._line_start[rows][has_lines]
+            lines = np.arange(lengths.sum()) + np.repeat(
+                starts - segment_starts, lengths
+            )
+
+        ratios = self.stock[self.cols[lines]] / self.required[lines]
+        minimum = np.minimum.reduceat(ratios, segment_starts)
+        portions[has_lines] = np.floor(minimum).astype(np.int64)
+        return portions
+
+    def available_portions(
+        self, recipe_ids: Optional[Iterable[int]] = None
+    ) -> Dict[int, int]:
+        """
+        {recipe_id: available portions}, for all recipes or just `recipe_ids`
+        """
+        if recipe_ids is None:
+            portions = self._portions()
+            return dict(zip(self.recipe_ids.tolist(), portions.tolist()))
+
+        recipe_ids = [int(r) for r in recipe_ids]
+        known = [r for r in recipe_ids if r in self._recipe_index]
+        portions = self._portions(
+            np.asarray([self._recipe_index[r] for r in known], dtype=np.int64)
+        )
+        result = dict.fromkeys(recipe_ids, 0)
+        result.update(zip(known, portions.tolist()))
+        return result
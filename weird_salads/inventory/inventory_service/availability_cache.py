@@ -0,0 +1,218 @@
+"""
+Incrementally maintained availability cache
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+from weird_salads.inventory.inventory_service.availability import (
+    AvailabilityEngine,
+    to_litres,
+)
+from weird_salads.utils.engine import database_key, get_database_url
+
+__all__ = ["AvailabilityCache", "availability_cache", "availability_cache_for"]
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "availability_cache_pending"
+
+
+class AvailabilityCache:
+    """
+    Per-recipe available portions and per-ingredient stock totals (in litres).
+
+    Loaded lazily from a MenuRepository on first read. Stock changes are staged
+    against the session that made them and only applied once it commits (they
+    are dropped on rollback); each change recomputes just the recipes that use
+    the touched ingredient, via an ingredient -> recipes reverse index.
+
+    The cache is per-process, and per database (see `availability_cache_for`),
+    so it only sees this process's commits: it is off unless
+    AVAILABILITY_CACHE=1, which is only safe with a single API worker and no
+    writes from outside it (seed_db.py, compact_db.py), or call `invalidate()`
+    after those.
+
+    With `check=True` the MenuService verifies every read against a full
+    recompute from the database, logging mismatches.
+    """
+
+    def __init__(self, enabled: bool = True, check: bool = False):
+        self.enabled = enabled
+        self.check = check
+        self._lock = threading.RLock()
+        self._engine: Optional[AvailabilityEngine] = None
+        self._portions: Dict[int, int] = {}
+        self._ingredient_litres: Dict[int, float] = {}
+        self._recipes_by_ingredient: Dict[int, Set[int]] = {}
+        # bumped on every applied change, so a load racing a commit is discarded
+        self._generation = 0
+
+    # - loading
+    @staticmethod
+    def _compute(menu_repository) -> Tuple[AvailabilityEngine, Dict[int, float]]:
+        recipe_ids = [item.id for item in menu_repository.list()]
+        engine = AvailabilityEngine.from_requirements(
+            menu_repository.list_recipe_requirements(), recipe_ids=recipe_ids
+        )
+        ingredient_litres = {
+            ingredient_id: sum(to_litres(q, unit) for unit, q in totals)
+            for ingredient_id, totals in menu_repository.list_stock_totals().items()
+        }
+        engine.set_stock(ingredient_litres)
+        return engine, ingredient_litres
+
+    def load(self, menu_repository) -> None:
+        generation = self._generation
+        engine, ingredient_litres = self._compute(menu_repository)
+
+        recipes_by_ingredient = {
+            ingredient_id: set(engine.recipes_using(ingredient_id))
+            for ingredient_id in engine.ingredients
+        }
+        with self._lock:
+            if generation != self._generation:
+                logger.info("Stock changed while loading availability, retrying")
+                return
+            self._engine = engine
+            self._portions = engine.available_portions()
+            self._ingredient_litres = ingredient_litres
+            self._recipes_by_ingredient = recipes_by_ingredient
+
+    @property
+    def loaded(self) -> bool:
+        return self._engine is not None
+
+    def ensure_loaded(self, menu_repository, attempts: int = 3) -> None:
+        for _ in range(attempts):
+            if self.loaded:
+                return
+            self.load(menu_repository)
+
+    def invalidate(self) -> None:
+        """
+        Drop everything; the next read reloads from the database.
+        """
+        with self._lock:
+            self._engine = None
+            self._portions = {}
+            self._ingredient_litres = {}
+            self._recipes_by_ingredient = {}
+            self._generation += 1
+
+    # - reads (call `ensure_loaded` first)
+    def available_portions(self, recipe_id: int) -> int:
+        return self._portions.get(int(recipe_id), 0)
+
+    def all_available_portions(self) -> Dict[int, int]:
+        return dict(self._portions)
+
+    def ingredient_litres(self, ingredient_id: int) -> float:
+        return self._ingredient_litres.get(int(ingredient_id), 0.0)
+
+    # - writes
+    def stage(self, session, ingredient_id: int, litres: float) -> None:
+        """
+        Record a stock change (in litres) made in `session`, applied on commit
+        """
+        if not self.enabled:
+            return
+        pending: Optional[List[Tuple[int, float]]] = session.info.get(_PENDING_KEY)
+        if pending is None:
+            pending = session.info[_PENDING_KEY] = []
+            if not session.info.get("availability_cache_listening"):
+                session.info["availability_cache_listening"] = True
+                event.listen(session, "after_commit", self._after_commit)
+                event.listen(session, "after_rollback", self._after_rollback)
+        pending.append((int(ingredient_id), litres))
+
+    def _after_commit(self, session) -> None:
+        pending = session.info.pop(_PENDING_KEY, None)
+        if pending:
+            self.apply(pending)
+
+    def _after_rollback(self, session) -> None:
+        session.info.pop(_PENDING_KEY, None)
+
+    def apply(self, changes: List[Tuple[int, float]]) -> None:
+        """
+        Apply committed (ingredient_id, litres) changes, recomputing only the
+        recipes that use those ingredients.
+        """
+        with self._lock:
+            self._generation += 1
+            if self._engine is None:
+                return  # loads fresh from the database on next read
+
+            touched: Set[int] = set()
+            for ingredient_id, litres in changes:
+                total = self._ingredient_litres.get(ingredient_id, 0.0) + litres
+                self._ingredient_litres[ingredient_id] = max(total, 0.0)
+                self._engine.update_stock(
+                    ingredient_id, self._ingredient_litres[ingredient_id]
+                )
+                touched |= self._recipes_by_ingredient.get(ingredient_id, set())
+
+            if touched:
+                self._portions.update(self._engine.available_portions(touched))
+
+    # - consistency
+    def verify(self, menu_repository) -> Dict[int, Tuple[int, int]]:
+        """
+        Compare the cache with a full recompute from the database.
+
+        Returns {recipe_id: (cached, recomputed)} for every recipe that
+        disagrees, and logs a warning if there are any.
+        """
+        self.ensure_loaded(menu_repository)
+        engine, _ = self._compute(menu_repository)
+        expected = engine.available_portions()
+        with self._lock:
+            cached = dict(self._portions)
+        mismatches = {
+            recipe_id: (cached.get(recipe_id, 0), portions)
+            for recipe_id, portions in expected.items()
+            if cached.get(recipe_id, 0) != portions
+        }
+        if mismatches:
+            logger.warning(f"Availability cache is inconsistent: {mismatches}")
+        return mismatches
+
+
+availability_cache = AvailabilityCache(
+    enabled=os.environ.get("AVAILABILITY_CACHE", "0") == "1",
+    check=os.environ.get("AVAILABILITY_CACHE_CHECK", "0") == "1",
+)
+
+_caches: Dict[str, AvailabilityCache] = {}
+_caches_lock = threading.Lock()
+
+
+def availability_cache_for(session) -> AvailabilityCache:
+    """
+    The cache of the database behind `session` (each location's database
+    has its own); `availability_cache` is that of the first DATABASE_URL
+    database seen (if DATABASE_URL changes later, the new database gets a
+    cache of its own rather than sharing it)
+    """
+    database = database_key(session.bind.url)
+    cache = _caches.get(database)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(database)
+            if cache is None:
+                if database == database_key(get_database_url()) and not any(
+                    other is availability_cache for other in _caches.values()
+                ):
+                    cache = availability_cache
+                else:
+                    cache = AvailabilityCache(
+                        enabled=availability_cache.enabled,
+                        check=availability_cache.check,
+                    )
+                _caches[database] = cache
+    return cache
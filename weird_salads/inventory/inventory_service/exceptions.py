@@ -1,3 +1,6 @@
+from weird_salads.utils.exceptions import ConcurrencyError
+
+
 class MenuItemNotFoundError(Exception):
     pass
 
@@ -16,3 +19,7 @@ class IngredientNotFoundError(Exception):
 
 class InsufficientStockError(Exception):
     pass
+
+
+class StockConflictError(ConcurrencyError):
+    pass
@@ -2,8 +2,12 @@
 Classes
 """
 
+from weird_salads.api.schemas import UnitOfMeasure
+
 __all__ = [
+    "UNIT_CONVERSIONS_TO_LITRE",
     "SimpleMenuItem",
+    "MenuItemAvailability",
     "MenuItem",
     "MenuItemIngredient",
     "IngredientItem",
@@ -11,10 +15,23 @@ __all__ = [
 ]
 
 
+# How many of unit in one litre
+UNIT_CONVERSIONS_TO_LITRE = {
+    UnitOfMeasure.liter: 1,
+    UnitOfMeasure.deciliter: 10,
+    UnitOfMeasure.centiliter: 100,
+    UnitOfMeasure.milliliter: 1000,
+}
+
+
 # - MenuItem holds MenuItemIngredients
 # - SimpleMenuItem <- a simplified version of MenuItem sans ingredients
 # - MenuAvailabilityItem <- more complex MenuItem with availability info
+# the domain classes are slotted: no per-instance __dict__, so a page of
+# thousands of them stays small and quick to build
 class SimpleMenuItem:
+    __slots__ = ("id", "name", "description", "price", "created_on", "on_menu")
+
     def __init__(self, id, name, description, price, created_on, on_menu):
         self.name = name
         self.id = id
@@ -34,8 +51,47 @@ class SimpleMenuItem:
         }
 
 
+class MenuItemAvailability(SimpleMenuItem):
+    __slots__ = ("available_portions",)
+
+    def __init__(
+        self, id, name, description, price, created_on, on_menu, available_portions
+    ):
+        super().__init__(id, name, description, price, created_on, on_menu)
+        self.available_portions = available_portions
+
+    def dict(self):
+        result = super().dict()
+        result["available_portions"] = self.available_portions
+        return result
+
+
+class _ReadOnly:
+    """
+    Attributes are set once, in __init__, and can't be reassigned: MenuItem
+    trees are shared between requests by the menu tree cache
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f"{type(self).__name__}.{name} is read-only")
+        object.__setattr__(self, name, value)
+
+
 # RecipeItem holds a set of RecipeIngredient objects
-class MenuItem:
+class MenuItem(_ReadOnly):
+    __slots__ = (
+        "id",
+        "name",
+        "description",
+        "price",
+        "created_on",
+        "on_menu",
+        "ingredients",
+    )
+
     def __init__(
         self, id, name, description, price, created_on, on_menu, ingredients=None
     ):
@@ -46,7 +102,9 @@ class MenuItem:
         self.created_on = created_on
         self.on_menu = on_menu
         # Initialize ingredients as MenuItemIngredient instances from dictionaries
-        self.ingredients = [MenuItemIngredient(**item) for item in (ingredients or [])]
+        self.ingredients = tuple(
+            MenuItemIngredient(**item) for item in (ingredients or [])
+        )
 
     def dict(self):
         result = {
@@ -61,7 +119,9 @@ class MenuItem:
         return result
 
 
-class MenuItemIngredient:
+class MenuItemIngredient(_ReadOnly):
+    __slots__ = ("quantity", "unit", "ingredient")
+
     def __init__(self, quantity, unit, ingredient=None):
         self.quantity = quantity
         self.unit = unit
@@ -77,7 +137,9 @@ class MenuItemIngredient:
         return result
 
 
-class IngredientItem:
+class IngredientItem(_ReadOnly):
+    __slots__ = ("id", "name", "description")
+
     def __init__(self, id, name, description):
         self.id = id
         self.name = name
@@ -93,6 +155,17 @@ class IngredientItem:
 
 
 class StockItem:
+    __slots__ = (
+        "_order",
+        "_id",
+        "ingredient_id",
+        "unit",
+        "quantity",
+        "cost",
+        "delivery_date",
+        "created_on",
+    )
+
     def __init__(
         self,
         id,
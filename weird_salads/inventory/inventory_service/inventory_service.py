@@ -2,9 +2,17 @@
 Services
 """
 
-from typing import Any, Dict, List
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from weird_salads.api.schemas import UnitOfMeasure
+from weird_salads.inventory.inventory_service.availability import (
+    AvailabilityEngine,
+    to_litres,
+)
+from weird_salads.inventory.inventory_service.availability_cache import (
+    availability_cache_for,
+)
 from weird_salads.inventory.inventory_service.exceptions import (
     IngredientNotFoundError,
     InsufficientStockError,
@@ -12,25 +20,27 @@ from weird_salads.inventory.inventory_service.exceptions import (
     StockItemNotFoundError,
 )
 from weird_salads.inventory.inventory_service.inventory import (
+    UNIT_CONVERSIONS_TO_LITRE,
     MenuItem,
+    MenuItemAvailability,
     MenuItemIngredient,
+    StockItem,
 )
 from weird_salads.inventory.repository.inventory_repository import MenuRepository
+from weird_salads.utils.pagination import decode_cursor, split_page, to_naive_utc
 
-__all__ = ["MenuService", "UNIT_CONVERSIONS_TO_LITRE"]
+__all__ = ["MenuService", "UNIT_CONVERSIONS_TO_LITRE", "AVAILABILITY_ENGINE"]
 
-# How many of unit in one litre
-UNIT_CONVERSIONS_TO_LITRE = {
-    UnitOfMeasure.liter: 1,
-    UnitOfMeasure.deciliter: 10,
-    UnitOfMeasure.centiliter: 100,
-    UnitOfMeasure.milliliter: 1000,
-}
+# "numpy" (AvailabilityEngine) or "sql" (single aggregate query) for whole-menu
+# availability
+AVAILABILITY_ENGINE = os.environ.get("AVAILABILITY_ENGINE", "numpy")
 
 
 class MenuService:
     def __init__(self, menu_repository: MenuRepository):
         self.menu_repository = menu_repository
+        # each location's database has its own (see utils/sharding.py)
+        self.availability_cache = availability_cache_for(menu_repository.session)
 
     # for a simple representation
     def get(self, item_id):
@@ -48,28 +58,110 @@ class MenuService:
     def list_menu(self):
         return self.menu_repository.list()
 
-    # Fetch stock data for an ingredient
+    def list_menu_availability(
+        self, on_menu: Optional[bool] = None
+    ) -> List[MenuItemAvailability]:
+        """
+        Available portions for every menu item.
+
+        Read from the availability cache when enabled, otherwise computed by
+        the AvailabilityEngine over the whole catalogue, or by a single
+        aggregate query (AVAILABILITY_ENGINE="sql").
+        """
+        if AVAILABILITY_ENGINE == "sql" and not self.availability_cache.enabled:
+            return self.menu_repository.list_availability(on_menu=on_menu)
+
+        menu_items = self.menu_repository.list()
+        if self.availability_cache.enabled:
+            self.availability_cache.ensure_loaded(self.menu_repository)
+            portions = self.availability_cache.all_available_portions()
+            self._check_cache()
+        else:
+            portions = self._compute_portions(
+                menu_items,
+                self.menu_repository.list_recipe_requirements(),
+                self.menu_repository.list_stock_totals(),
+            )
+        return self._menu_availability(menu_items, portions, on_menu)
+
+    @staticmethod
+    def _compute_portions(menu_items, requirements, stock_totals) -> Dict[int, int]:
+        engine = AvailabilityEngine.from_requirements(
+            requirements, recipe_ids=[item.id for item in menu_items]
+        )
+        engine.set_stock(
+            {
+                ingredient_id: sum(to_litres(q, unit) for unit, q in totals)
+                for ingredient_id, totals in stock_totals.items()
+            }
+        )
+        return engine.available_portions()
+
+    @staticmethod
+    def _menu_availability(
+        menu_items, portions: Dict[int, int], on_menu: Optional[bool] = None
+    ) -> List[MenuItemAvailability]:
+        return [
+            MenuItemAvailability(
+                **item.dict(), available_portions=portions.get(item.id, 0)
+            )
+            for item in menu_items
+            if on_menu is None or item.on_menu == on_menu
+        ]
+
+    def _check_cache(self) -> None:
+        if self.availability_cache.check:
+            self.availability_cache.verify(self.menu_repository)
+
+    # Fetch stock totals for every ingredient in a recipe
     def _fetch_stock_data(
-        self, ingredient_id: int, required_unit: UnitOfMeasure
-    ) -> float:
+        self, item_id: int, recipe_ingredients: List[MenuItemIngredient]
+    ) -> Dict[int, float]:
         """
-        Fetch the stock data for an ingredient_id and convert to the required unit.
+        Total stock per ingredient_id (in the recipe's unit for that ingredient),
+        from the availability cache or a single grouped query over the recipe's
+        ingredients.
         """
-        try:
-            stock_items = self.get_ingredient(ingredient_id)
-            total_quantity_in_required_unit = sum(
-                self._convert_to_unit(item.quantity, item.unit, required_unit)
-                for item in stock_items
+        if self.availability_cache.enabled:
+            self.availability_cache.ensure_loaded(self.menu_repository)
+            return self._cached_stock_data(recipe_ingredients)
+        return self._stock_data(
+            recipe_ingredients, self.menu_repository.get_recipe_stock_totals(item_id)
+        )
+
+    def _cached_stock_data(
+        self, recipe_ingredients: List[MenuItemIngredient]
+    ) -> Dict[int, float]:
+        return {
+            ri.ingredient.id: self._convert_to_unit(
+                self.availability_cache.ingredient_litres(ri.ingredient.id),
+                UnitOfMeasure.liter,
+                ri.unit,
             )
-            return total_quantity_in_required_unit
-        except Exception as e:
-            print(f"Error fetching stock data: {e}")
-            return 0
+            for ri in recipe_ingredients
+        }
+
+    def _stock_data(
+        self, recipe_ingredients: List[MenuItemIngredient], totals_by_unit
+    ) -> Dict[int, float]:
+        return {
+            ri.ingredient.id: sum(
+                (
+                    self._convert_to_unit(quantity, unit, ri.unit)
+                    for unit, quantity in totals_by_unit.get(ri.ingredient.id, [])
+                ),
+                0.0,
+            )
+            for ri in recipe_ingredients
+        }
 
     # Convert quantity from one unit to another
     def _convert_to_unit(
         self, quantity: float, from_unit: UnitOfMeasure, to_unit: UnitOfMeasure
     ) -> float:
+        # units come from either the API or SQLAlchemy Enum, compare on value
+        from_unit = UnitOfMeasure(getattr(from_unit, "value", from_unit))
+        to_unit = UnitOfMeasure(getattr(to_unit, "value", to_unit))
         if from_unit == to_unit:
             return quantity
         quantity_in_litres = quantity / UNIT_CONVERSIONS_TO_LITRE[from_unit]
@@ -77,36 +169,48 @@ class MenuService:
 
     # Calculate available portions based on recipe ingredients
     def _calculate_available_portions(
-        self, recipe_ingredients: List[MenuItemIngredient]
-    ) -> float:
-        available_portions = float("inf")
-        for ri in recipe_ingredients:
-            ingredient_id = ri.ingredient.id
-            required_quantity = ri.quantity
-            required_unit = ri.unit
-            try:
-                # !TODO duplicated code
-                total_quantity_in_stock = self._fetch_stock_data(
-                    ingredient_id, required_unit
+        self,
+        recipe_ingredients: List[MenuItemIngredient],
+        stock_totals: Dict[int, float],
+    ) -> int:
+        engine = AvailabilityEngine.from_requirements(
+            [(0, ri.ingredient.id, ri.quantity, ri.unit) for ri in recipe_ingredients],
+            recipe_ids=[0],
+        )
+        engine.set_stock(
+            {
+                ri.ingredient.id: to_litres(
+                    stock_totals.get(ri.ingredient.id, 0), ri.unit
                 )
-                if required_quantity > 0:
-                    portions_based_on_ingredient = (
-                        total_quantity_in_stock // required_quantity
-                    )
-                    available_portions = min(
-                        available_portions, portions_based_on_ingredient
-                    )
-            except Exception as e:
-                print(f"Error processing ingredient ID {ingredient_id}: {e}")
-                available_portions = 0
-                break
-        return available_portions
+                for ri in recipe_ingredients
+            }
+        )
+        return engine.available_portions([0])[0]
 
     # Get availability of a recipe item
     def get_recipe_item_availability(self, item_id: int) -> Dict[str, Any]:
         menu_item_with_ingredients = self.get_item(item_id)
         ingredients = menu_item_with_ingredients.ingredients
+        stock_totals = self._fetch_stock_data(item_id, ingredients)
 
+        if self.availability_cache.enabled:
+            available_portions = self.availability_cache.available_portions(item_id)
+            self._check_cache()
+        else:
+            available_portions = self._calculate_available_portions(
+                ingredients, stock_totals
+            )
+
+        return self._availability(
+            menu_item_with_ingredients, stock_totals, available_portions
+        )
+
+    @staticmethod
+    def _availability(
+        menu_item_with_ingredients: MenuItem,
+        stock_totals: Dict[int, float],
+        available_portions: int,
+    ) -> Dict[str, Any]:
         ingredient_availability = [
             {
                 "ingredient": {
@@ -115,14 +219,12 @@ class MenuService:
                     "description": ri.ingredient.description,
                 },
                 "required_quantity": ri.quantity,
-                "available_quantity": self._fetch_stock_data(ri.ingredient.id, ri.unit),
+                "available_quantity": stock_totals[ri.ingredient.id],
                 "unit": ri.unit,
             }
-            for ri in ingredients
+            for ri in menu_item_with_ingredients.ingredients
         ]
 
-        available_portions = self._calculate_available_portions(ingredients)
-
         return {
             "id": menu_item_with_ingredients.id,
             "name": menu_item_with_ingredients.name,
@@ -143,7 +245,18 @@ class MenuService:
         raise IngredientNotFoundError(f"items with id {ingredient_id} not found")  # fix
 
     def ingest_stock(self, item):
-        return self.menu_repository.add_stock(item)
+        # stored as naive UTC, so FIFO and keyset order compare like with like
+        item = dict(item)
+        for key in ("delivery_date", "created_on"):
+            if key in item:
+                item[key] = to_naive_utc(item[key])
+        stock_item = self.menu_repository.add_stock(item)
+        self.availability_cache.stage(
+            self.menu_repository.session,
+            item["ingredient_id"],
+            to_litres(item["quantity"], item["unit"]),
+        )
+        return stock_item
 
     # ---- stock_id queries
     def get_stock_item(self, stock_id: str):
@@ -152,46 +265,79 @@ class MenuService:
             return stock_item
         raise StockItemNotFoundError(f"stock with id {stock_id} not found")  # fix
 
-    def list_stock(self):  # needs options for filtering
-        return self.menu_repository.list_stock()
-
-    # -- stock deduction
-    # !TODO check units
-    def deduct_stock(self, ingredient_id: int, quantity: float, unit: UnitOfMeasure):
+    def list_stock(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        ingredient_id: Optional[int] = None,
+        in_stock: Optional[bool] = None,
+    ) -> Tuple[List[StockItem], Optional[str]]:
         """
-        Deduct a specific quantity of stock for a given item.
+        A page of stock (oldest delivery first), and the cursor of the next page
         """
-        # Fetch the stock item(s) for the given item_id
-        stock_items = self.menu_repository.get_ingredient(ingredient_id)
+        stock = self.menu_repository.list_stock(
+            None if limit is None else limit + 1,
+            after=decode_cursor(cursor) if cursor else None,
+            ingredient_id=ingredient_id,
+            in_stock=in_stock,
+        )
+        return split_page(stock, limit, key=lambda item: (item.delivery_date, item.id))
 
-        if not stock_items:
-            raise StockItemNotFoundError(
-                f"No stock found for ingredient ID {ingredient_id}"
-            )
-
-        total_deducted = 0.0
-        quantity_to_deduct = quantity
+    def export_stock(
+        self, ingredient_id: Optional[int] = None, in_stock: Optional[bool] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every matching stock lot (oldest delivery first) as a dict
+        """
+        return self.menu_repository.stream_stock(
+            ingredient_id=ingredient_id, in_stock=in_stock
+        )
 
-        for stock_item in stock_items:
-            if quantity_to_deduct <= 0:
-                break
+    def archive_depleted_stock(self, batch_size: int) -> int:
+        """
+        Move up to `batch_size` depleted lots to the archive
+        """
+        return self.menu_repository.archive_depleted_stock(batch_size)
 
-            available_quantity = stock_item.quantity
-            # !TODO fix the assumption that the quantity is in the stocks unit
+    # -- stock deduction
+    def deduct_stock(self, ingredient_id: int, quantity: float, unit: UnitOfMeasure):
+        """
+        Deduct a specific quantity (in `unit`) of stock for a given item.
+        """
+        return self.deduct_stocks([(ingredient_id, quantity, unit)])[0]
 
-            quantity_deducted = min(quantity_to_deduct, available_quantity)
-            # Deduct the quantity
-            stock_item.quantity -= quantity_deducted
-            total_deducted += quantity_deducted
-            quantity_to_deduct -= quantity_deducted
+    def deduct_stocks(
+        self, deductions: List[Tuple[int, float, UnitOfMeasure]]
+    ) -> List[float]:
+        """
+        Deduct every (ingredient_id, quantity, unit) together: either all of
+        them are deducted or, if any ingredient is short, none are.
 
-            # !TODO If stock item is depleted, remove it
+        Returns the quantity deducted for each.
+        """
+        # one windowed read of the lots they draw from, one UPDATE of just those
+        draws = self.menu_repository.deduct_stocks_fifo(deductions)
 
-        if quantity_to_deduct > 0:
+        for ingredient_id, quantity, unit in deductions:
+            if draws[int(ingredient_id)] is not None:
+                continue
+            if not self.menu_repository.get_ingredient(ingredient_id):
+                raise StockItemNotFoundError(
+                    f"No stock found for ingredient ID {ingredient_id}"
+                )
             raise InsufficientStockError(
-                f"Not enough stock available to deduct {quantity_to_deduct} units"
+                f"Not enough stock available to deduct {quantity} "
+                f"{getattr(unit, 'value', unit)}"
             )
 
-        self.menu_repository.update_ingredient(stock_items)
+        for ingredient_id, lots in draws.items():
+            self.availability_cache.stage(
+                self.menu_repository.session,
+                ingredient_id,
+                -sum(to_litres(drawn, lot_unit) for lot_unit, drawn in lots),
+            )
 
-        return total_deducted
+        return [
+            quantity if draws[int(ingredient_id)] else 0.0
+            for ingredient_id, quantity, _ in deductions
+        ]
@@ -0,0 +1,142 @@
+"""
+Async (sqlalchemy.ext.asyncio) counterpart of the MenuRepository reads
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from weird_salads.inventory.inventory_service.inventory import (
+    MenuItem,
+    MenuItemAvailability,
+    SimpleMenuItem,
+    StockItem,
+)
+from weird_salads.inventory.repository.inventory_repository import (
+    _SIMPLE_MENU_ITEM_COLUMNS,
+    _STOCK_ITEM_COLUMNS,
+    MenuRepository,
+    _availability_query,
+    _group_stock_totals,
+    _menu_item_from_tree,
+    _recipe_ingredients_criterion,
+    _recipe_requirements,
+    _recipe_requirements_query,
+    _stock_query,
+    _stock_totals_query,
+)
+from weird_salads.inventory.repository.menu_tree_cache import menu_tree_cache
+from weird_salads.inventory.repository.models import (
+    MenuModel,
+    RecipeIngredientModel,
+    StockModel,
+    UnitOfMeasure,
+)
+from weird_salads.utils.engine import database_key
+
+__all__ = ["AsyncMenuRepository"]
+
+
+class AsyncMenuRepository:
+    def __init__(self, session):
+        self.session = session  # AsyncSession
+
+    async def run_sync(self, fn):
+        """
+        Call `fn(MenuRepository)` on this session's connection, for code that
+        only has a sync implementation (e.g. loading the availability cache).
+        """
+        return await self.session.run_sync(lambda session: fn(MenuRepository(session)))
+
+    async def get(self, id):
+        result = await self.session.execute(
+            select(*_SIMPLE_MENU_ITEM_COLUMNS).where(MenuModel.id == id)
+        )
+        row = result.first()
+        if row is not None:
+            return SimpleMenuItem(*row)
+
+    async def get_tree(self, id: int) -> MenuItem:
+        database = database_key(self.session.bind.url)
+        menu_item = menu_tree_cache.get(database, id)
+        if menu_item is not None:
+            return menu_item
+
+        generation = menu_tree_cache.generation
+        result = await self.session.execute(
+            select(MenuModel)
+            .options(
+                joinedload(MenuModel.ingredients).joinedload(
+                    RecipeIngredientModel.ingredient
+                )
+            )
+            .where(MenuModel.id == id)
+        )
+        tree = result.unique().scalars().first()
+        if tree is not None:
+            menu_item = _menu_item_from_tree(tree)
+            menu_tree_cache.put(database, id, menu_item, generation)
+            return menu_item
+
+    async def list(self, limit=None):
+        result = await self.session.execute(
+            select(*_SIMPLE_MENU_ITEM_COLUMNS).limit(limit)
+        )
+        return [SimpleMenuItem(*row) for row in result]
+
+    async def list_availability(
+        self, on_menu: Optional[bool] = None
+    ) -> List[MenuItemAvailability]:
+        result = await self.session.execute(_availability_query(on_menu))
+        return [MenuItemAvailability(*row) for row in result]
+
+    # - Stock-related
+    async def get_ingredient(self, id: int) -> List[StockItem]:
+        result = await self.session.execute(
+            select(*_STOCK_ITEM_COLUMNS).where(StockModel.ingredient_id == int(id))
+        )
+        ingredients = [StockItem(*row) for row in result]
+        if ingredients:
+            return ingredients
+
+    async def get_recipe_stock_totals(
+        self, recipe_id: int
+    ) -> Dict[int, List[Tuple[UnitOfMeasure, float]]]:
+        result = await self.session.execute(
+            _stock_totals_query(_recipe_ingredients_criterion(recipe_id))
+        )
+        return _group_stock_totals(result)
+
+    async def list_stock_totals(self) -> Dict[int, List[Tuple[UnitOfMeasure, float]]]:
+        return _group_stock_totals(await self.session.execute(_stock_totals_query()))
+
+    async def list_recipe_requirements(
+        self,
+    ) -> List[Tuple[int, int, float, UnitOfMeasure]]:
+        result = await self.session.execute(_recipe_requirements_query())
+        return _recipe_requirements(result)
+
+    async def get_stock(self, id: str):
+        result = await self.session.execute(
+            select(*_STOCK_ITEM_COLUMNS).where(StockModel.id == id)
+        )
+        row = result.first()
+        if row is not None:
+            return StockItem(*row)
+
+    async def list_stock(
+        self, limit: Optional[int] = None, **filters
+    ) -> List[StockItem]:
+        result = await self.session.execute(_stock_query(limit, **filters))
+        return [StockItem(*row) for row in result]
+
+    async def stream_stock(
+        self, batch_size: int = 1000, **filters
+    ) -> AsyncIterator[Dict[str, Any]]:
+        query = _stock_query(columns=(StockModel.__table__,), **filters)
+        result = await self.session.stream(
+            query.execution_options(yield_per=batch_size)
+        )
+        async for row in result.mappings():
+            yield dict(row)
@@ -2,24 +2,265 @@
 Building on a Repository Pattern
 """
 
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from typing import List
-
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    case,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    tuple_,
+    update,
+)
 from sqlalchemy.orm import joinedload
 
+from weird_salads.inventory.inventory_service.exceptions import StockConflictError
 from weird_salads.inventory.inventory_service.inventory import (
     MenuItem,
+    MenuItemAvailability,
     SimpleMenuItem,
     StockItem,
 )
+from weird_salads.inventory.repository.menu_tree_cache import menu_tree_cache
 from weird_salads.inventory.repository.models import (
+    MILLILITRES_PER_UNIT,
     MenuModel,
     RecipeIngredientModel,
+    StockArchiveModel,
     StockModel,
+    UnitOfMeasure,
+    to_millilitres,
 )
+from weird_salads.utils.data_versions import STOCK, data_versions
+from weird_salads.utils.engine import database_key
 
 __all__ = ["MenuRepository"]
 
+# columns in the order of the SimpleMenuItem / StockItem constructors, so
+# rows map straight onto them (no ORM objects or intermediate dicts)
+_SIMPLE_MENU_ITEM_COLUMNS = (
+    MenuModel.id,
+    MenuModel.name,
+    MenuModel.description,
+    MenuModel.price,
+    MenuModel.created_on,
+    MenuModel.on_menu,
+)
+_STOCK_ITEM_COLUMNS = (
+    StockModel.id,
+    StockModel.ingredient_id,
+    StockModel.unit,
+    StockModel.quantity,
+    StockModel.cost,
+    StockModel.delivery_date,
+    StockModel.created_on,
+)
+
+# slack (in millilitres) for float error when checking a deduction is covered
+_DEDUCTION_TOLERANCE_ML = 1e-6
+
+
+def _menu_item_from_tree(tree: MenuModel) -> MenuItem:
+    """
+    MenuItem (with ingredients) from a MenuModel with ingredients loaded
+    """
+    # !TODO tidy this up, it's not elegant
+    # Prepare ingredients data as dictionaries for MenuItemIngredient instances
+    ingredients = [
+        {
+            "quantity": ri.quantity,
+            "unit": ri.unit,
+            "ingredient": {
+                "id": ri.ingredient.id,
+                "name": ri.ingredient.name,
+                "description": ri.ingredient.description or "",
+            },
+        }
+        for ri in tree.ingredients
+    ]
+
+    # Create a MenuItem instance
+    return MenuItem(
+        id=tree.id,
+        name=tree.name,
+        description=tree.description,
+        price=tree.price,
+        created_on=tree.created_on,
+        on_menu=tree.on_menu,
+        ingredients=ingredients,
+    )
+
+
+def _availability_query(on_menu: Optional[bool] = None):
+    """
+    SELECT of every menu item's columns plus its available portions.
+
+    Stock is summed (in millilitres) per ingredient, joined to each recipe
+    line, and the minimum of floor(stock / required) is taken per item.
+    """
+    stock_totals = (
+        select(
+            StockModel.ingredient_id,
+            func.sum(StockModel.quantity_ml).label("millilitres"),
+        )
+        .where(StockModel.quantity_ml > 0)
+        .group_by(StockModel.ingredient_id)
+        .subquery()
+    )
+    # quantities are non-negative, so truncating is the same as floor
+    portions = cast(
+        func.coalesce(stock_totals.c.millilitres, 0.0)
+        / RecipeIngredientModel.quantity_ml,
+        Integer,
+    )
+
+    query = (
+        select(
+            MenuModel.id,
+            MenuModel.name,
+            MenuModel.description,
+            MenuModel.price,
+            MenuModel.created_on,
+            MenuModel.on_menu,
+            func.coalesce(func.min(portions), 0).label("available_portions"),
+        )
+        .outerjoin(
+            RecipeIngredientModel,
+            (RecipeIngredientModel.recipe_id == MenuModel.id)
+            & (RecipeIngredientModel.quantity_ml > 0),
+        )
+        .outerjoin(
+            stock_totals,
+            stock_totals.c.ingredient_id == RecipeIngredientModel.ingredient_id,
+        )
+        .group_by(MenuModel.id)
+        .order_by(MenuModel.id)
+    )
+    if on_menu is not None:
+        query = query.where(MenuModel.on_menu == on_menu)
+    return query
+
+
+def _stock_totals_query(*criteria):
+    """
+    SELECT ingredient_id, SUM(quantity_ml) ... GROUP BY ingredient_id
+
+    Only live lots are read (idx_stock_ingredient_quantity_ml covers it), so
+    ingredients with no stock left are absent.
+    """
+    return (
+        select(StockModel.ingredient_id, func.sum(StockModel.quantity_ml))
+        .where(StockModel.quantity_ml > 0, *criteria)
+        .group_by(StockModel.ingredient_id)
+    )
+
+
+def _recipe_ingredients_criterion(recipe_id: int):
+    """
+    stock.ingredient_id IN (the ingredients of recipe `recipe_id`)
+    """
+    recipe_ingredient_ids = select(RecipeIngredientModel.ingredient_id).where(
+        RecipeIngredientModel.recipe_id == recipe_id
+    )
+    return StockModel.ingredient_id.in_(recipe_ingredient_ids)
+
+
+def _group_stock_totals(rows) -> Dict[int, List[Tuple[UnitOfMeasure, float]]]:
+    return {
+        ingredient_id: [(UnitOfMeasure.milliliter, millilitres)]
+        for ingredient_id, millilitres in rows
+    }
+
+
+def _recipe_requirements_query():
+    """
+    (recipe_id, ingredient_id, quantity_ml) for every recipe line
+    """
+    return select(
+        RecipeIngredientModel.recipe_id,
+        RecipeIngredientModel.ingredient_id,
+        RecipeIngredientModel.quantity_ml,
+    )
+
+
+def _recipe_requirements(rows) -> List[Tuple[int, int, float, UnitOfMeasure]]:
+    return [
+        (recipe_id, ingredient_id, millilitres, UnitOfMeasure.milliliter)
+        for recipe_id, ingredient_id, millilitres in rows
+    ]
+
+
+def _stock_query(
+    limit: Optional[int] = None,
+    after: Optional[Tuple[datetime, str]] = None,
+    ingredient_id: Optional[int] = None,
+    in_stock: Optional[bool] = None,
+    columns=_STOCK_ITEM_COLUMNS,
+):
+    """
+    Stock, oldest delivery first (the FIFO order), keyset-paginated on
+    (delivery_date, id).
+
+    `after` is the (delivery_date, id) of the last lot of the previous page;
+    `in_stock` keeps only lots with (True) or without (False) any quantity.
+    `columns` are those of a StockItem, or e.g. (StockModel.__table__,) for
+    every column.
+    """
+    query = select(*columns)
+    if ingredient_id is not None:
+        query = query.where(StockModel.ingredient_id == ingredient_id)
+    if in_stock is not None:
+        query = query.where(
+            StockModel.quantity_ml > 0 if in_stock else StockModel.quantity_ml == 0
+        )
+    if after is not None:
+        query = query.where(tuple_(StockModel.delivery_date, StockModel.id) > after)
+    return query.order_by(StockModel.delivery_date, StockModel.id).limit(limit)
+
+
+def _fifo_plan_query(quantities_ml: Dict[int, float]):
+    """
+    The lots FIFO deductions of `quantities_ml` ({ingredient_id: millilitres})
+    draw from, ordered by ingredient and then delivery.
+
+    A running sum of quantity_ml over each ingredient's non-empty lots in
+    (delivery_date, id) order (idx_stock_live_ingredient_delivery_date) keeps the
+    lots where the stock delivered before them doesn't already cover the
+    ingredient's quantity; `total` is the ingredient's whole stock, in
+    millilitres.
+    """
+    order = (StockModel.delivery_date, StockModel.id)
+    lots = (
+        select(
+            StockModel.id,
+            StockModel.ingredient_id,
+            StockModel.unit,
+            StockModel.quantity_ml,
+            StockModel.version,
+            func.sum(StockModel.quantity_ml)
+            .over(partition_by=StockModel.ingredient_id, order_by=order)
+            .label("running"),
+            func.sum(StockModel.quantity_ml)
+            .over(partition_by=StockModel.ingredient_id)
+            .label("total"),
+        )
+        .where(StockModel.ingredient_id.in_(quantities_ml))
+        .where(StockModel.quantity_ml > 0)
+        .subquery()
+    )
+    needed = case(quantities_ml, value=lots.c.ingredient_id)
+    return (
+        select(lots)
+        .where(lots.c.running - lots.c.quantity_ml < needed)
+        .order_by(lots.c.ingredient_id, lots.c.running)
+    )
+
 
 class MenuRepository:
     def __init__(self, session):
@@ -34,10 +275,11 @@ class MenuRepository:
         )  # noqa: E501
 
     def get(self, id):
-        order = self._get(id)
-        if order is not None:
-            # do we want to return an instance of a SQLalchemy model?
-            return SimpleMenuItem(**order.dict())
+        row = self.session.execute(
+            select(*_SIMPLE_MENU_ITEM_COLUMNS).where(MenuModel.id == id)
+        ).first()
+        if row is not None:
+            return SimpleMenuItem(*row)
 
     def _get_tree(self, id):
         return (
@@ -52,43 +294,36 @@ class MenuRepository:
         )
 
     def get_tree(self, id: int) -> MenuItem:
+        """
+        The menu item with its ingredients, from the menu tree cache when
+        it's there (the MenuItem is shared, and read-only)
+        """
+        database = database_key(self.session.bind.url)
+        menu_item = menu_tree_cache.get(database, id)
+        if menu_item is not None:
+            return menu_item
+
         # Fetch the tree data
+        generation = menu_tree_cache.generation
         tree = self._get_tree(id)
 
-        # !TODO tidy this up, it's not elegant
         if tree is not None:
-            # Prepare ingredients data as dictionaries for MenuItemIngredient instances
-            ingredients = [
-                {
-                    "quantity": ri.quantity,
-                    "unit": ri.unit,
-                    "ingredient": {
-                        "id": ri.ingredient.id,
-                        "name": ri.ingredient.name,
-                        "description": ri.ingredient.description or "",
-                    },
-                }
-                for ri in tree.ingredients
-            ]
-
-            # Create a MenuItem instance
-            menu_item = MenuItem(
-                id=tree.id,
-                name=tree.name,
-                description=tree.description,
-                price=tree.price,
-                created_on=tree.created_on,
-                on_menu=tree.on_menu,
-                ingredients=ingredients,
-            )
-
-            # Convert MenuItem to a dictionary and return it
+            menu_item = _menu_item_from_tree(tree)
+            menu_tree_cache.put(database, id, menu_item, generation)
             return menu_item
 
     def list(self, limit=None):
-        query = self.session.query(MenuModel)
-        records = query.limit(limit).all()
-        return [SimpleMenuItem(**record.dict()) for record in records]
+        query = select(*_SIMPLE_MENU_ITEM_COLUMNS).limit(limit)
+        return [SimpleMenuItem(*row) for row in self.session.execute(query)]
+
+    def list_availability(
+        self, on_menu: Optional[bool] = None
+    ) -> List[MenuItemAvailability]:
+        """
+        Available portions for every menu item in one query.
+        """
+        query = _availability_query(on_menu)
+        return [MenuItemAvailability(*row) for row in self.session.execute(query)]
 
     def update(self, id):
         pass
@@ -105,51 +340,179 @@ class MenuRepository:
         )  # noqa: E501
 
     def get_ingredient(self, id: int) -> List[StockItem]:
-        ingredients = self._get_ingredient(id)
+        rows = self.session.execute(
+            select(*_STOCK_ITEM_COLUMNS).where(StockModel.ingredient_id == int(id))
+        )
+        ingredients = [StockItem(*row) for row in rows]
         if ingredients:  # is not None:
-            return [StockItem(**ingredient.dict()) for ingredient in ingredients]
+            return ingredients
+
+    def _stock_totals(self, *criteria) -> Dict[int, List[Tuple[UnitOfMeasure, float]]]:
+        return _group_stock_totals(self.session.execute(_stock_totals_query(*criteria)))
+
+    def get_recipe_stock_totals(
+        self, recipe_id: int
+    ) -> Dict[int, List[Tuple[UnitOfMeasure, float]]]:
+        """
+        Stock totals for every ingredient in a recipe, in millilitres.
+
+        One `GROUP BY ingredient_id` query over quantity_ml, rather than
+        loading every StockItem for each ingredient.
+        """
+        return self._stock_totals(_recipe_ingredients_criterion(recipe_id))
+
+    def list_stock_totals(self) -> Dict[int, List[Tuple[UnitOfMeasure, float]]]:
+        """
+        Stock totals for every ingredient, in millilitres.
+        """
+        return self._stock_totals()
+
+    def list_recipe_requirements(
+        self,
+    ) -> List[Tuple[int, int, float, UnitOfMeasure]]:
+        """
+        (recipe_id, ingredient_id, quantity, unit) for every recipe line, with
+        the quantity in millilitres.
+        """
+        return _recipe_requirements(self.session.execute(_recipe_requirements_query()))
 
     def _get_stock(self, id: str):
         return self.session.query(StockModel).filter(StockModel.id == id).first()
 
     def get_stock(self, id: str):
-        order = self._get_stock(id)
-        if order is not None:
-            return StockItem(**order.dict())
+        row = self.session.execute(
+            select(*_STOCK_ITEM_COLUMNS).where(StockModel.id == id)
+        ).first()
+        if row is not None:
+            return StockItem(*row)
 
-    def list_stock(self, limit=None):  # need to implement limits
-        query = self.session.query(StockModel)
-        records = query.all()
-        return [StockItem(**record.dict()) for record in records]
-        # return [Ingredient(**record.dict()) for record in records]
-        # should this return an IngredientItemsModel?
+    def list_stock(self, limit: Optional[int] = None, **filters) -> List[StockItem]:
+        """
+        Stock, oldest delivery first (see `_stock_query` for `filters`)
+        """
+        rows = self.session.execute(_stock_query(limit, **filters))
+        return [StockItem(*row) for row in rows]
+
+    def stream_stock(
+        self, batch_size: int = 1000, **filters
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Every matching stock lot as a plain dict, fetched `batch_size` rows at
+        a time from a server-side cursor (nothing is held in the session)
+        """
+        query = _stock_query(columns=(StockModel.__table__,), **filters)
+        result = self.session.execute(query.execution_options(yield_per=batch_size))
+        for row in result.mappings():
+            yield dict(row)
 
     def add_stock(self, item):
-        print(item)
         record = StockModel(**item)
         self.session.add(record)
+        data_versions.stage(self.session, STOCK)
         return StockItem(**record.dict(), order_=record)
 
-    def _convert_to_model(self, stock_item: StockItem) -> StockModel:
-        return StockModel(
-            id=stock_item.id,
-            ingredient_id=stock_item.ingredient_id,
-            unit=stock_item.unit,
-            quantity=stock_item.quantity,
-            cost=stock_item.cost,
-            delivery_date=stock_item.delivery_date,
-            created_on=stock_item.created_on,
-        )
+    def deduct_stocks_fifo(
+        self, deductions: Iterable[Tuple[int, float, Any]]
+    ) -> Dict[int, Optional[List[Tuple[UnitOfMeasure, float]]]]:
+        """
+        Deduct every (ingredient_id, quantity, unit) from that ingredient's
+        lots, oldest delivery first, whatever units the lots are held in.
 
-    def update_ingredient(self, stock_items: List[StockItem]) -> None:
+        One windowed read plans every ingredient's draws and one UPDATE applies
+        them. Returns {ingredient_id: (unit, quantity drawn) for each lot drawn
+        from}, with None for every ingredient whose lots don't hold the
+        (summed) quantity, in which case nothing is updated.
+
+        The UPDATE is a compare-and-swap on each lot's `version`: if another
+        transaction deducted from any of the lots since they were read,
+        StockConflictError is raised (and the unit of work can be retried).
         """
-        Update stock items in the session.
+        quantities_ml: Dict[int, float] = {}
+        for ingredient_id, quantity, unit in deductions:
+            ingredient_id = int(ingredient_id)
+            quantities_ml[ingredient_id] = quantities_ml.get(
+                ingredient_id, 0.0
+            ) + to_millilitres(quantity, unit)
+
+        draws: Dict[int, Optional[List[Tuple[UnitOfMeasure, float]]]] = {
+            ingredient_id: [] for ingredient_id in quantities_ml
+        }
+        quantities_ml = {k: v for k, v in quantities_ml.items() if v > 0}
+        if not quantities_ml:
+            return draws
+
+        plans: Dict[int, list] = {}
+        for lot in self.session.execute(_fifo_plan_query(quantities_ml)):
+            plans.setdefault(lot.ingredient_id, []).append(lot)
+
+        new_quantities = {}
+        new_quantities_ml = {}
+        versions = {}
+        for ingredient_id, quantity_ml in quantities_ml.items():
+            plan = plans.get(ingredient_id)
+            if not plan or plan[0].total < quantity_ml - _DEDUCTION_TOLERANCE_ML:
+                draws[ingredient_id] = None
+                continue
+            for lot in plan:
+                drawn_ml = min(
+                    lot.quantity_ml, quantity_ml - (lot.running - lot.quantity_ml)
+                )
+                per_unit = MILLILITRES_PER_UNIT[lot.unit]
+                draws[ingredient_id].append((lot.unit, drawn_ml / per_unit))
+                # don't leave float dust behind in an emptied lot
+                remaining_ml = lot.quantity_ml - drawn_ml
+                if remaining_ml < _DEDUCTION_TOLERANCE_ML:
+                    remaining_ml = 0.0
+                new_quantities_ml[lot.id] = remaining_ml
+                new_quantities[lot.id] = new_quantities_ml[lot.id] / per_unit
+                versions[lot.id] = lot.version
+        if None in draws.values():
+            return draws
+
+        result = self.session.execute(
+            update(StockModel)
+            .where(StockModel.id.in_(new_quantities))
+            .where(StockModel.version == case(versions, value=StockModel.id))
+            .values(
+                quantity=case(new_quantities, value=StockModel.id),
+                quantity_ml=case(new_quantities_ml, value=StockModel.id),
+                version=StockModel.version + 1,
+            )
+            .execution_options(synchronize_session="fetch")
+        )
+        if result.rowcount != len(new_quantities):
+            raise StockConflictError(
+                f"Stock for ingredients {sorted(quantities_ml)} changed during "
+                "the deduction"
+            )
+        data_versions.stage(self.session, STOCK)
+        return draws
+
+    def archive_depleted_stock(self, limit: Optional[int] = None) -> int:
         """
-        merged_records = []
-        for stock_item in stock_items:
-            record = StockModel(**stock_item.dict())
+        Move up to `limit` depleted lots from stock to stock_archive.
 
-            # Merge record with the session
-            merged_records.append(self.session.merge(record))
+        Returns the number of lots moved. Deductions only ever touch lots
+        with stock left, so this never races them.
+        """
+        ids = self.session.scalars(
+            select(StockModel.id).where(StockModel.quantity_ml == 0).limit(limit)
+        ).all()
+        if not ids:
+            return 0
 
-        return merged_records
+        columns = StockModel.__table__.columns
+        archived_on = literal(datetime.now(timezone.utc).replace(tzinfo=None), DateTime)
+        self.session.execute(
+            insert(StockArchiveModel).from_select(
+                [column.name for column in columns] + ["archived_on"],
+                select(*columns, archived_on).where(StockModel.id.in_(ids)),
+            )
+        )
+        self.session.execute(
+            delete(StockModel)
+            .where(StockModel.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        data_versions.stage(self.session, STOCK)
+        return len(ids)
@@ -0,0 +1,156 @@
+"""
+Bounded LRU cache of menu item trees (MenuItem with its ingredients)
+
+`MenuRepository.get_tree` (and its async counterpart) serve a menu item's
+recipe from here, keyed by database and menu id, instead of running the
+double joinedload on every GET /menu/{id}, availability check and order.
+The cached MenuItems are read-only and shared between requests.
+
+Any ORM write to a menu item or recipe line invalidates that item, and a
+write to an ingredient invalidates everything (ingredients are shared
+between recipes); invalidations are applied when the writing session
+commits, along with a bump of the "menu" data version. Core bulk writes
+and writes from other processes (seed_db.py) aren't seen: call
+`invalidate()`, or disable the cache (MENU_TREE_CACHE=0).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from weird_salads.inventory.inventory_service.inventory import MenuItem
+from weird_salads.inventory.repository.models import (
+    IngredientsModel,
+    MenuModel,
+    RecipeIngredientModel,
+)
+from weird_salads.utils.data_versions import MENU, data_versions
+
+__all__ = ["MenuTreeCache", "menu_tree_cache"]
+
+_PENDING_KEY = "menu_tree_cache_pending"
+
+# invalidate every menu item (pending on an ingredient write)
+_ALL = object()
+
+
+class MenuTreeCache:
+    """
+    Thread-safe, size-bounded LRU of MenuItem trees by (database, menu id),
+    the database named by `utils.engine.database_key`
+    """
+
+    def __init__(self, enabled: bool = True, size: int = 256):
+        self.enabled = enabled
+        self.size = size
+        self._lock = threading.Lock()
+        self._trees: "OrderedDict[Tuple[str, int], MenuItem]" = OrderedDict()
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        # bumped on every invalidation, so a load racing a write is discarded
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, database: str, menu_id: int) -> Optional[MenuItem]:
+        if not self.enabled:
+            return None
+        key = (database, int(menu_id))
+        with self._lock:
+            tree = self._trees.get(key)
+            if tree is None:
+                self._counts["misses"] += 1
+                return None
+            self._trees.move_to_end(key)
+            self._counts["hits"] += 1
+            return tree
+
+    def put(self, database: str, menu_id: int, tree: MenuItem, generation: int) -> None:
+        """
+        Cache `tree`, loaded when the cache was at `generation` (dropped if
+        anything was invalidated since)
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._trees[(database, int(menu_id))] = tree
+            self._trees.move_to_end((database, int(menu_id)))
+            while len(self._trees) > self.size:
+                self._trees.popitem(last=False)
+                self._counts["evictions"] += 1
+
+    def invalidate(self, menu_id: Optional[int] = None) -> None:
+        """
+        Drop one menu item (in every database), or everything
+        """
+        with self._lock:
+            self._generation += 1
+            self._counts["invalidations"] += 1
+            if menu_id is None:
+                self._trees.clear()
+                return
+            for key in [key for key in self._trees if key[1] == int(menu_id)]:
+                del self._trees[key]
+
+    def statistics(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counts, "size": len(self._trees), "capacity": self.size}
+
+    # - invalidation on commit
+    def stage(self, session, menu_id: Hashable) -> None:
+        """
+        Invalidate `menu_id` (or `_ALL`) once `session` commits
+        """
+        pending: Optional[Set] = session.info.get(_PENDING_KEY)
+        if pending is None:
+            pending = session.info[_PENDING_KEY] = set()
+            if not session.info.get("menu_tree_cache_listening"):
+                session.info["menu_tree_cache_listening"] = True
+                event.listen(session, "after_commit", self._after_commit)
+                event.listen(session, "after_rollback", self._after_rollback)
+        pending.add(menu_id)
+
+    def _after_commit(self, session) -> None:
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending:
+            return
+        if _ALL in pending:
+            self.invalidate()
+            return
+        for menu_id in pending:
+            self.invalidate(menu_id)
+
+    def _after_rollback(self, session) -> None:
+        session.info.pop(_PENDING_KEY, None)
+
+    def _after_flush(self, session, flush_context) -> None:
+        changed = False
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(instance, MenuModel):
+                self.stage(session, instance.id)
+            elif isinstance(instance, RecipeIngredientModel):
+                self.stage(session, instance.recipe_id)
+            elif isinstance(instance, IngredientsModel):
+                self.stage(session, _ALL)
+            else:
+                continue
+            changed = True
+        if changed:
+            # the menu endpoints' ETags move on too (see utils/data_versions.py)
+            data_versions.stage(session, MENU)
+
+
+menu_tree_cache = MenuTreeCache(
+    enabled=os.environ.get("MENU_TREE_CACHE", "1") == "1",
+    size=int(os.environ.get("MENU_TREE_CACHE_SIZE", 256)),
+)
+
+# every ORM session (including the ones behind AsyncSessions)
+event.listen(Session, "after_flush", menu_tree_cache._after_flush)
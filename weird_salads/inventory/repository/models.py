@@ -2,16 +2,15 @@
 SQLalchemy Models
 """
 
-from datetime import datetime, timezone
 from enum import Enum
 
 from sqlalchemy import Boolean, CheckConstraint, Column, DateTime
 from sqlalchemy import Enum as SQLAEnum
-from sqlalchemy import Float, ForeignKey, Index, Integer, String
+from sqlalchemy import Float, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import relationship
 
 from weird_salads.utils.sqlalchemy_base import Base
-from weird_salads.utils.utils import generate_str_uuid
+from weird_salads.utils.utils import generate_str_uuid, utc_now
 
 __all__ = [
     "UnitOfMeasure",
@@ -19,6 +18,9 @@ __all__ = [
     "IngredientsModel",
     "RecipeIngredientModel",
     "StockModel",
+    "StockArchiveModel",
+    "MILLILITRES_PER_UNIT",
+    "to_millilitres",
 ]
 
 
@@ -29,6 +31,33 @@ class UnitOfMeasure(Enum):
     milliliter = "milliliter"
 
 
+# How many millilitres in one of unit
+MILLILITRES_PER_UNIT = {
+    UnitOfMeasure.liter: 1000,
+    UnitOfMeasure.deciliter: 100,
+    UnitOfMeasure.centiliter: 10,
+    UnitOfMeasure.milliliter: 1,
+}
+
+
+def to_millilitres(quantity: float, unit) -> float:
+    """
+    Convert `quantity` in `unit` (an Enum or its value) to millilitres
+    """
+    return quantity * MILLILITRES_PER_UNIT[UnitOfMeasure(getattr(unit, "value", unit))]
+
+
+def _quantity_ml_default(context) -> float:
+    """
+    `quantity_ml` of an inserted row, from its `quantity` and `unit`
+
+    A context-sensitive default, so ORM adds and Core (bulk) inserts both
+    fill it in.
+    """
+    parameters = context.get_current_parameters()
+    return to_millilitres(parameters["quantity"], parameters["unit"])
+
+
 class MenuModel(Base):
     __tablename__ = "menu"
 
@@ -36,7 +65,7 @@ class MenuModel(Base):
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
     price = Column(Float, nullable=False)
-    created_on = Column(DateTime, default=datetime.now(timezone.utc))
+    created_on = Column(DateTime, default=utc_now)
     on_menu = Column(Boolean, default=True)
 
     # is this why you can use "on_orm" ?
@@ -88,6 +117,8 @@ class RecipeIngredientModel(Base):
     quantity = Column(Float, nullable=False)
     unit = Column(SQLAEnum(UnitOfMeasure), nullable=False)
     # unit = Column(String, nullable=False)
+    # `quantity` in millilitres, so SQL can compare and sum across units
+    quantity_ml = Column(Float, nullable=False, default=_quantity_ml_default)
 
     __table_args__ = (
         CheckConstraint("quantity >= 0.0", name="check_quantity_non_negative"),
@@ -117,16 +148,38 @@ class StockModel(Base):
     unit = Column(SQLAEnum(UnitOfMeasure), nullable=False)  # this might actually work
     # unit = Column(String, nullable=False)
     quantity = Column(Float, nullable=False)
+    # `quantity` in millilitres, so SQL can compare and sum across units
+    quantity_ml = Column(Float, nullable=False, default=_quantity_ml_default)
     cost = Column(Float, nullable=False)
     # expiry_date = Column(DateTime, nullable=False) # !TODO ?
-    delivery_date = Column(DateTime, default=datetime.now(timezone.utc))
-    created_on = Column(DateTime, default=datetime.now(timezone.utc))
+    delivery_date = Column(DateTime, default=utc_now)
+    created_on = Column(DateTime, default=utc_now)
+    # bumped on every deduction, which only applies if it is unchanged
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     __table_args__ = (
         CheckConstraint("quantity >= 0.0", name="check_quantity_non_negative"),
         CheckConstraint("cost >= 0.0", name="check_cost_non_negative"),
-        Index("idx_stock_ingredient", "ingredient_id"),
-        Index("idx_stock_delivery_date", "delivery_date"),
+        # keyset pagination (and FIFO order) overall and per ingredient
+        Index("idx_stock_delivery_date_id", "delivery_date", "id"),
+        Index(
+            "idx_stock_ingredient_delivery_date", "ingredient_id", "delivery_date", "id"
+        ),
+        # FIFO deductions and the per-ingredient totals only read live lots, so
+        # these skip the depleted ones (until compaction archives them)
+        Index(
+            "idx_stock_live_ingredient_delivery_date",
+            "ingredient_id",
+            "delivery_date",
+            "id",
+            sqlite_where=text("quantity_ml > 0"),
+        ),
+        Index(
+            "idx_stock_ingredient_quantity_ml",
+            "ingredient_id",
+            "quantity_ml",
+            sqlite_where=text("quantity_ml > 0"),
+        ),
     )
 
     # Define relationship with Ingredient
@@ -142,3 +195,30 @@ class StockModel(Base):
             "delivery_date": self.delivery_date,
             "created_on": self.created_on,
         }
+
+
+class StockArchiveModel(Base):
+    """
+    Depleted stock lots, moved out of `stock` by compaction
+    """
+
+    __tablename__ = "stock_archive"
+
+    id = Column(String, primary_key=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id"))
+    unit = Column(SQLAEnum(UnitOfMeasure), nullable=False)
+    quantity = Column(Float, nullable=False)
+    quantity_ml = Column(Float, nullable=False)
+    cost = Column(Float, nullable=False)
+    delivery_date = Column(DateTime)
+    created_on = Column(DateTime)
+    version = Column(Integer, nullable=False)
+    archived_on = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "idx_stock_archive_ingredient_delivery_date",
+            "ingredient_id",
+            "delivery_date",
+        ),
+    )
@@ -0,0 +1,60 @@
+"""
+Async counterpart of the OrdersService reads
+"""
+
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from weird_salads.orders.orders_service.exceptions import OrderNotFoundError
+from weird_salads.orders.orders_service.orders import Order
+from weird_salads.orders.orders_service.orders_service import OrdersService
+from weird_salads.orders.repository.async_orders_repository import AsyncOrdersRepository
+from weird_salads.utils.pagination import split_page
+
+__all__ = ["AsyncOrdersService"]
+
+
+class AsyncOrdersService:
+    def __init__(self, orders_repository: AsyncOrdersRepository):
+        self.orders_repository = orders_repository
+
+    async def get_order(self, order_id: str):
+        """
+        get single order
+        """
+        order = await self.orders_repository.get(order_id)
+        if order is not None:
+            return order
+        raise OrderNotFoundError(f"Order with id {order_id} not found")
+
+    async def list_orders(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        menu_id: Optional[int] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> Tuple[List[Order], Optional[str]]:
+        """
+        get a page of orders (newest first), and the cursor of the next page
+        """
+        orders = await self.orders_repository.list(
+            None if limit is None else limit + 1,
+            **OrdersService._list_filters(
+                cursor, menu_id, created_after, created_before
+            ),
+        )
+        return split_page(orders, limit, key=lambda order: (order.created, order.id))
+
+    def export_orders(
+        self,
+        menu_id: Optional[int] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        stream every matching order (newest first) as a dict
+        """
+        return self.orders_repository.stream(
+            **OrdersService._list_filters(None, menu_id, created_after, created_before)
+        )
@@ -0,0 +1,127 @@
+"""
+Clients used by the OrdersService to talk to the Inventory (Menu) service
+"""
+
+from typing import Any, Dict, List, Protocol, Tuple
+
+import requests
+from fastapi import HTTPException
+
+from weird_salads.api.schemas import UnitOfMeasure
+from weird_salads.inventory.inventory_service.inventory_service import MenuService
+from weird_salads.utils.sharding import LOCATION_HEADER, current_location
+
+__all__ = ["InventoryClient", "LocalInventoryClient", "HTTPInventoryClient"]
+
+
+class InventoryClient(Protocol):
+    """
+    What the OrdersService needs from the inventory side.
+    """
+
+    def get_availability(self, menu_id: int) -> Dict[str, Any]:
+        ...
+
+    def deduct_stock(
+        self, ingredient_id: int, quantity: float, unit: UnitOfMeasure
+    ) -> float:
+        ...
+
+    def deduct_stocks(
+        self, deductions: List[Tuple[int, float, UnitOfMeasure]]
+    ) -> List[float]:
+        ...
+
+
+class LocalInventoryClient:
+    """
+    In-process client.
+
+    Wraps a MenuService that shares the caller's session, so the order insert
+    and all stock deductions are committed (or rolled back) together by the
+    UnitOfWork.
+    """
+
+    def __init__(self, menu_service: MenuService):
+        self.menu_service = menu_service
+
+    def get_availability(self, menu_id: int) -> Dict[str, Any]:
+        return self.menu_service.get_recipe_item_availability(menu_id)
+
+    def deduct_stock(
+        self, ingredient_id: int, quantity: float, unit: UnitOfMeasure
+    ) -> float:
+        return self.menu_service.deduct_stock(ingredient_id, abs(quantity), unit)
+
+    def deduct_stocks(
+        self, deductions: List[Tuple[int, float, UnitOfMeasure]]
+    ) -> List[float]:
+        return self.menu_service.deduct_stocks(
+            [
+                (ingredient_id, abs(quantity), unit)
+                for ingredient_id, quantity, unit in deductions
+            ]
+        )
+
+
+class HTTPInventoryClient:
+    """
+    HTTP client, for deployments where the inventory service runs separately.
+
+    Each deduction is its own request (and transaction) on the remote side.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000", timeout: float = 5.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    @staticmethod
+    def _headers() -> Dict[str, str]:
+        # the remote service uses the same location's database
+        location_id = current_location()
+        if location_id is None:
+            return {}
+        return {LOCATION_HEADER: str(location_id)}
+
+    def get_availability(self, menu_id: int) -> Dict[str, Any]:
+        response = self.session.get(
+            f"{self.base_url}/menu/{menu_id}/availability",
+            headers=self._headers(),
+            timeout=self.timeout,
+        )
+        if response.status_code == 200:
+            return response.json()
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Failed to get availability for menu ID {menu_id}",
+        )
+
+    def deduct_stock(
+        self, ingredient_id: int, quantity: float, unit: UnitOfMeasure
+    ) -> float:
+        response = self.session.post(
+            f"{self.base_url}/inventory/update",
+            json={
+                "ingredient_id": ingredient_id,
+                "quantity": -1 * abs(quantity),
+                "unit": unit.value,
+            },
+            headers=self._headers(),
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to update stock for Ingredient ID {ingredient_id}",
+            )
+        return response.json()["total_deducted"]
+
+    def deduct_stocks(
+        self, deductions: List[Tuple[int, float, UnitOfMeasure]]
+    ) -> List[float]:
+        # the API deducts one ingredient per request
+        return [
+            self.deduct_stock(ingredient_id, quantity, unit)
+            for ingredient_id, quantity, unit in deductions
+        ]
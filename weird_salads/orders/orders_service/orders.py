@@ -5,6 +5,8 @@ __all__ = ["Order"]
 
 
 class Order:
+    __slots__ = ("_order", "_id", "_created", "menu_id")
+
     def __init__(self, id, created, menu_id, order_=None):
         self._order = order_  # for internal use only
         self._id = id
@@ -2,20 +2,40 @@
 Services
 """
 
-import requests
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
 from fastapi import HTTPException
 
-from weird_salads.api.schemas import UnitOfMeasure
-from weird_salads.inventory.inventory_service.exceptions import InsufficientStockError
+from weird_salads.api.schemas import OrderLineStatus, UnitOfMeasure
+from weird_salads.inventory.inventory_service.availability import to_litres
+from weird_salads.inventory.inventory_service.exceptions import (
+    InsufficientStockError,
+    MenuItemNotFoundError,
+)
 from weird_salads.orders.orders_service.exceptions import OrderNotFoundError
+from weird_salads.orders.orders_service.inventory_client import InventoryClient
+from weird_salads.orders.orders_service.orders import Order
 from weird_salads.orders.repository.orders_repository import OrdersRepository
+from weird_salads.utils.pagination import decode_cursor, split_page, to_naive_utc
 
 __all__ = ["OrdersService"]
 
 
+def _microlitres(quantity: float, unit) -> int:
+    # whole numbers, so counting the portions that fit is exact (in litres,
+    # 0.3 // 0.1 == 2.0)
+    return round(to_litres(quantity, unit) * 1_000_000)
+
+
 class OrdersService:
-    def __init__(self, orders_repository: OrdersRepository):
+    def __init__(
+        self,
+        orders_repository: OrdersRepository,
+        inventory_client: Optional[InventoryClient] = None,
+    ):
         self.orders_repository = orders_repository
+        self.inventory_client = inventory_client
 
     def place_order(self, order_data):
         """
@@ -34,21 +54,129 @@ class OrdersService:
         # Place the order, then deduct stock (uow deals with the committing later)
         order = self.orders_repository.add(order_data)
 
-        for ingredient in availability_response["ingredient_availability"]:
-            ingredient_id = int(ingredient["ingredient"]["id"])
-            required_quantity = float(ingredient["required_quantity"])
-            unit_string = str(ingredient["unit"])
+        self._update_stocks(
+            [
+                (
+                    int(ingredient["ingredient"]["id"]),
+                    -1 * float(ingredient["required_quantity"]),
+                    self._to_unit(ingredient["unit"]),
+                )
+                for ingredient in availability_response["ingredient_availability"]
+            ]
+        )
+
+        return order
+
+    def place_orders(
+        self, lines: List[Dict[str, Any]], partial: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Place a batch of orders, checking stock once for the combined
+        requirement of every line.
 
-            # Convert the unit string to the UnitOfMeasure Enum
+        With `partial=False` either every line is placed or none are; with
+        `partial=True` each line (in order) gets as many portions as the
+        remaining stock allows. Stock is deducted once per ingredient.
+        """
+        # ingredient requirements per menu item, and stock (microlitres) per
+        # ingredient
+        requirements: Dict[int, Optional[List[tuple]]] = {}
+        remaining: Dict[int, int] = {}
+        for line in lines:
+            menu_id = int(line["menu_id"])
+            if menu_id in requirements:
+                continue
             try:
-                unit = UnitOfMeasure(unit_string)
-            except ValueError:
-                raise HTTPException(
-                    status_code=400, detail=f"Invalid unit: {unit_string}"
+                availability = self.inventory_client.get_availability(menu_id)
+            except MenuItemNotFoundError:
+                requirements[menu_id] = None
+                continue
+            requirements[menu_id] = []
+            for ingredient in availability["ingredient_availability"]:
+                ingredient_id = int(ingredient["ingredient"]["id"])
+                unit = self._to_unit(ingredient["unit"])
+                requirements[menu_id].append(
+                    (ingredient_id, float(ingredient["required_quantity"]), unit)
+                )
+                remaining.setdefault(
+                    ingredient_id,
+                    _microlitres(float(ingredient["available_quantity"]), unit),
                 )
-            self._update_stock(ingredient_id, -1 * required_quantity, unit)
 
-        return order
+        outcomes = []
+        for line in lines:
+            menu_id, requested = int(line["menu_id"]), int(line["quantity"])
+            outcome = {
+                "menu_id": menu_id,
+                "quantity": requested,
+                "placed": 0,
+                "status": OrderLineStatus.rejected,
+                "detail": None,
+                "orders": [],
+            }
+            outcomes.append(outcome)
+
+            recipe = requirements[menu_id]
+            if recipe is None:
+                outcome["detail"] = f"Menu Item with ID {menu_id} not found"
+                continue
+
+            portions = [
+                remaining[ingredient_id] // _microlitres(quantity, unit)
+                for ingredient_id, quantity, unit in recipe
+                if _microlitres(quantity, unit) > 0
+            ]
+            fits = min(portions) if portions else 0
+            placed = min(requested, fits)
+            if placed < requested and not partial:
+                placed = 0
+            if placed == 0:
+                outcome["detail"] = "Sorry, this is out of stock."
+                continue
+
+            for ingredient_id, quantity, unit in recipe:
+                remaining[ingredient_id] -= placed * _microlitres(quantity, unit)
+            outcome["placed"] = placed
+            outcome["status"] = (
+                OrderLineStatus.placed
+                if placed == requested
+                else OrderLineStatus.partial
+            )
+
+        if not partial and any(o["placed"] < o["quantity"] for o in outcomes):
+            for outcome in outcomes:
+                outcome["placed"] = 0
+                outcome["status"] = OrderLineStatus.rejected
+                outcome["detail"] = outcome["detail"] or "Batch rejected"
+            return outcomes
+
+        # one bulk insert for every order...
+        orders = self.orders_repository.add_many(
+            [o["menu_id"] for o in outcomes for _ in range(o["placed"])]
+        )
+        for outcome in outcomes:
+            outcome["orders"], orders = (
+                orders[: outcome["placed"]],
+                orders[outcome["placed"] :],
+            )
+
+        # ...and one deduction for every ingredient (and unit)
+        deductions: Dict[tuple, float] = {}
+        for outcome in outcomes:
+            for ingredient_id, quantity, unit in requirements[outcome["menu_id"]] or []:
+                key = (ingredient_id, unit)
+                deductions[key] = (
+                    deductions.get(key, 0.0) + quantity * outcome["placed"]
+                )
+        self._update_stocks(
+            [
+                (ingredient_id, -1 * quantity, unit)
+                for (ingredient_id, unit), quantity in deductions.items()
+                if quantity > 0
+            ]
+        )
+
+        return outcomes
 
     def get_order(self, order_id: str):
         """
@@ -59,40 +187,71 @@ class OrdersService:
             return order
         raise OrderNotFoundError(f"Order with id {order_id} not found")
 
-    def list_orders(self):
+    def list_orders(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        menu_id: Optional[int] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> Tuple[List[Order], Optional[str]]:
+        """
+        get a page of orders (newest first), and the cursor of the next page
+        """
+        orders = self.orders_repository.list(
+            None if limit is None else limit + 1,
+            **self._list_filters(cursor, menu_id, created_after, created_before),
+        )
+        return split_page(orders, limit, key=lambda order: (order.created, order.id))
+
+    def export_orders(
+        self,
+        menu_id: Optional[int] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> Iterator[Dict[str, Any]]:
         """
-        get all orders
+        stream every matching order (newest first) as a dict
         """
-        return self.orders_repository.list()
+        return self.orders_repository.stream(
+            **self._list_filters(None, menu_id, created_after, created_before)
+        )
+
+    @staticmethod
+    def _list_filters(
+        cursor: Optional[str],
+        menu_id: Optional[int],
+        created_after: Optional[datetime],
+        created_before: Optional[datetime],
+    ) -> Dict[str, Any]:
+        return {
+            "after": decode_cursor(cursor) if cursor else None,
+            "menu_id": menu_id,
+            "created_after": to_naive_utc(created_after),
+            "created_before": to_naive_utc(created_before),
+        }
+
+    @staticmethod
+    def _to_unit(unit) -> UnitOfMeasure:
+        """
+        Convert a unit (a string over HTTP, an Enum in-process) to UnitOfMeasure
+        """
+        unit_string = str(getattr(unit, "value", unit))
+        try:
+            return UnitOfMeasure(unit_string)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid unit: {unit_string}")
 
     def _get_menu_item_availability(self, menu_id: int):
         """
         Fetch availability details for the given menu item,
         including ingredient availability.
         """
-        response = requests.get(f"http://localhost:8000/menu/{menu_id}/availability")
-        if response.status_code == 200:
-            availability = response.json()
-            return availability["available_portions"] >= 0, response.json()
-        else:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Failed to get availability for menu ID {menu_id}",
-            )
+        availability = self.inventory_client.get_availability(menu_id)
+        return availability["available_portions"] >= 1, availability
 
-    def _update_stock(
-        self, ingredient_id: int, quantity: float, unit: UnitOfMeasure
+    def _update_stocks(
+        self, deductions: List[Tuple[int, float, UnitOfMeasure]]
     ) -> None:
-        response = requests.post(
-            "http://localhost:8000/inventory/update",
-            json={
-                "ingredient_id": ingredient_id,
-                "quantity": quantity,
-                "unit": unit.value,
-            },
-        )
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Failed to update stock for Ingredient ID {ingredient_id}",
-            )
+        if deductions:
+            self.inventory_client.deduct_stocks(deductions)
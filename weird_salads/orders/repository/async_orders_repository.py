@@ -0,0 +1,43 @@
+"""
+Async (sqlalchemy.ext.asyncio) counterpart of the OrdersRepository reads
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import select
+
+from weird_salads.orders.orders_service.orders import Order
+from weird_salads.orders.repository.models import OrderModel
+from weird_salads.orders.repository.orders_repository import (
+    _ORDER_COLUMNS,
+    _orders_query,
+)
+
+__all__ = ["AsyncOrdersRepository"]
+
+
+class AsyncOrdersRepository:
+    def __init__(self, session):
+        self.session = session  # AsyncSession
+
+    async def get(self, id: str):
+        result = await self.session.execute(
+            select(*_ORDER_COLUMNS).where(OrderModel.id == id)
+        )
+        row = result.first()
+        if row is not None:
+            return Order(*row)
+
+    async def list(self, limit: Optional[int] = None, **filters) -> List[Order]:
+        result = await self.session.execute(_orders_query(limit, **filters))
+        return [Order(*row) for row in result]
+
+    async def stream(
+        self, batch_size: int = 1000, **filters
+    ) -> AsyncIterator[Dict[str, Any]]:
+        query = _orders_query(columns=(OrderModel.__table__,), **filters)
+        result = await self.session.stream(
+            query.execution_options(yield_per=batch_size)
+        )
+        async for row in result.mappings():
+            yield dict(row)
@@ -2,12 +2,11 @@
 SQLalchemy Models
 """
 
-from datetime import datetime, timezone
 
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import Column, DateTime, Index, Integer, String
 
 from weird_salads.utils.sqlalchemy_base import Base
-from weird_salads.utils.utils import generate_str_uuid
+from weird_salads.utils.utils import generate_str_uuid, utc_now
 
 __all__ = ["OrderModel"]
 
@@ -18,7 +17,13 @@ class OrderModel(Base):
     id = Column(String, primary_key=True, default=generate_str_uuid)
     menu_id = Column(Integer, nullable=False)  # this will end up being a ForeignKey
     # price = Column(Float, nullable=False, default=0.0)
-    created = Column(DateTime, default=datetime.now(timezone.utc))
+    created = Column(DateTime, default=utc_now)
+
+    __table_args__ = (
+        # keyset pagination, newest first, overall and per menu item
+        Index("idx_order_created_id", "created", "id"),
+        Index("idx_order_menu_created_id", "menu_id", "created", "id"),
+    )
 
     def dict(self):
         return {
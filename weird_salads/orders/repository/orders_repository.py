@@ -2,11 +2,47 @@
 Building on a Repository Pattern
 """
 
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select, tuple_
+
 from weird_salads.orders.orders_service.orders import Order
 from weird_salads.orders.repository.models import OrderModel
+from weird_salads.utils.utils import generate_str_uuid, utc_now
 
 __all__ = ["OrdersRepository"]
 
+# columns in the order of the Order constructor, so rows map straight onto it
+_ORDER_COLUMNS = (OrderModel.id, OrderModel.created, OrderModel.menu_id)
+
+
+def _orders_query(
+    limit: Optional[int] = None,
+    after: Optional[Tuple[datetime, str]] = None,
+    menu_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    columns=_ORDER_COLUMNS,
+):
+    """
+    Orders, newest first, keyset-paginated on (created, id).
+
+    `after` is the (created, id) of the last order of the previous page.
+    `columns` are those of an Order, or e.g. (OrderModel.__table__,) for every
+    column.
+    """
+    query = select(*columns)
+    if menu_id is not None:
+        query = query.where(OrderModel.menu_id == menu_id)
+    if created_after is not None:
+        query = query.where(OrderModel.created >= created_after)
+    if created_before is not None:
+        query = query.where(OrderModel.created < created_before)
+    if after is not None:
+        query = query.where(tuple_(OrderModel.created, OrderModel.id) < after)
+    return query.order_by(OrderModel.created.desc(), OrderModel.id.desc()).limit(limit)
+
 
 class OrdersRepository:
     def __init__(self, session):
@@ -17,20 +53,49 @@ class OrdersRepository:
         self.session.add(record)
         return Order(**record.dict(), order_=record)
 
+    def add_many(self, menu_ids: List[int]) -> List[Order]:
+        """
+        Insert one order per entry in `menu_ids` with a single executemany
+        """
+        if not menu_ids:
+            return []
+        # naive UTC, as single orders are stored and read back
+        created = utc_now()
+        rows = [
+            {"id": generate_str_uuid(), "menu_id": int(menu_id), "created": created}
+            for menu_id in menu_ids
+        ]
+        self.session.execute(insert(OrderModel), rows)
+        return [Order(**row) for row in rows]
+
     def _get(self, id: str):
         return (
             self.session.query(OrderModel).filter(OrderModel.id == id).first()
         )  # noqa: E501
 
     def get(self, id):
-        order = self._get(id)
-        if order is not None:
-            return Order(**order.dict())
-
-    def list(self):
-        query = self.session.query(OrderModel)
-        records = query.all()
-        return [Order(**record.dict()) for record in records]
+        row = self.session.execute(
+            select(*_ORDER_COLUMNS).where(OrderModel.id == id)
+        ).first()
+        if row is not None:
+            return Order(*row)
+
+    def list(self, limit: Optional[int] = None, **filters) -> List[Order]:
+        """
+        Orders, newest first (see `_orders_query` for `filters`)
+        """
+        rows = self.session.execute(_orders_query(limit, **filters))
+        return [Order(*row) for row in rows]
+
+    def stream(self, batch_size: int = 1000, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Every matching order as a plain dict, fetched `batch_size` rows at a
+        time from a server-side cursor (nothing is held in the session)
+        """
+        query = _orders_query(columns=(OrderModel.__table__,), **filters)
+        result = self.session.execute(query.execution_options(yield_per=batch_size))
+        for row in result.mappings():
+            yield dict(row)
 
     def delete(self, id):
         pass
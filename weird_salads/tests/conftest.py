@@ -0,0 +1,58 @@
+"""
+Shared fixtures: a freshly seeded SQLite database per test
+"""
+
+import logging
+from pathlib import Path
+
+import pytest
+
+from weird_salads.inventory.inventory_service.availability_cache import (
+    availability_cache,
+)
+from weird_salads.inventory.repository import models as inventory_models  # noqa
+from weird_salads.inventory.repository.menu_tree_cache import menu_tree_cache
+from weird_salads.orders.repository import models as orders_models  # noqa
+from weird_salads.utils.database import seed_db
+from weird_salads.utils.engine import dispose_engines, get_engine
+from weird_salads.utils.sqlalchemy_base import Base
+
+DATA_PATH = Path(__file__).parents[2] / "data"
+
+# the location seeded by `database_url`
+LOCATION_ID = 1
+
+
+def create_database(path: Path, location_id: int = LOCATION_ID, quantity=1000) -> str:
+    """
+    Create and seed a SQLite database at `path`, returning its URL
+    """
+    database_url = f"sqlite:///{path}"
+    Base.metadata.create_all(get_engine(database_url))
+    seed_db.main(location_id, quantity, DATA_PATH, database_url=database_url)
+    # seed_db logs at DEBUG
+    logging.getLogger().setLevel(logging.WARNING)
+    return database_url
+
+
+@pytest.fixture
+def database_url(tmp_path, monkeypatch):
+    """
+    A seeded database for location 1, as DATABASE_URL
+    """
+    database_url = create_database(tmp_path / "orders.db")
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    availability_cache.invalidate()
+    menu_tree_cache.invalidate()
+    yield database_url
+    dispose_engines()
+
+
+@pytest.fixture
+def client(database_url):
+    from fastapi.testclient import TestClient
+
+    from weird_salads.api.app import app
+
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,118 @@
+"""
+API_MODE=async: the `async def` read endpoints return what the sync ones do
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from fastapi.routing import APIRoute
+
+from weird_salads.api import app as app_module
+from weird_salads.api import responses
+
+READ_PATHS = [
+    "/menu",
+    "/menu/availability",
+    "/menu/{item_id}",
+    "/menu/{item_id}/availability",
+    "/menu/999999",
+    "/inventory?limit=20",
+    "/inventory?limit=20&in_stock=true",
+    "/inventory/{stock_id}",
+    "/inventory/ingredient/{ingredient_id}",
+    "/inventory/ingredient/999999",
+    "/order",
+    "/order?limit=2",
+]
+
+EXPORT_PATHS = [
+    "/inventory/export",
+    "/inventory/export?format=csv&in_stock=true",
+    "/order/export",
+    "/order/export?format=csv",
+]
+
+
+@pytest.fixture
+def ids(client):
+    """
+    Place a few orders and return the ids the templated paths need
+    """
+    item = next(
+        item
+        for item in client.get("/menu/availability").json()["items"]
+        if item["available_portions"] >= 3
+    )
+    for _ in range(3):
+        client.post("/order", json={"menu_id": item["id"]})
+    stock = client.get("/inventory").json()["items"][0]
+    return {
+        "item_id": item["id"],
+        "stock_id": stock["id"],
+        "ingredient_id": stock["ingredient_id"],
+    }
+
+
+@contextmanager
+def async_routes():
+    """
+    Serve the reads from api/async_routes.py, as API_MODE=async does
+    """
+    app = app_module.app
+    routes = list(app.router.routes)
+    app_module._use_async_routes(app)
+    app.openapi_schema = None
+    try:
+        yield
+    finally:
+        app.router.routes = routes
+        app.openapi_schema = None
+
+
+def api_routes(routes):
+    for route in routes:
+        if isinstance(route, APIRoute):
+            yield route
+        elif hasattr(route, "original_router"):
+            # include_router keeps the router nested
+            yield from api_routes(route.original_router.routes)
+
+
+def endpoint_module(client, path: str, method: str = "GET") -> str:
+    return next(
+        route.endpoint.__module__
+        for route in api_routes(client.app.router.routes)
+        if route.path == path and method in route.methods
+    )
+
+
+def test_async_mode_replaces_the_read_routes(client):
+    with async_routes():
+        assert endpoint_module(client, "/menu") == "weird_salads.api.async_routes"
+        assert endpoint_module(client, "/order") == "weird_salads.api.async_routes"
+        # writes stay sync
+        assert endpoint_module(client, "/order", "POST") == "weird_salads.api.app"
+    assert endpoint_module(client, "/menu") == "weird_salads.api.app"
+
+
+@pytest.mark.parametrize("fast_json", [False, True])
+def test_async_reads_match_sync(client, ids, monkeypatch, fast_json):
+    monkeypatch.setattr(responses, "FAST_JSON", fast_json)
+    paths = [path.format(**ids) for path in READ_PATHS]
+    sync = {path: client.get(path) for path in paths}
+
+    with async_routes():
+        for path in paths:
+            response = client.get(path)
+            assert response.status_code == sync[path].status_code, path
+            assert response.json() == sync[path].json(), path
+
+
+def test_async_exports_match_sync(client, ids):
+    sync = {path: client.get(path).text for path in EXPORT_PATHS}
+
+    with async_routes():
+        for path in EXPORT_PATHS:
+            response = client.get(path)
+            assert response.status_code == 200, path
+            assert response.text == sync[path], path
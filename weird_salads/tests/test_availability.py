@@ -0,0 +1,92 @@
+"""
+The AvailabilityEngine, and its agreement with the single aggregate query
+(AVAILABILITY_ENGINE="sql")
+"""
+
+import pytest
+
+from weird_salads.api.schemas import UnitOfMeasure
+from weird_salads.inventory.inventory_service.availability import AvailabilityEngine
+from weird_salads.inventory.inventory_service.inventory_service import MenuService
+from weird_salads.inventory.repository.inventory_repository import MenuRepository
+from weird_salads.utils.unit_of_work import UnitOfWork
+
+LITRE = UnitOfMeasure.liter
+
+
+@pytest.fixture
+def engine():
+    # recipe 3's only line needs nothing, recipe 4 has no lines at all
+    engine = AvailabilityEngine.from_requirements(
+        [
+            (1, 10, 0.5, LITRE),
+            (1, 11, 100, UnitOfMeasure.milliliter),
+            (2, 11, 0.2, LITRE),
+            (3, 12, 0, LITRE),
+        ],
+        recipe_ids=[3, 4],
+    )
+    engine.set_stock({10: 2.0, 11: 0.5})
+    return engine
+
+
+def test_portions_are_limited_by_the_scarcest_ingredient(engine):
+    assert engine.available_portions() == {1: 4, 2: 2, 3: 0, 4: 0}
+
+
+def test_portions_for_some_recipes(engine):
+    assert engine.available_portions([2, 4, 99]) == {2: 2, 4: 0, 99: 0}
+
+
+def test_stock_updates(engine):
+    engine.update_stock(11, 0.25)
+    assert engine.available_portions([1, 2]) == {1: 2, 2: 1}
+    assert engine.recipes_using(11) == [1, 2]
+    assert engine.recipes_using(12) == []
+
+
+def menu_availability(sql: bool):
+    with UnitOfWork() as unit_of_work:
+        repository = MenuRepository(unit_of_work.session)
+        items = (
+            repository.list_availability()
+            if sql
+            else MenuService(repository).list_menu_availability()
+        )
+        return {item.id: item.available_portions for item in items}
+
+
+def test_the_engine_agrees_with_the_aggregate_query(database_url):
+    assert menu_availability(sql=False) == menu_availability(sql=True)
+
+
+def test_they_agree_after_deductions(database_url):
+    with UnitOfWork() as unit_of_work:
+        service = MenuService(MenuRepository(unit_of_work.session))
+        menu_ids = [
+            item.id
+            for item in service.list_menu_availability()
+            if item.available_portions > 0
+        ]
+        # leave the first items' ingredients with uneven stock
+        for count, menu_id in enumerate(menu_ids[:3], start=1):
+            service.deduct_stocks(
+                [
+                    (ri.ingredient.id, ri.quantity * count, ri.unit)
+                    for ri in service.get_item(menu_id).ingredients
+                ]
+            )
+        unit_of_work.commit()
+
+    portions = menu_availability(sql=False)
+    assert portions == menu_availability(sql=True)
+    assert len(set(portions.values())) > 1
+
+
+def test_one_item_agrees_with_the_whole_menu(database_url):
+    portions = menu_availability(sql=True)
+    with UnitOfWork() as unit_of_work:
+        service = MenuService(MenuRepository(unit_of_work.session))
+        for menu_id in list(portions)[:5]:
+            availability = service.get_recipe_item_availability(menu_id)
+            assert availability["available_portions"] == portions[menu_id]
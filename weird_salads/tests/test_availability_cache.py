@@ -0,0 +1,89 @@
+"""
+The availability cache agrees with a recompute from the database, and
+only applies committed stock changes
+"""
+
+import pytest
+
+from weird_salads.inventory.inventory_service.availability_cache import (
+    AvailabilityCache,
+    availability_cache_for,
+)
+from weird_salads.inventory.inventory_service.inventory_service import MenuService
+from weird_salads.inventory.repository.inventory_repository import MenuRepository
+from weird_salads.utils.unit_of_work import UnitOfWork
+
+
+@pytest.fixture
+def cache(database_url, monkeypatch):
+    with UnitOfWork() as unit_of_work:
+        cache = availability_cache_for(unit_of_work.session)
+    monkeypatch.setattr(cache, "enabled", True)
+    cache.invalidate()
+    yield cache
+    cache.invalidate()
+
+
+def portions(enabled: bool):
+    """
+    {menu id: available portions}, from the cache or recomputed
+    """
+    with UnitOfWork() as unit_of_work:
+        service = MenuService(MenuRepository(unit_of_work.session))
+        if not enabled:
+            service.availability_cache = AvailabilityCache(enabled=False)
+        return {
+            item.id: item.available_portions
+            for item in service.list_menu_availability()
+        }
+
+
+def deduct_first_recipe(commit: bool) -> int:
+    """
+    Deduct one portion of the first available recipe's ingredients
+    """
+    with UnitOfWork() as unit_of_work:
+        service = MenuService(MenuRepository(unit_of_work.session))
+        menu_id = next(
+            item.id
+            for item in service.list_menu_availability()
+            if item.available_portions > 0
+        )
+        for ingredient in service.get_item(menu_id).ingredients:
+            service.deduct_stock(
+                ingredient.ingredient.id, ingredient.quantity, ingredient.unit
+            )
+        if commit:
+            unit_of_work.commit()
+        else:
+            unit_of_work.rollback()
+    return menu_id
+
+
+def test_cached_portions_match_the_database(cache):
+    assert portions(enabled=True) == portions(enabled=False)
+    assert cache.loaded
+
+
+def test_committed_deductions_update_the_cache(cache):
+    before = portions(enabled=True)
+    menu_id = deduct_first_recipe(commit=True)
+
+    after = portions(enabled=True)
+    assert after[menu_id] == before[menu_id] - 1
+    assert after == portions(enabled=False)
+    with UnitOfWork() as unit_of_work:
+        assert cache.verify(MenuRepository(unit_of_work.session)) == {}
+
+
+def test_rolled_back_deductions_are_dropped(cache):
+    before = portions(enabled=True)
+    deduct_first_recipe(commit=False)
+    assert portions(enabled=True) == before == portions(enabled=False)
+
+
+def test_invalidate_reloads_from_the_database(cache):
+    portions(enabled=True)
+    cache.invalidate()
+    assert not cache.loaded
+    assert portions(enabled=True) == portions(enabled=False)
@@ -0,0 +1,108 @@
+"""
+Stock compaction: depleted lots move to stock_archive, live lots stay put
+"""
+
+from typing import List, Optional
+
+from sqlalchemy import select, update
+
+from weird_salads.inventory.inventory_service.inventory_service import MenuService
+from weird_salads.inventory.repository.inventory_repository import MenuRepository
+from weird_salads.inventory.repository.models import StockArchiveModel, StockModel
+from weird_salads.utils.database.compact_db import compact_stock
+from weird_salads.utils.unit_of_work import UnitOfWork
+
+STOCK_COLUMNS = [column.name for column in StockModel.__table__.columns]
+
+
+def deplete(count: int, database_url: Optional[str] = None) -> List[str]:
+    """
+    Empty `count` stock lots, returning their ids
+    """
+    with UnitOfWork(database_url) as unit_of_work:
+        ids = unit_of_work.session.scalars(
+            select(StockModel.id).order_by(StockModel.id).limit(count)
+        ).all()
+        unit_of_work.session.execute(
+            update(StockModel)
+            .where(StockModel.id.in_(ids))
+            .values(quantity=0, quantity_ml=0, version=StockModel.version + 1)
+        )
+        unit_of_work.commit()
+    return ids
+
+
+def rows(session, model, ids=None) -> dict:
+    query = select(model)
+    if ids is not None:
+        query = query.where(model.id.in_(ids))
+    return {
+        row.id: {name: getattr(row, name) for name in STOCK_COLUMNS}
+        for row in session.scalars(query)
+    }
+
+
+def test_archive_moves_depleted_lots_with_every_column(database_url):
+    ids = deplete(5)
+    with UnitOfWork() as unit_of_work:
+        before = rows(unit_of_work.session, StockModel)
+
+    with UnitOfWork() as unit_of_work:
+        service = MenuService(MenuRepository(unit_of_work.session))
+        assert service.archive_depleted_stock(100) == 5
+        unit_of_work.commit()
+
+    with UnitOfWork() as unit_of_work:
+        session = unit_of_work.session
+        archived = rows(session, StockArchiveModel)
+        assert archived == {id_: before[id_] for id_ in ids}
+        assert all(
+            lot.archived_on is not None
+            for lot in session.scalars(select(StockArchiveModel))
+        )
+        # the live lots are untouched
+        assert rows(session, StockModel) == {
+            id_: lot for id_, lot in before.items() if id_ not in ids
+        }
+
+
+def test_archive_respects_the_batch_size(database_url):
+    deplete(5)
+
+    with UnitOfWork() as unit_of_work:
+        service = MenuService(MenuRepository(unit_of_work.session))
+        assert service.archive_depleted_stock(2) == 2
+        unit_of_work.commit()
+
+    # the rest, two lots per transaction
+    result = compact_stock(batch_size=2)
+    assert (result["archived"], result["batches"]) == (3, 2)
+
+    with UnitOfWork() as unit_of_work:
+        session = unit_of_work.session
+        assert len(rows(session, StockArchiveModel)) == 5
+        assert (
+            session.scalars(
+                select(StockModel.id).where(StockModel.quantity_ml == 0)
+            ).all()
+            == []
+        )
+
+
+def test_compact_endpoint(client):
+    ids = deplete(4)
+    stock = client.get("/inventory", params={"limit": 1000}).json()["items"]
+
+    response = client.post("/inventory/compact", params={"batch_size": 2})
+    assert response.status_code == 200
+    assert response.json()["archived"] == 4
+    assert response.json()["batches"] == 2
+
+    remaining = client.get("/inventory", params={"limit": 1000}).json()["items"]
+    assert remaining == [lot for lot in stock if lot["id"] not in ids]
+
+    # nothing left to move
+    assert client.post("/inventory/compact").json()["archived"] == 0
+    assert (
+        client.post("/inventory/compact", params={"batch_size": 0}).status_code == 422
+    )
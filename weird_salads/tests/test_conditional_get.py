@@ -0,0 +1,80 @@
+"""
+ETags and 304s on the read endpoints (CONDITIONAL_GET=1)
+"""
+
+import pytest
+
+from weird_salads.api.conditional import _matches
+from weird_salads.utils.data_versions import STOCK, data_versions
+from weird_salads.utils.engine import database_key
+from weird_salads.utils.unit_of_work import UnitOfWork
+
+
+@pytest.fixture
+def conditional(client, monkeypatch):
+    monkeypatch.setattr(data_versions, "enabled", True)
+    return client
+
+
+def test_disabled_by_default(client):
+    assert not data_versions.enabled
+    assert "ETag" not in client.get("/menu").headers
+
+
+def test_a_current_etag_is_not_modified(conditional):
+    etag = conditional.get("/menu").headers["ETag"]
+
+    response = conditional.get("/menu", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_committed_stock_changes_invalidate_etags(conditional):
+    menu_id = next(
+        item["id"]
+        for item in conditional.get("/menu/availability").json()["items"]
+        if item["available_portions"] > 0
+    )
+    availability = conditional.get("/menu/availability").headers["ETag"]
+    menu = conditional.get("/menu").headers["ETag"]
+
+    assert conditional.post("/order", json={"menu_id": menu_id}).status_code == 201
+
+    response = conditional.get(
+        "/menu/availability", headers={"If-None-Match": availability}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != availability
+    # the menu itself isn't read from stock
+    assert conditional.get("/menu", headers={"If-None-Match": menu}).status_code == 304
+
+
+def test_rolled_back_writes_keep_the_version(conditional, database_url):
+    database = database_key(database_url)
+    before = data_versions.get(database, STOCK)
+
+    with UnitOfWork() as unit_of_work:
+        data_versions.stage(unit_of_work.session, STOCK)
+        unit_of_work.rollback()
+    assert data_versions.get(database, STOCK) == before
+
+    with UnitOfWork() as unit_of_work:
+        data_versions.stage(unit_of_work.session, STOCK)
+        unit_of_work.commit()
+    assert data_versions.get(database, STOCK) == before + 1
+
+
+@pytest.mark.parametrize(
+    "if_none_match, matches",
+    [
+        ('W/"a-1"', True),
+        ('"a-1"', True),
+        ('"b-2", W/"a-1"', True),
+        ("*", True),
+        ('W/"a-2"', False),
+    ],
+)
+def test_weak_comparison(if_none_match, matches):
+    assert _matches(if_none_match, 'W/"a-1"') == matches
@@ -0,0 +1,157 @@
+"""
+Streaming NDJSON/CSV exports: the encoders, and GET /order/export and
+/inventory/export
+"""
+
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+
+from weird_salads.api.export import (
+    STOCK_EXPORT_FIELDS,
+    async_export_chunks,
+    export_chunks,
+)
+from weird_salads.api.schemas import ExportFormat, UnitOfMeasure
+from weird_salads.inventory.inventory_service.inventory_service import MenuService
+from weird_salads.inventory.repository.inventory_repository import MenuRepository
+from weird_salads.utils.unit_of_work import UnitOfWork
+
+FIELDS = ("id", "name", "unit", "created")
+ROWS = [
+    {
+        "id": 1,
+        "name": 'Salad, "large"',
+        "unit": UnitOfMeasure.liter,
+        "created": datetime(2024, 8, 5, 23, 52, 43),
+        "ignored": True,
+    },
+    {
+        "id": 2,
+        "name": "Soup",
+        "unit": UnitOfMeasure.milliliter,
+        "created": datetime(2024, 8, 6),
+        "ignored": False,
+    },
+]
+
+
+def test_ndjson_is_one_object_per_line():
+    text = "".join(export_chunks(ROWS, ExportFormat.ndjson, FIELDS))
+
+    lines = text.split("\n")
+    assert lines[-1] == ""
+    assert [json.loads(line) for line in lines[:-1]] == [
+        {
+            "id": 1,
+            "name": 'Salad, "large"',
+            "unit": "liter",
+            "created": "2024-08-05T23:52:43",
+        },
+        {
+            "id": 2,
+            "name": "Soup",
+            "unit": "milliliter",
+            "created": "2024-08-06T00:00:00",
+        },
+    ]
+
+
+def test_csv_has_a_header_and_quotes_values():
+    text = "".join(export_chunks(ROWS, ExportFormat.csv, FIELDS))
+
+    assert text.splitlines()[:2] == [
+        "id,name,unit,created",
+        '1,"Salad, ""large""",liter,2024-08-05T23:52:43',
+    ]
+    assert list(csv.reader(io.StringIO(text)))[1][1] == 'Salad, "large"'
+
+
+def test_rows_are_encoded_a_chunk_at_a_time():
+    chunks = list(export_chunks(ROWS * 3, ExportFormat.csv, FIELDS, chunk_rows=4))
+    # the header, then 4 + 2 rows
+    assert [chunk.count("\n") for chunk in chunks] == [1, 4, 2]
+
+
+def test_async_chunks_match():
+    async def rows():
+        for row in ROWS:
+            yield row
+
+    async def collect():
+        return [
+            chunk
+            async for chunk in async_export_chunks(rows(), ExportFormat.csv, FIELDS)
+        ]
+
+    assert asyncio.run(collect()) == list(export_chunks(ROWS, ExportFormat.csv, FIELDS))
+
+
+def place_orders(client, count: int):
+    menu_id = next(
+        item["id"]
+        for item in client.get("/menu/availability").json()["items"]
+        if item["available_portions"] >= count
+    )
+    return [
+        client.post("/order", json={"menu_id": menu_id}).json() for _ in range(count)
+    ]
+
+
+def test_order_export(client):
+    placed = place_orders(client, 3)
+
+    response = client.get("/order/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="orders.ndjson"' in response.headers["content-disposition"]
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    # newest first, as GET /order
+    assert exported == client.get("/order").json()["orders"]
+    assert {order["id"] for order in exported} == {order["id"] for order in placed}
+
+
+def stock_export(client, **params):
+    response = client.get("/inventory/export", params={"format": "csv", **params})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    header, *rows = csv.reader(io.StringIO(response.text))
+    assert tuple(header) == STOCK_EXPORT_FIELDS
+    return [dict(zip(header, row)) for row in rows]
+
+
+def empty_an_ingredient() -> int:
+    """
+    Deduct all of one ingredient's stock, returning its id
+    """
+    with UnitOfWork() as unit_of_work:
+        service = MenuService(MenuRepository(unit_of_work.session))
+        ingredient_id, [(unit, total)] = next(
+            iter(service.menu_repository.list_stock_totals().items())
+        )
+        service.deduct_stocks([(ingredient_id, total, unit)])
+        unit_of_work.commit()
+    return ingredient_id
+
+
+def test_stock_export_filters(client):
+    everything = stock_export(client)
+    ingredient_id = empty_an_ingredient()
+
+    one = stock_export(client, ingredient_id=ingredient_id)
+    live = stock_export(client, in_stock="true")
+    depleted = stock_export(client, in_stock="false")
+
+    assert len(everything) > len(one) > 0
+    assert {row["ingredient_id"] for row in one} == {str(ingredient_id)}
+    assert {row["id"] for row in depleted} == {row["id"] for row in one}
+    assert all(float(row["quantity"]) == 0 for row in depleted)
+    assert len(live) + len(depleted) == len(everything)
+
+
+def test_unsupported_formats_are_rejected(client):
+    for path in ("/order/export", "/inventory/export"):
+        assert client.get(path, params={"format": "xml"}).status_code == 422
@@ -0,0 +1,78 @@
+"""
+FAST_JSON: list endpoints serialized by orjson give the same payloads
+(and headers) as FastAPI's validated path
+"""
+
+import pytest
+
+from weird_salads.api import responses
+from weird_salads.utils.data_versions import data_versions
+
+LIST_PATHS = [
+    "/menu",
+    "/menu/availability",
+    "/inventory?limit=20",
+    "/inventory?limit=20&in_stock=true",
+    "/order",
+]
+
+
+@pytest.fixture
+def stocked_client(client):
+    """
+    A client with a few orders placed
+    """
+    menu_id = next(
+        item["id"]
+        for item in client.get("/menu/availability").json()["items"]
+        if item["available_portions"] >= 3
+    )
+    for _ in range(3):
+        client.post("/order", json={"menu_id": menu_id})
+    return client
+
+
+def fast(monkeypatch, strict: bool = False):
+    monkeypatch.setattr(responses, "FAST_JSON", True)
+    monkeypatch.setattr(responses, "FAST_JSON_STRICT", strict)
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_payloads_match_the_validated_path(stocked_client, monkeypatch, strict):
+    ingredient_id = stocked_client.get("/inventory").json()["items"][0]["ingredient_id"]
+    paths = LIST_PATHS + [f"/inventory/ingredient/{ingredient_id}"]
+    default = {path: stocked_client.get(path).json() for path in paths}
+
+    fast(monkeypatch, strict)
+    for path in paths:
+        response = stocked_client.get(path)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        # the same fields and values, whatever their order
+        assert response.json() == default[path], path
+
+
+def test_headers_survive_the_orjson_response(stocked_client, monkeypatch):
+    monkeypatch.setattr(data_versions, "enabled", True)
+    default = stocked_client.get("/inventory?limit=5")
+
+    fast(monkeypatch)
+    response = stocked_client.get("/inventory?limit=5")
+
+    assert response.headers["ETag"] == default.headers["ETag"]
+    assert response.headers["Cache-Control"] == default.headers["Cache-Control"]
+    assert (
+        stocked_client.get(
+            "/inventory?limit=5", headers={"If-None-Match": response.headers["ETag"]}
+        ).status_code
+        == 304
+    )
+
+    # the next page's cursor carries over as well
+    cursor = response.json()["next_cursor"]
+    assert cursor == default.json()["next_cursor"] is not None
+    following = stocked_client.get("/inventory", params={"limit": 5, "cursor": cursor})
+    assert following.status_code == 200
+    assert following.json()["items"][0]["id"] not in {
+        item["id"] for item in response.json()["items"]
+    }
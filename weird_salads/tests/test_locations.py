@@ -0,0 +1,152 @@
+"""
+Per-location databases: which database a location's data lives in, and
+the LocationMiddleware routing each request to it
+"""
+
+import pytest
+from sqlalchemy import select
+
+from weird_salads.api.locations import LocationMiddleware
+from weird_salads.inventory.inventory_service.availability_cache import (
+    availability_cache_for,
+)
+from weird_salads.inventory.repository.models import MenuModel
+from weird_salads.tests.conftest import create_database
+from weird_salads.utils import sharding
+from weird_salads.utils.database.migrate_db import served_database_urls
+from weird_salads.utils.sharding import (
+    UnknownLocationError,
+    location_database_url,
+    resolve_location,
+)
+from weird_salads.utils.unit_of_work import UnitOfWork
+
+
+@pytest.fixture
+def served(database_url, tmp_path, monkeypatch):
+    """
+    Serve locations 1 and 2, each from its own seeded database
+    """
+    template = f"sqlite:///{tmp_path}/orders_{{location_id}}.db"
+    monkeypatch.setenv("LOCATION_DATABASE_URL", template)
+    monkeypatch.setenv("LOCATION_IDS", "1,2")
+    monkeypatch.delenv("LOCATION_DATABASE_URLS", raising=False)
+    monkeypatch.setattr(sharding, "_SERVED", frozenset({1, 2}))
+    sharding._location_database_url.cache_clear()
+    for location_id in (1, 2):
+        create_database(tmp_path / f"orders_{location_id}.db", location_id)
+    yield template
+    sharding._location_database_url.cache_clear()
+
+
+@pytest.fixture
+def client(served):
+    from fastapi.testclient import TestClient
+
+    from weird_salads.api.app import app
+
+    with TestClient(LocationMiddleware(app)) as client:
+        yield client
+
+
+def menu_ids(database_url: str):
+    with UnitOfWork(database_url) as unit_of_work:
+        return sorted(unit_of_work.session.scalars(select(MenuModel.id)))
+
+
+def test_location_database_urls(served, database_url, monkeypatch):
+    assert location_database_url(2, sharded=True) == served.format(location_id=2)
+    assert location_database_url(2, sharded=False) == database_url
+
+    monkeypatch.setenv("LOCATION_DATABASE_URLS", '{"2": "sqlite:///elsewhere.db"}')
+    sharding._location_database_url.cache_clear()
+    assert location_database_url(2, sharded=True) == "sqlite:///elsewhere.db"
+
+
+def test_every_served_database_is_migrated(served, database_url, monkeypatch):
+    assert served_database_urls() == [
+        database_url,
+        served.format(location_id=1),
+        served.format(location_id=2),
+    ]
+
+    monkeypatch.setenv("LOCATION_IDS", "")
+    assert served_database_urls() == [database_url]
+
+
+def test_resolving_locations(served, monkeypatch):
+    assert resolve_location("2") == 2
+    for value in ("", "two", "3"):
+        with pytest.raises(UnknownLocationError):
+            resolve_location(value)
+
+    monkeypatch.setattr(sharding, "_SERVED", frozenset({2}))
+    assert resolve_location("") == 2
+
+
+def test_requests_are_served_from_their_location(client, served):
+    for location_id in (1, 2):
+        response = client.get("/menu", headers={"X-Location-Id": str(location_id)})
+        assert response.status_code == 200
+        assert response.headers["Vary"] == "x-location-id"
+        assert sorted(item["id"] for item in response.json()["items"]) == menu_ids(
+            served.format(location_id=location_id)
+        )
+
+    by_parameter = client.get("/menu", params={"location_id": 2})
+    assert (
+        by_parameter.json()
+        == client.get("/menu", headers={"X-Location-Id": "2"}).json()
+    )
+
+
+def test_orders_stay_at_their_location(client):
+    menu_id = next(
+        item["id"]
+        for item in client.get(
+            "/menu/availability", headers={"X-Location-Id": "1"}
+        ).json()["items"]
+        if item["available_portions"] > 0
+    )
+    order = client.post(
+        "/order", json={"menu_id": menu_id}, headers={"X-Location-Id": "1"}
+    ).json()
+
+    def listed(location_id):
+        response = client.get("/order", headers={"X-Location-Id": location_id})
+        return [order["id"] for order in response.json()["orders"]]
+
+    assert listed("1") == [order["id"]]
+    assert listed("2") == []
+
+
+@pytest.mark.parametrize(
+    "headers, status_code",
+    [({}, 400), ({"X-Location-Id": "two"}, 400), ({"X-Location-Id": "3"}, 404)],
+)
+def test_unserved_locations_are_rejected(client, headers, status_code):
+    assert client.get("/menu", headers=headers).status_code == status_code
+
+
+def test_status_is_served_without_a_location(client):
+    assert client.get("/status/database").status_code == 200
+
+
+def test_each_database_has_its_own_availability_cache(served, database_url):
+    caches = []
+    for url in (database_url, *(served.format(location_id=i) for i in (1, 2))):
+        with UnitOfWork(url) as unit_of_work:
+            caches.append(availability_cache_for(unit_of_work.session))
+    assert len({id(cache) for cache in caches}) == 3
+
+
+def test_a_new_database_url_gets_its_own_availability_cache(
+    database_url, tmp_path, monkeypatch
+):
+    caches = []
+    for name in ("first.db", "second.db"):
+        url = create_database(tmp_path / name)
+        monkeypatch.setenv("DATABASE_URL", url)
+        with UnitOfWork() as unit_of_work:
+            caches.append(availability_cache_for(unit_of_work.session))
+    assert caches[0] is not caches[1]
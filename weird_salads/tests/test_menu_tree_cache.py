@@ -0,0 +1,115 @@
+"""
+The menu tree cache: LRU bounds, and invalidation when menu writes commit
+"""
+
+from sqlalchemy import select
+
+from weird_salads.inventory.repository.inventory_repository import MenuRepository
+from weird_salads.inventory.repository.menu_tree_cache import (
+    MenuTreeCache,
+    menu_tree_cache,
+)
+from weird_salads.inventory.repository.models import IngredientsModel, MenuModel
+from weird_salads.utils.engine import database_key
+from weird_salads.utils.unit_of_work import UnitOfWork
+
+
+def test_least_recently_used_trees_are_evicted():
+    cache = MenuTreeCache(size=2)
+    for menu_id in (1, 2):
+        cache.put("db", menu_id, f"tree {menu_id}", cache.generation)
+    assert cache.get("db", 1) == "tree 1"
+
+    cache.put("db", 3, "tree 3", cache.generation)
+
+    assert cache.get("db", 2) is None
+    assert (cache.get("db", 1), cache.get("db", 3)) == ("tree 1", "tree 3")
+    assert cache.statistics() == {
+        "hits": 3,
+        "misses": 1,
+        "evictions": 1,
+        "invalidations": 0,
+        "size": 2,
+        "capacity": 2,
+    }
+
+
+def test_a_load_racing_an_invalidation_is_dropped():
+    cache = MenuTreeCache()
+    generation = cache.generation
+    cache.invalidate(1)
+    cache.put("db", 1, "stale tree", generation)
+    assert cache.get("db", 1) is None
+
+
+def test_invalidating_an_item_drops_it_from_every_database():
+    cache = MenuTreeCache()
+    for database in ("a", "b"):
+        cache.put(database, 1, "tree", cache.generation)
+        cache.put(database, 2, "tree", cache.generation)
+
+    cache.invalidate(1)
+
+    assert cache.get("a", 1) is None and cache.get("b", 1) is None
+    assert cache.get("a", 2) == cache.get("b", 2) == "tree"
+
+
+def get_tree(menu_id: int):
+    with UnitOfWork() as unit_of_work:
+        return MenuRepository(unit_of_work.session).get_tree(menu_id)
+
+
+def rename(model, id, name: str, commit: bool) -> None:
+    with UnitOfWork() as unit_of_work:
+        unit_of_work.session.get(model, id).name = name
+        unit_of_work.session.flush()
+        if commit:
+            unit_of_work.commit()
+        else:
+            unit_of_work.rollback()
+
+
+def menu_ids(count: int):
+    with UnitOfWork() as unit_of_work:
+        return unit_of_work.session.scalars(select(MenuModel.id).limit(count)).all()
+
+
+def first_menu_id() -> int:
+    return menu_ids(1)[0]
+
+
+def test_trees_are_served_from_the_cache(database_url):
+    menu_id = first_menu_id()
+    hits = menu_tree_cache.statistics()["hits"]
+
+    tree = get_tree(menu_id)
+
+    assert get_tree(menu_id) is tree
+    assert menu_tree_cache.statistics()["hits"] == hits + 1
+
+
+def test_committed_menu_writes_invalidate_the_item(database_url):
+    menu_id = first_menu_id()
+    tree = get_tree(menu_id)
+
+    rename(MenuModel, menu_id, "Rolled back", commit=False)
+    assert get_tree(menu_id) is tree
+
+    rename(MenuModel, menu_id, "Renamed", commit=True)
+    assert get_tree(menu_id).name == "Renamed"
+
+
+def test_ingredient_writes_invalidate_every_item(database_url):
+    menu_id, other_id = menu_ids(2)
+    ingredient = get_tree(menu_id).ingredients[0].ingredient
+    get_tree(other_id)
+
+    rename(IngredientsModel, ingredient.id, "Renamed", commit=True)
+
+    (renamed,) = [
+        ri.ingredient
+        for ri in get_tree(menu_id).ingredients
+        if ri.ingredient.id == ingredient.id
+    ]
+    assert renamed.name == "Renamed"
+    assert menu_tree_cache.get(database_key(database_url), other_id) is None
@@ -0,0 +1,113 @@
+"""
+GET /metrics: per-route counters, histograms and the in-progress gauge
+"""
+
+import pytest
+
+from weird_salads.api.metrics import LATENCY_BUCKETS, MetricsMiddleware, RequestMetrics
+
+
+def samples(text: str):
+    """
+    {metric{labels}: value} for every sample of a Prometheus text exposition
+    """
+    return {
+        name: float(value)
+        for name, value in (
+            line.rsplit(" ", 1) for line in text.splitlines() if line[:1] != "#"
+        )
+    }
+
+
+@pytest.fixture
+def metrics():
+    return RequestMetrics()
+
+
+@pytest.fixture
+def client(database_url, metrics):
+    """
+    A client whose requests are all recorded in `metrics`
+    """
+    from fastapi.testclient import TestClient
+
+    from weird_salads.api.app import app
+
+    with TestClient(MetricsMiddleware(app, metrics=metrics)) as client:
+        yield client
+
+
+def requests_total(rendered, route: str, status: int, method: str = "GET"):
+    labels = f'method="{method}",route="{route}",status="{status}"'
+    return rendered.get(f"http_requests_total{{{labels}}}", 0)
+
+
+def test_requests_are_labelled_by_route_template(client, metrics):
+    menu_id = client.get("/menu").json()["items"][0]["id"]
+    client.get(f"/menu/{menu_id}")
+    client.get(f"/menu/{menu_id}")
+    client.get("/no/such/route")
+
+    rendered = samples(metrics.render())
+
+    assert requests_total(rendered, "/menu", 200) == 1
+    assert requests_total(rendered, "/menu/{item_id}", 200) == 2
+    assert requests_total(rendered, "unmatched", 404) == 1
+    assert not [name for name in rendered if f"/menu/{menu_id}" in name]
+
+
+def test_statuses_are_counted_separately(client, metrics):
+    client.get("/menu/999999")
+    client.get("/menu/999999")
+    client.get("/menu")
+
+    rendered = samples(metrics.render())
+
+    assert requests_total(rendered, "/menu/{item_id}", 404) == 2
+    assert requests_total(rendered, "/menu/{item_id}", 200) == 0
+    assert requests_total(rendered, "/menu", 200) == 1
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = RequestMetrics()
+    for seconds in (0.003, 0.2, 20.0):
+        metrics.started("GET")
+        metrics.finished("GET", "/menu", 200, seconds, 0.001, 2)
+
+    rendered = samples(metrics.render())
+
+    labels = 'method="GET",route="/menu"'
+    buckets = {
+        str(bound): rendered[
+            f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}}'
+        ]
+        for bound in LATENCY_BUCKETS + ("+Inf",)
+    }
+    assert list(buckets.values()) == sorted(buckets.values())
+    assert (buckets["0.0025"], buckets["0.005"], buckets["0.25"]) == (0, 1, 2)
+    assert (buckets["10.0"], buckets["+Inf"]) == (2, 3)
+    name = "http_request_duration_seconds"
+    assert rendered[f"{name}_sum{{{labels}}}"] == pytest.approx(20.203)
+    assert rendered[f"{name}_count{{{labels}}}"] == 3
+    assert rendered[f"http_request_db_duration_seconds_count{{{labels}}}"] == 3
+    assert rendered[f"http_request_db_queries_total{{{labels}}}"] == 6
+
+
+def test_in_progress_requests_return_to_zero(client, metrics):
+    metrics.started("GET")
+    assert samples(metrics.render())['http_requests_in_progress{method="GET"}'] == 1
+    metrics.finished("GET", "/menu", 200, 0.01, 0.0, 0)
+
+    client.get("/menu")
+    client.post("/order", json={"menu_id": -1})
+
+    rendered = samples(metrics.render())
+    assert rendered['http_requests_in_progress{method="GET"}'] == 0
+    assert rendered['http_requests_in_progress{method="POST"}'] == 0
+
+
+def test_metrics_are_served(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE http_requests_total counter" in response.text
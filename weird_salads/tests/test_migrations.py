@@ -0,0 +1,67 @@
+"""
+The Alembic migrations build the schema the models declare
+"""
+
+import argparse
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import bindparam, inspect, text
+
+from weird_salads.tests.conftest import DATA_PATH
+from weird_salads.tests.test_compaction import deplete
+from weird_salads.utils.database import seed_db
+from weird_salads.utils.database.compact_db import compact_stock
+from weird_salads.utils.database.seed_db import migrate
+from weird_salads.utils.engine import dispose_engines, get_engine
+from weird_salads.utils.sqlalchemy_base import Base
+
+ROOT = Path(__file__).parents[2]
+
+
+@pytest.fixture
+def migrated(tmp_path, monkeypatch):
+    """
+    A database migrated to head, as its URL
+    """
+    # script_location in alembic.ini is relative to the repository root
+    monkeypatch.chdir(ROOT)
+    database_url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    migrate(database_url, ROOT / "alembic.ini")
+    yield database_url
+    dispose_engines()
+
+
+def test_the_migrated_schema_matches_the_models(migrated):
+    with get_engine(migrated).connect() as connection:
+        context = MigrationContext.configure(
+            connection, opts={"compare_server_default": True, "compare_type": True}
+        )
+        assert compare_metadata(context, Base.metadata) == []
+
+
+def test_downgrading_the_archive_restores_archived_lots(migrated):
+    seed_db.main(1, 1000, DATA_PATH, database_url=migrated)
+    ids = deplete(3, migrated)
+    assert compact_stock(database_url=migrated)["archived"] == 3
+
+    config = Config(str(ROOT / "alembic.ini"))
+    config.cmd_opts = argparse.Namespace(x=[f"database_url={migrated}"])
+    config.attributes["configure_logger"] = False
+    dispose_engines()
+    command.downgrade(config, "e3a9c5f17b62")
+
+    engine = get_engine(migrated)
+    assert "stock_archive" not in inspect(engine).get_table_names()
+    with engine.connect() as connection:
+        restored = connection.execute(
+            text(
+                "SELECT id, quantity, quantity_ml FROM stock WHERE id IN :ids"
+            ).bindparams(bindparam("ids", expanding=True)),
+            {"ids": ids},
+        ).all()
+    assert sorted(restored) == sorted((id_, 0.0, 0.0) for id_ in ids)
@@ -0,0 +1,100 @@
+"""
+POST /order/batch, and the OrdersService batch placement behind it
+"""
+
+from weird_salads.api.schemas import OrderLineStatus
+from weird_salads.orders.orders_service.orders import Order
+from weird_salads.orders.orders_service.orders_service import OrdersService
+
+
+class FakeInventoryClient:
+    """
+    One ingredient (id 1): `available` litres, 0.1 litres per portion
+    """
+
+    def __init__(self, available: float):
+        self.available = available
+        self.deducted = []
+
+    def get_availability(self, menu_id):
+        return {
+            "available_portions": int(self.available / 0.1),
+            "ingredient_availability": [
+                {
+                    "ingredient": {"id": 1},
+                    "required_quantity": 0.1,
+                    "available_quantity": self.available,
+                    "unit": "liter",
+                }
+            ],
+        }
+
+    def deduct_stock(self, ingredient_id, quantity, unit):
+        self.deducted.append((ingredient_id, abs(quantity)))
+        return abs(quantity)
+
+    def deduct_stocks(self, deductions):
+        return [self.deduct_stock(*deduction) for deduction in deductions]
+
+
+class FakeOrdersRepository:
+    def add_many(self, menu_ids):
+        return [Order(str(i), None, menu_id) for i, menu_id in enumerate(menu_ids)]
+
+
+def test_a_batch_that_exactly_fits_is_placed():
+    # 0.3 // 0.1 == 2.0 in floating point litres
+    client = FakeInventoryClient(available=0.3)
+    service = OrdersService(FakeOrdersRepository(), client)
+
+    (line,) = service.place_orders([{"menu_id": 1, "quantity": 3}])
+
+    assert line["placed"] == 3
+    assert line["status"] == OrderLineStatus.placed
+    assert sum(quantity for _, quantity in client.deducted) == 0.1 * 3
+
+
+def test_partial_batches_place_what_fits():
+    service = OrdersService(FakeOrdersRepository(), FakeInventoryClient(1.0))
+
+    first, second = service.place_orders(
+        [{"menu_id": 1, "quantity": 6}, {"menu_id": 2, "quantity": 6}], partial=True
+    )
+
+    assert (first["placed"], first["status"]) == (6, OrderLineStatus.placed)
+    assert (second["placed"], second["status"]) == (4, OrderLineStatus.partial)
+
+
+def available_menu_id(client) -> int:
+    items = client.get("/menu/availability").json()["items"]
+    return next(item["id"] for item in items if item["available_portions"] > 1)
+
+
+def test_batch_orders_are_listed_like_single_orders(client):
+    menu_id = available_menu_id(client)
+    single = client.post("/order", json={"menu_id": menu_id}).json()
+
+    response = client.post(
+        "/order/batch", json={"items": [{"menu_id": menu_id, "quantity": 1}]}
+    )
+    assert response.status_code == 201
+    (batch,) = response.json()["lines"][0]["orders"]
+
+    listed = {order["id"]: order for order in client.get("/order").json()["orders"]}
+    assert listed[single["id"]]["created"] <= listed[batch["id"]]["created"]
+    # one timestamp representation (naive UTC) for both paths
+    assert batch["created"] == listed[batch["id"]]["created"]
+
+
+def test_a_batch_with_nothing_placed_is_a_conflict(client):
+    menu_id = available_menu_id(client)
+
+    response = client.post(
+        "/order/batch", json={"items": [{"menu_id": menu_id, "quantity": 10**6}]}
+    )
+
+    assert response.status_code == 409
+    (line,) = response.json()["detail"]["lines"]
+    assert line["placed"] == 0
+    assert line["status"] == "rejected"
+    assert client.get("/order").json()["orders"] == []
@@ -0,0 +1,112 @@
+"""
+Keyset pagination: the cursor codec, and paging through GET /order and
+GET /inventory
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from weird_salads.utils.pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    split_page,
+    to_naive_utc,
+)
+
+
+def test_cursors_round_trip():
+    created = datetime(2024, 8, 5, 23, 52, 43, 498404)
+    cursor = encode_cursor(created, "e893be34")
+    assert decode_cursor(cursor) == (created, "e893be34")
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", encode_cursor.__name__])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_split_page():
+    items = [(datetime(2024, 1, day), str(day)) for day in (3, 2, 1)]
+    page, cursor = split_page(items, 2, key=lambda item: item)
+    assert page == items[:2]
+    assert decode_cursor(cursor) == items[1]
+    assert split_page(items, 3, key=lambda item: item) == (items, None)
+
+
+def test_to_naive_utc():
+    aware = datetime(2024, 1, 1, 12, tzinfo=timezone(timedelta(hours=2)))
+    assert to_naive_utc(aware) == datetime(2024, 1, 1, 10)
+    assert to_naive_utc(datetime(2024, 1, 1)) == datetime(2024, 1, 1)
+    assert to_naive_utc(None) is None
+
+
+def place_orders(client, count: int):
+    menu_id = next(
+        item["id"]
+        for item in client.get("/menu/availability").json()["items"]
+        if item["available_portions"] >= count
+    )
+    orders = []
+    for _ in range(count):
+        orders.append(client.post("/order", json={"menu_id": menu_id}).json())
+        time.sleep(0.01)
+    return orders
+
+
+def test_orders_are_timestamped_when_placed(client):
+    orders = place_orders(client, 3)
+    assert len({order["created"] for order in orders}) == 3
+
+
+def test_paging_through_orders(client):
+    placed = place_orders(client, 5)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/order", params=params).json()
+        seen += page["orders"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # newest first, each order once
+    assert [order["id"] for order in seen] == [order["id"] for order in placed][::-1]
+
+
+def test_order_date_filters(client):
+    first, second, third = place_orders(client, 3)
+
+    # an aware bound is compared in UTC
+    bound = datetime.fromisoformat(second["created"]).replace(tzinfo=timezone.utc)
+    local = bound.astimezone(timezone(timedelta(hours=2)))
+    after = client.get("/order", params={"created_after": local.isoformat()})
+    before = client.get("/order", params={"created_before": bound.isoformat()})
+    after, before = after.json()["orders"], before.json()["orders"]
+
+    assert [order["id"] for order in after] == [third["id"], second["id"]]
+    assert [order["id"] for order in before] == [first["id"]]
+
+
+def test_invalid_cursor_is_a_bad_request(client):
+    assert client.get("/order", params={"cursor": "nope"}).status_code == 400
+
+
+def test_paging_through_stock(client):
+    lots = []
+    cursor = None
+    while True:
+        params = {"limit": 50, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/inventory", params=params).json()
+        lots += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    keys = [(lot["delivery_date"], lot["id"]) for lot in lots]
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys) > 50
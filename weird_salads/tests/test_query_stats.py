@@ -0,0 +1,86 @@
+"""
+Per-request statement accounting: the N+1 warning, nesting, and the
+X-DB-* debug headers
+"""
+
+import logging
+
+from sqlalchemy import select
+
+from weird_salads.api.metrics import QueryStatsMiddleware
+from weird_salads.inventory.repository.models import MenuModel
+from weird_salads.utils.query_stats import QUERY_REPEAT_WARNING, track_queries
+from weird_salads.utils.unit_of_work import UnitOfWork
+
+
+def run_menu_lookups(count: int) -> None:
+    with UnitOfWork() as unit_of_work:
+        for menu_id in range(count):
+            unit_of_work.session.execute(
+                select(MenuModel).where(MenuModel.id == menu_id)
+            )
+
+
+def n_plus_one_warnings(caplog):
+    return [
+        record.getMessage()
+        for record in caplog.records
+        if record.getMessage().startswith("Possible N+1")
+    ]
+
+
+def test_repeated_statements_are_logged(database_url, caplog):
+    with caplog.at_level(logging.WARNING, logger="weird_salads.utils.query_stats"):
+        with track_queries("lookups") as stats:
+            run_menu_lookups(QUERY_REPEAT_WARNING + 1)
+
+    assert stats.queries == QUERY_REPEAT_WARNING + 1
+    (warning,) = n_plus_one_warnings(caplog)
+    assert warning.startswith(f"Possible N+1: lookups ran {QUERY_REPEAT_WARNING + 1}")
+    assert "FROM menu" in warning
+
+
+def test_statements_up_to_the_threshold_are_not_logged(database_url, caplog):
+    with caplog.at_level(logging.WARNING, logger="weird_salads.utils.query_stats"):
+        with track_queries("lookups"):
+            run_menu_lookups(QUERY_REPEAT_WARNING)
+
+    assert n_plus_one_warnings(caplog) == []
+
+
+def test_nested_blocks_share_the_outermost_counter(database_url):
+    with track_queries("outer") as outer:
+        run_menu_lookups(2)
+        with track_queries("inner") as inner:
+            run_menu_lookups(3)
+
+    assert inner is outer
+    assert outer.queries == 5
+    assert outer.seconds > 0
+
+
+def test_statements_outside_a_block_are_not_counted(database_url):
+    with track_queries() as stats:
+        pass
+    run_menu_lookups(3)
+    assert stats.queries == 0
+
+
+def test_debug_headers(database_url):
+    from fastapi.testclient import TestClient
+
+    from weird_salads.api.app import API_DEBUG, app
+
+    # API_DEBUG=1 installs the middleware with headers=True
+    (installed,) = [m for m in app.user_middleware if m.cls is QueryStatsMiddleware]
+    assert installed.kwargs == {"headers": API_DEBUG}
+
+    with TestClient(QueryStatsMiddleware(app, headers=True)) as client:
+        response = client.get("/menu")
+
+    assert int(response.headers["X-DB-Queries"]) >= 1
+    assert float(response.headers["X-DB-Time-Ms"]) > 0
+
+
+def test_no_debug_headers_by_default(client):
+    assert "X-DB-Queries" not in client.get("/menu").headers
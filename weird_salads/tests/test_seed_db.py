@@ -0,0 +1,81 @@
+"""
+migrate_db.py and seed_db.py put a location's data where the API reads it
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parents[2]
+
+
+def run(module: str, *args: str, env, check=True) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-m", f"weird_salads.utils.database.{module}", *args],
+        cwd=ROOT,
+        env={**os.environ, **env},
+        check=check,
+        capture_output=True,
+        text=True,
+    )
+
+
+def menu_rows(path: Path) -> int:
+    with sqlite3.connect(path) as connection:
+        return connection.execute("SELECT count(*) FROM menu").fetchone()[0]
+
+
+@pytest.mark.parametrize(
+    "location_ids, seeded",
+    [("", "orders.db"), ("1", "orders_1.db"), ("1,2", "orders_1.db")],
+)
+def test_seeding_one_location(tmp_path, location_ids, seeded):
+    env = {
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'orders.db'}",
+        "LOCATION_DATABASE_URL": f"sqlite:///{tmp_path}/orders_{{location_id}}.db",
+        "LOCATION_IDS": location_ids,
+    }
+    run("migrate_db", env=env)
+    run("seed_db", "--location_id", "1", "--base_path", "data/", env=env)
+
+    served = ["orders.db"] + [f"orders_{i}.db" for i in location_ids.split(",") if i]
+    assert sorted(path.name for path in tmp_path.glob("*.db")) == sorted(served)
+    for name in served:
+        assert (menu_rows(tmp_path / name) > 0) == (name == seeded)
+    # checkpointed: every seeded row is in the database file itself
+    assert not [path for path in tmp_path.glob("*-wal") if path.stat().st_size]
+
+
+def test_a_failed_location_fails_the_seed(tmp_path):
+    env = {"LOCATION_DATABASE_URL": f"sqlite:///{tmp_path}/orders_{{location_id}}.db"}
+    # no location 999 in data/menus.csv
+    seeding = run(
+        "seed_db",
+        "--location_id",
+        "1",
+        "999",
+        "--base_path",
+        "data/",
+        env=env,
+        check=False,
+    )
+
+    assert seeding.returncode != 0
+    assert "Seeding failed for locations [999]" in seeding.stdout + seeding.stderr
+    # the other location is seeded all the same
+    assert menu_rows(tmp_path / "orders_1.db") > 0
+    assert menu_rows(tmp_path / "orders_999.db") == 0
+
+
+def test_a_failed_seed_exits_non_zero(tmp_path):
+    env = {"DATABASE_URL": f"sqlite:///{tmp_path / 'orders.db'}", "LOCATION_IDS": ""}
+    seeding = run(
+        "seed_db", "--location_id", "999", "--base_path", "data/", env=env, check=False
+    )
+
+    assert seeding.returncode == 1
+    assert "location_id 999 not found" in seeding.stdout + seeding.stderr
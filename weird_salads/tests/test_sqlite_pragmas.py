@@ -0,0 +1,92 @@
+"""
+SQLite connection PRAGMAs (SQLITE_PROFILE / SQLITE_PRAGMAS) and the
+periodic WAL checkpoints
+"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from weird_salads.utils.engine import dispose_engines, get_engine, sqlite_pragmas
+from weird_salads.utils.wal_checkpoint import WalCheckpointer, wal_checkpointer
+
+
+def pragma(url: str, name: str):
+    with get_engine(url).connect() as connection:
+        return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+@pytest.fixture
+def database(tmp_path):
+    yield f"sqlite:///{tmp_path / 'pragmas.db'}"
+    dispose_engines()
+
+
+@pytest.mark.parametrize(
+    "profile, journal_mode, synchronous",
+    [
+        ("wal", "wal", 1),  # NORMAL
+        ("rollback", "delete", 2),  # FULL
+    ],
+)
+def test_profiles_set_the_journal_mode(
+    database, monkeypatch, profile, journal_mode, synchronous
+):
+    monkeypatch.setenv("SQLITE_PROFILE", profile)
+
+    assert pragma(database, "journal_mode") == journal_mode
+    assert pragma(database, "synchronous") == synchronous
+
+
+def test_pragmas_override_the_profile(database, monkeypatch):
+    monkeypatch.setenv("SQLITE_PROFILE", "wal")
+    monkeypatch.setenv("SQLITE_PRAGMAS", "busy_timeout=12345, synchronous=OFF")
+
+    assert pragma(database, "busy_timeout") == 12345
+    assert pragma(database, "synchronous") == 0
+    assert pragma(database, "journal_mode") == "wal"
+
+
+@pytest.mark.parametrize(
+    "pragmas",
+    ["busy_timeout=1;DROP TABLE stock", "1busy=2", "journal mode=WAL", "synchronous="],
+)
+def test_malformed_pragmas_are_rejected(monkeypatch, pragmas):
+    monkeypatch.setenv("SQLITE_PRAGMAS", f"busy_timeout=100,{pragmas}")
+
+    with pytest.raises(ValueError, match="Invalid SQLITE_PRAGMAS entry"):
+        sqlite_pragmas()
+
+
+def test_unknown_profiles_are_rejected(monkeypatch):
+    monkeypatch.setenv("SQLITE_PROFILE", "fast")
+
+    with pytest.raises(ValueError, match="Unknown SQLITE_PROFILE"):
+        sqlite_pragmas()
+
+
+def test_checkpoint_modes_are_checked():
+    with pytest.raises(ValueError):
+        WalCheckpointer(mode="EVENTUALLY")
+
+
+def test_the_checkpointer_runs_with_the_app(database_url, monkeypatch):
+    from weird_salads.api.app import app
+
+    monkeypatch.setattr(wal_checkpointer, "interval", 0.05)
+    assert not wal_checkpointer.statistics()["running"]
+
+    with TestClient(app) as client:
+        assert wal_checkpointer.statistics()["running"]
+        client.get("/menu")
+        before = wal_checkpointer.statistics()["checkpoints"]
+        deadline = time.monotonic() + 5
+        while wal_checkpointer.statistics()["checkpoints"] == before:
+            assert time.monotonic() < deadline, "no periodic checkpoint"
+            time.sleep(0.01)
+
+    statistics = wal_checkpointer.statistics()
+    assert not statistics["running"]
+    # shutdown leaves the WAL empty
+    assert statistics["last"][database_url]["mode"] == "TRUNCATE"
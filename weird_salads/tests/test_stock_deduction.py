@@ -0,0 +1,132 @@
+"""
+FIFO stock deduction: oldest lots first, every ingredient of an order in one
+read and one UPDATE, and a compare-and-swap on each lot's version
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, update
+
+from weird_salads.inventory.inventory_service.exceptions import (
+    InsufficientStockError,
+    StockConflictError,
+)
+from weird_salads.inventory.inventory_service.inventory_service import MenuService
+from weird_salads.inventory.repository.inventory_repository import MenuRepository
+from weird_salads.inventory.repository.models import StockModel, UnitOfMeasure
+from weird_salads.utils.query_stats import track_queries
+from weird_salads.utils.unit_of_work import UnitOfWork
+
+
+def stocked_ingredients(session, count: int):
+    return session.scalars(
+        select(StockModel.ingredient_id)
+        .where(StockModel.quantity_ml > 0)
+        .group_by(StockModel.ingredient_id)
+        .limit(count)
+    ).all()
+
+
+def add_old_lots(session, ingredient_id: int, litres):
+    """
+    Lots delivered (in order) before any seeded stock, so FIFO draws on them
+    first; returns their ids
+    """
+    repository = MenuRepository(session)
+    lots = []
+    for day, quantity in enumerate(litres, start=1):
+        stock_item = repository.add_stock(
+            {
+                "ingredient_id": ingredient_id,
+                "unit": UnitOfMeasure.liter,
+                "quantity": quantity,
+                "cost": 1.0,
+                "delivery_date": datetime(2000, 1, day),
+            }
+        )
+        lots.append(stock_item)
+    session.flush()
+    return [lot.id for lot in lots]
+
+
+def quantity_ml(session, lot_id: str) -> float:
+    return session.scalar(select(StockModel.quantity_ml).where(StockModel.id == lot_id))
+
+
+def test_oldest_lots_are_drawn_first(database_url):
+    with UnitOfWork() as unit_of_work:
+        session = unit_of_work.session
+        (ingredient_id,) = stocked_ingredients(session, 1)
+        first, second = add_old_lots(session, ingredient_id, [1.0, 2.0])
+
+        draws = MenuRepository(session).deduct_stocks_fifo(
+            [(ingredient_id, 1500, UnitOfMeasure.milliliter)]
+        )
+
+        assert draws[ingredient_id] == [
+            (UnitOfMeasure.liter, 1.0),
+            (UnitOfMeasure.liter, 0.5),
+        ]
+        assert quantity_ml(session, first) == 0
+        assert quantity_ml(session, second) == 1500
+
+
+def test_an_order_is_one_read_and_one_update(database_url):
+    with UnitOfWork() as unit_of_work:
+        session = unit_of_work.session
+        ingredient_ids = stocked_ingredients(session, 3)
+        for ingredient_id in ingredient_ids:
+            add_old_lots(session, ingredient_id, [0.1, 0.1])
+
+        with track_queries() as stats:
+            draws = MenuRepository(session).deduct_stocks_fifo(
+                [(i, 0.15, UnitOfMeasure.liter) for i in ingredient_ids]
+            )
+
+        assert stats.queries == 2
+        assert all(len(draws[i]) == 2 for i in ingredient_ids)
+
+
+def test_a_short_ingredient_deducts_nothing(database_url):
+    with UnitOfWork() as unit_of_work:
+        session = unit_of_work.session
+        stocked, short = stocked_ingredients(session, 2)
+        (lot,) = add_old_lots(session, stocked, [1.0])
+        service = MenuService(MenuRepository(session))
+        short_litres = service.menu_repository.list_stock_totals()[short][0][1] / 1000
+
+        with pytest.raises(InsufficientStockError):
+            service.deduct_stocks(
+                [
+                    (stocked, 0.5, UnitOfMeasure.liter),
+                    (short, short_litres + 1, UnitOfMeasure.liter),
+                ]
+            )
+        assert quantity_ml(session, lot) == 1000
+
+
+def test_lots_changed_since_they_were_read_are_a_conflict(database_url):
+    with UnitOfWork() as unit_of_work:
+        session = unit_of_work.session
+        (ingredient_id,) = stocked_ingredients(session, 1)
+        (lot,) = add_old_lots(session, ingredient_id, [1.0])
+
+        # another deduction lands between the plan and the UPDATE
+        execute = session.execute
+
+        def interleaved(statement, *args, **kwargs):
+            result = execute(statement, *args, **kwargs)
+            if statement.is_select:
+                result = result.freeze()
+                execute(update(StockModel).values(version=StockModel.version + 1))
+                return result()
+            return result
+
+        session.execute = interleaved
+        with pytest.raises(StockConflictError):
+            MenuRepository(session).deduct_stocks_fifo(
+                [(ingredient_id, 0.5, UnitOfMeasure.liter)]
+            )
+        session.execute = execute
+        assert quantity_ml(session, lot) == 1000
@@ -0,0 +1,69 @@
+"""
+run_with_retry reruns the whole unit of work on a conflict, and nothing else
+"""
+
+import pytest
+
+from weird_salads.inventory.inventory_service.exceptions import (
+    InsufficientStockError,
+    StockConflictError,
+)
+from weird_salads.utils import unit_of_work as uow
+from weird_salads.utils.exceptions import ConcurrencyError
+from weird_salads.utils.unit_of_work import retry_statistics, run_with_retry
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(uow, "RETRY_BACKOFF", 0.0)
+
+
+def flaky(errors):
+    """
+    Work that raises each of `errors` in turn, then returns its attempt count
+    """
+    attempts = []
+
+    def work(unit_of_work):
+        attempts.append(unit_of_work)
+        if len(attempts) <= len(errors):
+            raise errors[len(attempts) - 1]
+        return len(attempts)
+
+    return work, attempts
+
+
+def counted(before):
+    after = retry_statistics()
+    return {name: after[name] - before[name] for name in after}
+
+
+def test_stock_conflicts_are_concurrency_errors():
+    assert issubclass(StockConflictError, ConcurrencyError)
+
+
+def test_conflicts_are_retried_in_a_fresh_unit_of_work(database_url):
+    before = retry_statistics()
+    work, attempts = flaky([StockConflictError("changed")])
+
+    assert run_with_retry(work) == 2
+    assert attempts[0] is not attempts[1]
+    assert counted(before) == {"conflicts": 1, "locked": 0, "retries": 1, "aborts": 0}
+
+
+def test_other_errors_are_not_retried(database_url):
+    work, attempts = flaky([InsufficientStockError("short")])
+
+    with pytest.raises(InsufficientStockError):
+        run_with_retry(work)
+    assert len(attempts) == 1
+
+
+def test_gives_up_after_the_last_attempt(database_url):
+    before = retry_statistics()
+    work, attempts = flaky([StockConflictError("changed")] * 3)
+
+    with pytest.raises(StockConflictError):
+        run_with_retry(work, attempts=3)
+    assert len(attempts) == 3
+    assert counted(before) == {"conflicts": 3, "locked": 0, "retries": 2, "aborts": 1}
@@ -0,0 +1,98 @@
+"""
+Per-process data versions, for ETags on the read endpoints
+
+Each resource family ("menu", "stock") of each database has a counter
+that the repositories bump on every write, once the write's session
+commits (a rollback drops it). A response's ETag is built from the
+database and the versions of the families it is read from, so answering
+a conditional GET is a comparison of counters rather than a database
+round trip.
+
+The counters live in this process and start again from 0 on restart, so
+ETags also carry a per-process token. As with the availability cache,
+writes made by other processes (other API workers, seed_db.py) aren't
+seen, and a client could be told its stale copy is current. So it is off
+by default: set CONDITIONAL_GET=1 only for a single API worker that makes
+every write.
+"""
+
+import os
+import threading
+import uuid
+import zlib
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+from weird_salads.utils.engine import database_key
+
+__all__ = ["MENU", "STOCK", "DataVersions", "data_versions"]
+
+# resource families
+MENU = "menu"
+STOCK = "stock"
+
+_PENDING_KEY = "data_versions_pending"
+
+
+class DataVersions:
+    """
+    Monotonically increasing version per (database, resource family), the
+    database named by `utils.engine.database_key`
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.token = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._versions: Dict[Tuple[str, str], int] = {}
+
+    def get(self, database: str, family: str) -> int:
+        return self._versions.get((database, family), 0)
+
+    def bump(self, database: str, *families: str) -> None:
+        with self._lock:
+            for family in families:
+                key = (database, family)
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def etag(self, database: str, *families: str) -> str:
+        """
+        A weak ETag for a response read from `families` of `database`.
+
+        Read it *before* querying the data: a write committed in between
+        then makes the ETag stale (one extra full response), rather than
+        labelling the new data with the old version.
+        """
+        versions = ".".join(str(self.get(database, family)) for family in families)
+        shard = zlib.crc32(database.encode())
+        return f'W/"{self.token}-{shard:08x}-{versions}"'
+
+    # - writes
+    def stage(self, session, family: str) -> None:
+        """
+        Record a write to `family` made in `session`, bumped on commit
+        """
+        if not self.enabled:
+            return
+        pending: Optional[Set[Tuple[str, str]]] = session.info.get(_PENDING_KEY)
+        if pending is None:
+            pending = session.info[_PENDING_KEY] = set()
+            if not session.info.get("data_versions_listening"):
+                session.info["data_versions_listening"] = True
+                event.listen(session, "after_commit", self._after_commit)
+                event.listen(session, "after_rollback", self._after_rollback)
+        pending.add((database_key(session.bind.url), family))
+
+    def _after_commit(self, session) -> None:
+        pending = session.info.pop(_PENDING_KEY, None)
+        for database, family in pending or ():
+            self.bump(database, family)
+
+    def _after_rollback(self, session) -> None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+data_versions = DataVersions(
+    enabled=os.environ.get("CONDITIONAL_GET", "0") == "1",
+)
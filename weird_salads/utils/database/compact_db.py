@@ -0,0 +1,82 @@
+"""
+Move depleted stock lots to the `stock_archive` table
+
+Deductions leave emptied lots in `stock`; compaction moves them out in
+batches (one short transaction each), so the table holds live lots only.
+"""
+
+import argparse
+import logging
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from weird_salads.inventory.inventory_service.inventory_service import MenuService
+from weird_salads.inventory.repository.inventory_repository import MenuRepository
+from weird_salads.utils.unit_of_work import run_with_retry
+
+__all__ = ["COMPACTION_BATCH_SIZE", "compact_stock"]
+
+logger = logging.getLogger(__name__)
+
+# lots moved per transaction
+COMPACTION_BATCH_SIZE = 1000
+
+
+def compact_stock(
+    batch_size: int = COMPACTION_BATCH_SIZE, database_url: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Archive every depleted stock lot, `batch_size` lots per transaction.
+
+    Returns the number of lots archived, the batches it took and the time
+    taken (in seconds).
+    """
+
+    def archive(unit_of_work) -> int:
+        archived = MenuService(
+            MenuRepository(unit_of_work.session)
+        ).archive_depleted_stock(batch_size)
+        unit_of_work.commit()
+        return archived
+
+    start = time.perf_counter()
+    archived = batches = 0
+    while True:
+        moved = run_with_retry(archive, database_url=database_url)
+        if moved == 0:
+            break
+        archived += moved
+        batches += 1
+        if moved < batch_size:
+            break
+
+    seconds = time.perf_counter() - start
+    logger.info(
+        f"Archived {archived} depleted lots in {batches} batches ({seconds:.3f}s)"
+    )
+    return {"archived": archived, "batches": batches, "seconds": round(seconds, 3)}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)],
+    )
+
+    parser = argparse.ArgumentParser(description="Stock Compaction Script")
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=COMPACTION_BATCH_SIZE,
+        help="Depleted lots moved per transaction.",
+    )
+    parser.add_argument(
+        "--database_url",
+        default=None,
+        help="Database to compact (default: DATABASE_URL).",
+    )
+    args = parser.parse_args()
+
+    print(compact_stock(args.batch_size, args.database_url))
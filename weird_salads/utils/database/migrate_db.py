@@ -0,0 +1,61 @@
+"""
+Bring every database the API serves up to the latest Alembic revision:
+DATABASE_URL and, with LOCATION_IDS (or LOCATION_DATABASE_URLS), each
+location's database (see utils/sharding.py). Run before starting the API,
+as the Docker image does.
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+from typing import List
+
+from weird_salads.utils.database.seed_db import migrate
+from weird_salads.utils.engine import get_database_url
+from weird_salads.utils.sharding import location_database_url, served_locations
+
+__all__ = ["served_database_urls", "migrate_databases"]
+
+logger = logging.getLogger(__name__)
+
+
+def served_database_urls() -> List[str]:
+    """
+    DATABASE_URL, then the database of every served location
+    """
+    urls = [get_database_url()] + [
+        location_database_url(location_id, sharded=True)
+        for location_id in served_locations()
+    ]
+    return list(dict.fromkeys(urls))
+
+
+def migrate_databases(alembic_config: Path = Path("alembic.ini")) -> List[str]:
+    """
+    Migrate every served database, returning their URLs
+    """
+    urls = served_database_urls()
+    for url in urls:
+        logger.info(f"Migrating {url}")
+        migrate(url, alembic_config)
+    return urls
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)],
+    )
+
+    parser = argparse.ArgumentParser(description="Database Migration Script")
+    parser.add_argument(
+        "--alembic_config",
+        type=Path,
+        default=Path("alembic.ini"),
+        help="alembic.ini of the migrations.",
+    )
+    args = parser.parse_args()
+
+    migrate_databases(args.alembic_config)
@@ -5,11 +5,16 @@ We should add all ingredients
 
 import argparse
 import logging
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 
 from weird_salads.inventory.repository.models import (
@@ -17,9 +22,13 @@ from weird_salads.inventory.repository.models import (
     MenuModel,
     RecipeIngredientModel,
     StockModel,
+    UnitOfMeasure,
 )
+from weird_salads.utils.engine import dispose_engines
+from weird_salads.utils.sharding import location_database_url
 from weird_salads.utils.unit_of_work import UnitOfWork
 from weird_salads.utils.utils import generate_str_uuid
+from weird_salads.utils.wal_checkpoint import wal_checkpointer
 
 # from typing import List, Dict, Any
 
@@ -116,24 +125,26 @@ def insert_menu_and_related_data(
         # Insert menu_id-associated ingredients
         for _, recipe_row in recipe_rows.iterrows():
             ingredient_id = int(recipe_row["ingredient_id"])
+            # recipe quantities are in the ingredient's unit, so this is needed
+            # for the recipe line even if the ingredient already exists
+            ingredient_data = ingredients_df[
+                ingredients_df["ingredient_id"] == ingredient_id
+            ]
+
+            if len(ingredient_data) != 1:
+                logger.warning(
+                    f"Ingredient data not found or ambiguous for ID {ingredient_id}"
+                )
+                continue  # Skip this ingredient if data is not exactly one row
+
+            ingredient_unit = ingredient_data.iloc[0]["unit"]
+            ingredient_cost = ingredient_data.iloc[0]["cost"]
+
             existing_ingredient = (
                 session.query(IngredientsModel).filter_by(id=ingredient_id).first()
             )
             # try add if ingredient doesn't exist
             if not existing_ingredient:
-                ingredient_data = ingredients_df[
-                    ingredients_df["ingredient_id"] == ingredient_id
-                ]
-
-                if len(ingredient_data) != 1:
-                    logger.warning(
-                        f"Ingredient data not found or ambiguous for ID {ingredient_id}"
-                    )
-                    continue  # Skip this ingredient if data is not exactly one row
-
-                ingredient_unit = ingredient_data.iloc[0]["unit"]
-                ingredient_cost = ingredient_data.iloc[0]["cost"]
-
                 ingredient = IngredientsModel(
                     id=int(ingredient_id),
                     name=str(ingredient_data.iloc[0]["name"]),
@@ -183,10 +194,183 @@ def insert_menu_and_related_data(
                 session.rollback()  # Rollback on failure
 
 
-def main(location_id: int, quantity: int, base_path: Path) -> None:
+def _resolve_location_data(
+    menus_df: pd.DataFrame,
+    recipes_df: pd.DataFrame,
+    ingredients_df: pd.DataFrame,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Resolve the menu items, recipe lines and ingredients of `menus_df`.
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+        (menus, recipe lines, ingredients), deduplicated. Recipe lines carry
+        the unit of their ingredient, which the recipe quantity is expressed in.
+    """
+    names = recipes_df.drop_duplicates("recipe_id")[["recipe_id", "name"]]
+    menus = menus_df.drop_duplicates("recipe_id").merge(
+        names, on="recipe_id", how="left"
+    )
+    missing = menus["name"].isna()
+    if missing.any():
+        logger.warning(
+            f"No recipe found for menu items {menus.loc[missing, 'recipe_id'].tolist()}"
+        )
+        menus = menus[~missing]
+
+    # ingredients must be unambiguous (exactly one row per id)
+    ingredients = ingredients_df[
+        ~ingredients_df["ingredient_id"].duplicated(keep=False)
+    ]
+    lines = (
+        menus[["recipe_id"]]
+        .merge(recipes_df, on="recipe_id")
+        .drop_duplicates(["recipe_id", "ingredient_id"])
+        .merge(ingredients[["ingredient_id", "unit"]], on="ingredient_id", how="left")
+    )
+    missing = lines["unit"].isna()
+    if missing.any():
+        logger.warning(
+            "Ingredient data not found or ambiguous for IDs "
+            f"{sorted(lines.loc[missing, 'ingredient_id'].unique().tolist())}"
+        )
+        lines = lines[~missing]
+
+    ingredients = ingredients[ingredients["ingredient_id"].isin(lines["ingredient_id"])]
+    return menus, lines, ingredients
+
+
+def insert_menu_and_related_data_bulk(
+    session: Session,
+    menus_df: pd.DataFrame,
+    recipes_df: pd.DataFrame,
+    ingredients_df: pd.DataFrame,
+    quant_to_inject: int,
+) -> Dict[str, int]:
+    """
+    Bulk equivalent of `insert_menu_and_related_data`.
+
+    Parameters
+    ----------
+    session : Session
+        The SQLAlchemy session used to query the database.
+    menus_df : pd.DataFrame
+        DataFrame for menu items
+    recipes_df : pd.DataFrame
+        DataFrame for recipes
+    ingredients_df : pd.DataFrame
+        DataFrame for the ingredients table
+
+    Returns
+    -------
+    Dict[str, int]
+        The number of rows inserted into each table.
+
+    Notes
+    -----
+    The menus, recipes and ingredients are resolved with pandas merges and
+    deduplicated in memory; rows that already exist are found with one query
+    per table. Each table is then written with a single executemany. Nothing
+    is committed here, so the caller commits (or rolls back) the whole seed as
+    one transaction.
+    """
+    menus, lines, ingredients = _resolve_location_data(
+        menus_df, recipes_df, ingredients_df
+    )
+
+    def existing(*columns):
+        return {tuple(row) for row in session.execute(select(*columns))}
+
+    existing_menus = {menu_id for (menu_id,) in existing(MenuModel.id)}
+    existing_ingredients = {
+        ingredient_id for (ingredient_id,) in existing(IngredientsModel.id)
+    }
+    existing_lines = existing(
+        RecipeIngredientModel.recipe_id, RecipeIngredientModel.ingredient_id
+    )
+
+    now = datetime.now(timezone.utc)
+    menus = menus[~menus["recipe_id"].isin(existing_menus)]
+    new_ingredients = ingredients[
+        ~ingredients["ingredient_id"].isin(existing_ingredients)
+    ]
+    lines = lines[
+        [
+            (int(r), int(i)) not in existing_lines
+            for r, i in zip(lines["recipe_id"], lines["ingredient_id"])
+        ]
+    ]
+
+    rows = {
+        MenuModel: [
+            {
+                "id": int(menu.recipe_id),
+                "name": menu.name,
+                "description": "",
+                "price": float(menu.price),
+                "created_on": now,
+                "on_menu": True,
+            }
+            for menu in menus.itertuples()
+        ],
+        IngredientsModel: [
+            {
+                "id": int(ingredient.ingredient_id),
+                "name": str(ingredient.name),
+                "description": "",
+            }
+            for ingredient in new_ingredients.itertuples()
+        ],
+        # one lot of `quant_to_inject` per new ingredient
+        StockModel: [
+            {
+                "id": generate_str_uuid(),
+                "ingredient_id": int(ingredient.ingredient_id),
+                "unit": UnitOfMeasure(ingredient.unit),
+                "quantity": quant_to_inject,
+                "cost": float(ingredient.cost),
+                "delivery_date": now,
+                "created_on": now,
+            }
+            for ingredient in new_ingredients.itertuples()
+        ],
+        RecipeIngredientModel: [
+            {
+                "recipe_id": int(line.recipe_id),
+                "ingredient_id": int(line.ingredient_id),
+                "quantity": float(line.quantity),
+                "unit": UnitOfMeasure(line.unit),
+            }
+            for line in lines.itertuples()
+        ],
+    }
+
+    inserted = {}
+    for model, table_rows in rows.items():
+        start = time.perf_counter()
+        if table_rows:
+            session.execute(insert(model), table_rows)
+        _log_rate(model.__tablename__, len(table_rows), time.perf_counter() - start)
+        inserted[model.__tablename__] = len(table_rows)
+    return inserted
+
+
+def _log_rate(name: str, n_rows: int, seconds: float) -> None:
+    rate = n_rows / seconds if seconds > 0 else float("inf")
+    logger.info(f"{name}: {n_rows} rows in {seconds:.3f}s ({rate:,.0f} rows/s)")
+
+
+def main(
+    location_id: int,
+    quantity: int,
+    base_path: Path,
+    mode: str = "bulk",
+    database_url: Optional[str] = None,
+) -> None:
     logger.info("Starting data seeding process")
 
-    with UnitOfWork() as uow:
+    with UnitOfWork(database_url) as uow:
         try:
             if is_database_empty(uow.session):
                 # Load all data into DataFrames
@@ -206,9 +390,30 @@ def main(location_id: int, quantity: int, base_path: Path) -> None:
                 ].reset_index(drop=True)
 
                 # Insert menus, recipes, and ingredients
-                insert_menu_and_related_data(
-                    uow.session, filtered_menus_df, recipes_df, ingredients_df, quantity
-                )
+                start = time.perf_counter()
+                if mode == "bulk":
+                    inserted = insert_menu_and_related_data_bulk(
+                        uow.session,
+                        filtered_menus_df,
+                        recipes_df,
+                        ingredients_df,
+                        quantity,
+                    )
+                    uow.commit()  # a single transaction for the whole seed
+                    _log_rate(
+                        "total",
+                        sum(inserted.values()),
+                        time.perf_counter() - start,
+                    )
+                else:
+                    insert_menu_and_related_data(
+                        uow.session,
+                        filtered_menus_df,
+                        recipes_df,
+                        ingredients_df,
+                        quantity,
+                    )
+                    logger.info(f"Seeded in {time.perf_counter() - start:.3f}s")
 
                 logger.info(
                     f"Seeding completed successfully for location {location_id} and quantity {quantity}."  # noqa: E501
@@ -217,15 +422,112 @@ def main(location_id: int, quantity: int, base_path: Path) -> None:
                 logger.info("Database already contains data. Skipping seeding.")
         except Exception as e:
             logger.error(f"An error occurred during seeding: {e}")
+            raise
+
+
+def read_location_ids(base_path: Path) -> List[int]:
+    """
+    Every location_id in locations.csv
+    """
+    return pd.read_csv(base_path / "locations.csv")["location_id"].tolist()
+
+
+def migrate(database_url: str, alembic_config: Path) -> None:
+    """
+    Bring `database_url` up to the latest Alembic revision
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(alembic_config))
+    config.cmd_opts = argparse.Namespace(x=[f"database_url={database_url}"])
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+
+def close_databases() -> None:
+    """
+    Checkpoint every database seeded here with TRUNCATE, so the seeded rows
+    are in the database file rather than left in its -wal, then dispose of
+    the engines
+    """
+    wal_checkpointer.checkpoint("TRUNCATE")
+    dispose_engines()
+
+
+def seed_location(
+    location_id: int,
+    quantity: int,
+    base_path: Path,
+    mode: str,
+    alembic_config: Path,
+) -> str:
+    """
+    Create (or migrate) the database of `location_id` and seed it.
+
+    Runs in a worker process of `seed_locations`.
+    """
+    database_url = location_database_url(location_id, sharded=True)
+    migrate(database_url, alembic_config)
+    try:
+        main(location_id, quantity, base_path, mode=mode, database_url=database_url)
+    finally:
+        close_databases()
+    return database_url
+
+
+def seed_locations(
+    location_ids: List[int],
+    quantity: int,
+    base_path: Path,
+    mode: str = "bulk",
+    workers: Optional[int] = None,
+    alembic_config: Path = Path("alembic.ini"),
+) -> List[int]:
+    """
+    Seed one database per location (see `utils.sharding.location_database_url`),
+    in parallel worker processes.
+
+    Each worker migrates its location's database, builds the location's rows
+    and loads them; the databases are independent, so nothing is shared.
+    Returns the locations that failed.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(location_ids))
+    logger.info(f"Seeding {len(location_ids)} locations with {workers} workers")
+    start = time.perf_counter()
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                seed_location, location_id, quantity, base_path, mode, alembic_config
+            ): location_id
+            for location_id in location_ids
+        }
+        for future in as_completed(futures):
+            location_id = futures[future]
+            try:
+                logger.info(f"Location {location_id} seeded: {future.result()}")
+            except Exception as e:
+                logger.error(f"Seeding location {location_id} failed: {e}")
+                failed.append(location_id)
+    logger.info(
+        f"Seeded {len(location_ids) - len(failed)} locations "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    if failed:
+        logger.error(f"Seeding failed for locations {sorted(failed)}")
+    return sorted(failed)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Data Seeding Script")
     parser.add_argument(
         "--location_id",
-        type=int,
+        nargs="+",
         required=True,
-        help="The ID of the location to seed data for.",
+        help="The ID(s) of the location(s) to seed data for, or `all`. "
+        "Several locations (or one, with LOCATION_IDS set) are seeded into "
+        "one database each (LOCATION_DATABASE_URL), in parallel.",
     )
     parser.add_argument(
         "--quantity",
@@ -240,6 +542,58 @@ if __name__ == "__main__":
         help="The base path for data files.",
     )
 
+    parser.add_argument(
+        "--mode",
+        choices=["bulk", "row"],
+        default="bulk",
+        help="bulk: one executemany per table in a single transaction; "
+        "row: insert and commit row by row.",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for several locations (default: CPU count).",
+    )
+    parser.add_argument(
+        "--alembic_config",
+        type=Path,
+        default=Path("alembic.ini"),
+        help="alembic.ini used to create (or migrate) the databases seeded.",
+    )
+
     args = parser.parse_args()
 
-    main(location_id=args.location_id, quantity=args.quantity, base_path=args.base_path)
+    if args.location_id == ["all"]:
+        location_ids = read_location_ids(args.base_path)
+    else:
+        location_ids = [int(location_id) for location_id in args.location_id]
+
+    if len(location_ids) == 1:
+        # the database the API reads this location from
+        database_url = location_database_url(location_ids[0])
+        migrate(database_url, args.alembic_config)
+        try:
+            main(
+                location_id=location_ids[0],
+                quantity=args.quantity,
+                base_path=args.base_path,
+                mode=args.mode,
+                database_url=database_url,
+            )
+        except Exception:
+            sys.exit(1)  # main logged it
+        finally:
+            close_databases()
+    else:
+        failed = seed_locations(
+            location_ids,
+            quantity=args.quantity,
+            base_path=args.base_path,
+            mode=args.mode,
+            workers=args.workers,
+            alembic_config=args.alembic_config,
+        )
+        if failed:
+            sys.exit(1)
@@ -0,0 +1,306 @@
+"""
+Process-wide SQLAlchemy engines, keyed by database URL
+"""
+
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import sessionmaker
+
+__all__ = [
+    "DEFAULT_DATABASE_URL",
+    "get_database_url",
+    "get_location_database_url",
+    "get_async_database_url",
+    "database_key",
+    "SQLITE_PROFILES",
+    "sqlite_pragmas",
+    "get_engine",
+    "get_session_maker",
+    "get_async_engine",
+    "get_async_session_maker",
+    "pool_statistics",
+    "sqlite_databases",
+    "dispose_engines",
+]
+
+DEFAULT_DATABASE_URL = "sqlite:///data/orders.db"
+DEFAULT_LOCATION_DATABASE_URL = "sqlite:///data/orders_{location_id}.db"
+
+# a PRAGMA value is interpolated into the statement: a word or a number only
+_PRAGMA_VALUE = re.compile(r"-?[\w.]+")
+
+# PRAGMAs run on each new SQLite connection, by SQLITE_PROFILE (see
+# `sqlite_pragmas`). "wal" lets readers carry on while an order is written
+# and makes writers wait for the lock rather than fail; "rollback" is
+# SQLite's own rollback journal and synchronous=FULL, for comparison.
+SQLITE_PROFILES: Dict[str, Dict[str, str]] = {
+    "wal": {
+        "busy_timeout": "5000",  # ms; first, so switching to WAL waits too
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",  # durable at checkpoints, and never corrupt
+        "cache_size": "-16000",  # KiB per connection
+        "mmap_size": "268435456",
+        "temp_store": "MEMORY",
+    },
+    "rollback": {"journal_mode": "DELETE", "synchronous": "FULL"},
+}
+
+_engines: Dict[str, Engine] = {}
+_session_makers: Dict[str, sessionmaker] = {}
+_async_engines: Dict[str, Any] = {}
+_async_session_makers: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def get_database_url() -> str:
+    """
+    The database URL, from `DATABASE_URL` (as set in docker-compose.yml).
+    """
+    return os.environ.get("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+
+def get_location_database_url(location_id: int) -> str:
+    """
+    The database URL of a single location: its entry in `LOCATION_DATABASE_URLS`
+    (a JSON object, e.g. {"1": "postgresql://db1/orders"}) if it has one,
+    otherwise from the `LOCATION_DATABASE_URL` template (e.g.
+    sqlite:///data/orders_{location_id}.db)
+    """
+    urls = json.loads(os.environ.get("LOCATION_DATABASE_URLS") or "{}")
+    if str(int(location_id)) in urls:
+        return urls[str(int(location_id))]
+    template = os.environ.get("LOCATION_DATABASE_URL", DEFAULT_LOCATION_DATABASE_URL)
+    return template.format(location_id=int(location_id))
+
+
+def get_async_database_url(url: Optional[str] = None) -> str:
+    """
+    The async equivalent of `url` (default: DATABASE_URL), e.g.
+    sqlite:///data/orders.db -> sqlite+aiosqlite:///data/orders.db.
+
+    `ASYNC_DATABASE_URL` takes precedence when `url` isn't given.
+    """
+    if url is None and os.environ.get("ASYNC_DATABASE_URL"):
+        return os.environ["ASYNC_DATABASE_URL"]
+    parsed = make_url(url or get_database_url())
+    if parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+@lru_cache(maxsize=256)
+def database_key(url) -> str:
+    """
+    `url` without its driver (sqlite+aiosqlite:///x.db -> sqlite:///x.db),
+    naming a database the same way for sync and async engines
+    """
+    url = make_url(url)
+    return url.set(drivername=url.get_backend_name()).render_as_string()
+
+
+def sqlite_pragmas() -> Dict[str, str]:
+    """
+    The PRAGMAs for new SQLite connections: the `SQLITE_PROFILE` profile
+    (default "wal"; "none" for none), updated by `SQLITE_PRAGMAS` (e.g.
+    "busy_timeout=10000,wal_autocheckpoint=4000")
+    """
+    profile = os.environ.get("SQLITE_PROFILE", "wal")
+    if profile not in SQLITE_PROFILES and profile != "none":
+        raise ValueError(f"Unknown SQLITE_PROFILE {profile!r}")
+    pragmas = dict(SQLITE_PROFILES.get(profile, {}))
+    for pragma in os.environ.get("SQLITE_PRAGMAS", "").split(","):
+        if pragma.strip():
+            name, _, value = (part.strip() for part in pragma.partition("="))
+            if not name.isidentifier() or not _PRAGMA_VALUE.fullmatch(value):
+                raise ValueError(f"Invalid SQLITE_PRAGMAS entry {pragma!r}")
+            pragmas[name] = value
+    return pragmas
+
+
+def _set_sqlite_pragmas(engine: Engine) -> None:
+    """
+    Run `sqlite_pragmas()` on every connection `engine` opens (a sync
+    engine, or an async engine's `sync_engine`)
+    """
+    if engine.url.get_backend_name() != "sqlite":
+        return
+    pragmas = sqlite_pragmas()
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def _pool_options(url: str) -> Dict[str, Any]:
+    """
+    Pool options from the environment.
+
+    In-memory SQLite uses a single-connection pool, which doesn't accept
+    size/overflow arguments, so only `pool_recycle` is passed there.
+    """
+    options: Dict[str, Any] = {
+        "pool_recycle": int(os.environ.get("DATABASE_POOL_RECYCLE", 3600)),
+        "pool_pre_ping": os.environ.get("DATABASE_POOL_PRE_PING", "0") == "1",
+    }
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (
+        None,
+        "",
+        ":memory:",
+    ):
+        return options
+
+    options["pool_size"] = int(os.environ.get("DATABASE_POOL_SIZE", 5))
+    options["max_overflow"] = int(os.environ.get("DATABASE_MAX_OVERFLOW", 10))
+    options["pool_timeout"] = float(os.environ.get("DATABASE_POOL_TIMEOUT", 30))
+    return options
+
+
+def get_engine(url: Optional[str] = None) -> Engine:
+    """
+    Return the shared engine for `url`, creating it on first use.
+    """
+    url = url or get_database_url()
+    engine = _engines.get(url)
+    if engine is not None:
+        return engine
+
+    with _lock:
+        # another thread may have won the race
+        engine = _engines.get(url)
+        if engine is None:
+            engine = create_engine(url, **_pool_options(url))
+            _set_sqlite_pragmas(engine)
+            _engines[url] = engine
+    return engine
+
+
+def get_session_maker(url: Optional[str] = None) -> sessionmaker:
+    """
+    Return the shared `sessionmaker` bound to the engine for `url`.
+    """
+    url = url or get_database_url()
+    session_maker = _session_makers.get(url)
+    if session_maker is not None:
+        return session_maker
+
+    engine = get_engine(url)
+    with _lock:
+        session_maker = _session_makers.get(url)
+        if session_maker is None:
+            session_maker = sessionmaker(bind=engine)
+            _session_makers[url] = session_maker
+    return session_maker
+
+
+def get_async_engine(url: Optional[str] = None):
+    """
+    Return the shared `AsyncEngine` for `url` (see `get_async_database_url`).
+
+    Requires the `async` extra (sqlalchemy[asyncio] and aiosqlite).
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = get_async_database_url(url)
+    engine = _async_engines.get(url)
+    if engine is not None:
+        return engine
+
+    with _lock:
+        engine = _async_engines.get(url)
+        if engine is None:
+            engine = create_async_engine(url, **_pool_options(url))
+            _set_sqlite_pragmas(engine.sync_engine)
+            _async_engines[url] = engine
+    return engine
+
+
+def get_async_session_maker(url: Optional[str] = None):
+    """
+    Return the shared `async_sessionmaker` for `url`.
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    url = get_async_database_url(url)
+    session_maker = _async_session_makers.get(url)
+    if session_maker is not None:
+        return session_maker
+
+    engine = get_async_engine(url)
+    with _lock:
+        session_maker = _async_session_makers.get(url)
+        if session_maker is None:
+            # async sessions cannot lazily refresh attributes expired on commit
+            session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+            _async_session_makers[url] = session_maker
+    return session_maker
+
+
+def pool_statistics() -> Dict[str, Dict[str, Any]]:
+    """
+    Connection pool statistics for every engine created so far.
+    """
+    stats = {}
+    engines = list(_engines.values()) + [
+        engine.sync_engine for engine in _async_engines.values()
+    ]
+    for engine in engines:
+        pool = engine.pool
+        entry: Dict[str, Any] = {
+            "pool": type(pool).__name__,
+            "status": pool.status(),
+        }
+        # QueuePool-specific counters
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, name, None)
+            if callable(method):
+                entry[name] = method()
+        stats[engine.url.render_as_string(hide_password=True)] = entry
+    return stats
+
+
+def sqlite_databases() -> List[str]:
+    """
+    Every SQLite database file (by `database_key`) with an engine so far
+    """
+    urls = list(_engines) + list(_async_engines)
+    databases = []
+    for url in urls:
+        parsed = make_url(url)
+        if parsed.get_backend_name() == "sqlite" and parsed.database not in (
+            None,
+            "",
+            ":memory:",
+        ):
+            databases.append(database_key(url))
+    return list(dict.fromkeys(databases))
+
+
+def dispose_engines() -> None:
+    """
+    Dispose of all engines (e.g. on shutdown, or after forking a worker).
+    """
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        for engine in _async_engines.values():
+            # releases the connections without awaiting the async driver
+            engine.sync_engine.dispose(close=False)
+        _engines.clear()
+        _session_makers.clear()
+        _async_engines.clear()
+        _async_session_makers.clear()
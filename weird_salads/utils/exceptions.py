@@ -0,0 +1,13 @@
+"""
+Exceptions shared across services
+"""
+
+__all__ = ["ConcurrencyError"]
+
+
+class ConcurrencyError(Exception):
+    """
+    Another transaction changed the rows this one read (e.g. a compare-and-swap
+    UPDATE matched fewer rows than expected); retrying the unit of work from
+    the start is safe.
+    """
@@ -0,0 +1,68 @@
+"""
+Opaque cursors for keyset pagination
+"""
+
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+__all__ = [
+    "DEFAULT_PAGE_SIZE",
+    "MAX_PAGE_SIZE",
+    "InvalidCursorError",
+    "encode_cursor",
+    "decode_cursor",
+    "split_page",
+    "to_naive_utc",
+]
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(sort_value: datetime, id: str) -> str:
+    """
+    Cursor pointing just after the row with (`sort_value`, `id`)
+    """
+    payload = json.dumps([sort_value.isoformat(), str(id)])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    (sort_value, id) from a cursor made by `encode_cursor`
+    """
+    try:
+        sort_value, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(sort_value), str(id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+
+def split_page(
+    items: List[T], limit: Optional[int], key: Callable[[T], Tuple[datetime, str]]
+) -> Tuple[List[T], Optional[str]]:
+    """
+    Split the `limit + 1` rows fetched for a page into the page itself and the
+    cursor of the next one (None on the last page)
+    """
+    if limit is None or len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(*key(items[-1]))
+
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Timestamps are stored as naive UTC (SQLite keeps no timezone)
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
@@ -0,0 +1,135 @@
+"""
+Per-request SQL statement accounting, and an N+1 detector
+
+`instrument_engine` (called by UnitOfWork for its engine) adds cursor event
+hooks that, inside `track_queries()`, count every statement and its time
+and tally how often each statement shape (the SQL text, with its bound
+parameters left as placeholders) runs. When the block ends, any shape
+run more than QUERY_REPEAT_WARNING times is logged as a likely N+1.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+
+__all__ = [
+    "QUERY_REPEAT_WARNING",
+    "QueryStats",
+    "current_query_stats",
+    "track_queries",
+    "instrument_engine",
+]
+
+logger = logging.getLogger(__name__)
+
+# a statement shape run more than this many times in one block is logged
+QUERY_REPEAT_WARNING = int(os.environ.get("QUERY_REPEAT_WARNING", 10))
+
+_current: contextvars.ContextVar[Optional["QueryStats"]] = contextvars.ContextVar(
+    "query_stats", default=None
+)
+
+
+class QueryStats:
+    """
+    Statements run (and seconds spent running them) within `track_queries`
+    """
+
+    __slots__ = ("queries", "seconds", "shapes")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.seconds += seconds
+        self.shapes[statement] += 1
+
+    def repeated(self, threshold: int = QUERY_REPEAT_WARNING) -> Dict[str, int]:
+        """
+        {statement: times run} for every shape run more than `threshold` times
+        """
+        return {
+            statement: count
+            for statement, count in self.shapes.items()
+            if count > threshold
+        }
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track_queries(label: str = "") -> Iterator[QueryStats]:
+    """
+    Count the statements run in this block (and any threads it hands work
+    to with its context, like FastAPI's threadpool).
+
+    Nested blocks share the outermost block's QueryStats, which is the one
+    that logs repeated statements (as "`label` ran ... N times").
+    """
+    stats = _current.get()
+    if stats is not None:
+        yield stats
+        return
+
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        for statement, count in stats.repeated().items():
+            statement = " ".join(statement.split())
+            logger.warning(f"Possible N+1: {label} ran {count} times: {statement}")
+
+
+# - hooks
+_instrumented: "weakref.WeakSet" = weakref.WeakSet()
+_instrumented_lock = threading.Lock()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    stats = _current.get()
+    if stats is not None and conn.info.get("query_start"):
+        stats.record(statement, time.perf_counter() - conn.info["query_start"].pop())
+
+
+def _handle_error(context):
+    # the statement failed, so its after_cursor_execute never runs
+    connection = context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+def instrument_engine(engine) -> None:
+    """
+    Hook statement accounting into `engine` (an Engine, or the sync engine
+    behind an AsyncEngine). Idempotent.
+    """
+    engine = getattr(engine, "sync_engine", engine)
+    if engine in _instrumented:
+        return
+    with _instrumented_lock:
+        if engine in _instrumented:
+            return
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+        _instrumented.add(engine)
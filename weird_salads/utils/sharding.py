@@ -0,0 +1,129 @@
+"""
+Per-location databases ("shards")
+
+With LOCATION_IDS set (e.g. "1,2,3"), this process serves those locations,
+each from its own database (see `utils.engine.get_location_database_url`:
+an entry of LOCATION_DATABASE_URLS, or the LOCATION_DATABASE_URL template,
+one SQLite file per location as seeded by seed_db.py). Sites then no
+longer queue behind one another's writes on a single database, and can be
+split across processes or hosts by giving each its own LOCATION_IDS.
+
+The location of the current request is a context variable (set by the
+API's LocationMiddleware, or `use_location` elsewhere); UnitOfWork and
+AsyncUnitOfWork open their sessions on its database, so repositories and
+services are unchanged. Without LOCATION_IDS everything uses DATABASE_URL.
+"""
+
+import contextvars
+import json
+import os
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple
+
+from weird_salads.utils.engine import get_database_url, get_location_database_url
+
+__all__ = [
+    "LOCATION_HEADER",
+    "SHARDED",
+    "UnknownLocationError",
+    "served_locations",
+    "resolve_location",
+    "current_location",
+    "use_location",
+    "location_database_url",
+    "shard_database_url",
+]
+
+# requests name their location in this header (or a `location_id` parameter)
+LOCATION_HEADER = "X-Location-Id"
+
+
+def served_locations() -> Tuple[int, ...]:
+    """
+    The locations this process serves: LOCATION_IDS, or else the locations
+    in LOCATION_DATABASE_URLS (none: not sharded)
+    """
+    location_ids = os.environ.get("LOCATION_IDS", "")
+    if location_ids.strip():
+        return tuple(int(i) for i in location_ids.replace(",", " ").split())
+    urls = json.loads(os.environ.get("LOCATION_DATABASE_URLS") or "{}")
+    return tuple(sorted(int(i) for i in urls))
+
+
+_SERVED = frozenset(served_locations())
+SHARDED = bool(_SERVED)
+
+_location: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "location", default=None
+)
+
+
+class UnknownLocationError(Exception):
+    """
+    The location is missing (with several served) or not served here
+    """
+
+
+def resolve_location(value: Optional[str]) -> int:
+    """
+    The served location named by `value` (a header or query value), or the
+    only served location when `value` is empty
+    """
+    if not value:
+        if len(_SERVED) == 1:
+            return next(iter(_SERVED))
+        raise UnknownLocationError(
+            f"{LOCATION_HEADER} is required (one of {sorted(_SERVED)})"
+        )
+    try:
+        location_id = int(value)
+    except ValueError:
+        raise UnknownLocationError(f"Invalid location id {value!r}")
+    if location_id not in _SERVED:
+        raise UnknownLocationError(f"Location {location_id} is not served here")
+    return location_id
+
+
+def current_location() -> Optional[int]:
+    return _location.get()
+
+
+@contextmanager
+def use_location(location_id: Optional[int]) -> Iterator[None]:
+    """
+    Route the units of work opened in this block to `location_id`'s database
+    """
+    token = _location.set(location_id)
+    try:
+        yield
+    finally:
+        _location.reset(token)
+
+
+@lru_cache(maxsize=None)
+def _location_database_url(location_id: int) -> str:
+    return get_location_database_url(location_id)
+
+
+def location_database_url(location_id: int, sharded: Optional[bool] = None) -> str:
+    """
+    The database holding `location_id`'s data: its own when `sharded`
+    (default: this deployment serves locations, SHARDED), otherwise
+    DATABASE_URL. Used by the API (see `shard_database_url`), seed_db.py
+    and migrate_db.py alike.
+    """
+    if SHARDED if sharded is None else sharded:
+        return _location_database_url(int(location_id))
+    return get_database_url()
+
+
+def shard_database_url() -> Optional[str]:
+    """
+    The database URL of the current location, or None (the default database)
+    outside of one
+    """
+    location_id = _location.get()
+    if location_id is None:
+        return None
+    return location_database_url(location_id, sharded=True)
@@ -1,13 +1,45 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+from sqlalchemy.exc import OperationalError
+
+from weird_salads.utils.engine import get_async_session_maker, get_session_maker
+from weird_salads.utils.exceptions import ConcurrencyError
+from weird_salads.utils.query_stats import instrument_engine
+from weird_salads.utils.sharding import shard_database_url
+
+__all__ = [
+    "UnitOfWork",
+    "AsyncUnitOfWork",
+    "ConcurrencyError",
+    "run_with_retry",
+    "retry_statistics",
+]
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# attempts (including the first) and base backoff for `run_with_retry`
+RETRY_ATTEMPTS = int(os.environ.get("DATABASE_RETRY_ATTEMPTS", 5))
+RETRY_BACKOFF = float(os.environ.get("DATABASE_RETRY_BACKOFF", 0.01))
+
+_retry_counts = {"conflicts": 0, "locked": 0, "retries": 0, "aborts": 0}
+_retry_lock = threading.Lock()
 
 
 class UnitOfWork:
-    def __init__(self):
-        self.session_maker = sessionmaker(
-            # !TODO create an environment variable
-            bind=create_engine("sqlite:///data/orders.db")
-        )
+    def __init__(self, database_url: Optional[str] = None):
+        # engines/sessionmakers are shared process-wide (see utils/engine.py),
+        # so this is a dictionary lookup rather than a new engine per request;
+        # by default, the current location's database (see utils/sharding.py)
+        self.session_maker = get_session_maker(database_url or shard_database_url())
+        # statement counts/time for `track_queries` (see utils/query_stats.py)
+        instrument_engine(self.session_maker.kw["bind"])
 
     def __enter__(self):
         self.session = self.session_maker()
@@ -67,3 +99,93 @@ class UnitOfWork:
 
     def rollback(self):
         self.session.rollback()
+
+
+class AsyncUnitOfWork:
+    """
+    `async with` counterpart of UnitOfWork, on an `AsyncSession`
+    (sqlalchemy.ext.asyncio with the aiosqlite driver for SQLite).
+
+    The transaction lifecycle is the same: roll back on an exception, always
+    close the session, and never swallow the exception.
+    """
+
+    def __init__(self, database_url: Optional[str] = None):
+        self.session_maker = get_async_session_maker(
+            database_url or shard_database_url()
+        )
+        instrument_engine(self.session_maker.kw["bind"])
+
+    async def __aenter__(self):
+        self.session = self.session_maker()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, traceback):
+        try:
+            if exc_type is not None:
+                await self.rollback()
+        finally:
+            await self.session.close()
+
+        if exc_type is not None:
+            raise exc_val
+
+    async def commit(self):
+        await self.session.commit()
+
+    async def rollback(self):
+        await self.session.rollback()
+
+
+def _is_retryable(error: Exception) -> Optional[str]:
+    if isinstance(error, ConcurrencyError):
+        return "conflicts"
+    if isinstance(error, OperationalError) and "database is locked" in str(error.orig):
+        return "locked"
+    return None
+
+
+def _count(name: str) -> None:
+    with _retry_lock:
+        _retry_counts[name] += 1
+
+
+def retry_statistics() -> Dict[str, int]:
+    """
+    Conflicts and lock errors seen by `run_with_retry`, how many were retried,
+    and how many gave up
+    """
+    with _retry_lock:
+        return dict(_retry_counts)
+
+
+def run_with_retry(
+    work: Callable[[UnitOfWork], T],
+    attempts: Optional[int] = None,
+    database_url: Optional[str] = None,
+) -> T:
+    """
+    Run `work(unit_of_work)` in a fresh UnitOfWork, retrying the whole unit of
+    work on a ConcurrencyError or "database is locked".
+
+    `work` commits itself. Between attempts it sleeps for a random ("full
+    jitter") backoff of up to RETRY_BACKOFF * 2**attempt seconds, so clashing
+    requests don't retry in lockstep. After `attempts` (default
+    DATABASE_RETRY_ATTEMPTS) the last error is raised.
+    """
+    attempts = attempts or RETRY_ATTEMPTS
+    for attempt in range(attempts):
+        try:
+            with UnitOfWork(database_url) as unit_of_work:
+                return work(unit_of_work)
+        except Exception as e:
+            reason = _is_retryable(e)
+            if reason is None:
+                raise
+            _count(reason)
+            if attempt + 1 == attempts:
+                _count("aborts")
+                logger.warning(f"Giving up after {attempts} attempts: {e}")
+                raise
+            _count("retries")
+            time.sleep(random.uniform(0, RETRY_BACKOFF * 2**attempt))
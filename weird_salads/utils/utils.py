@@ -1,8 +1,17 @@
 import uuid
+from datetime import datetime, timezone
 
-__all__ = ["generate_str_uuid"]
+__all__ = ["generate_str_uuid", "utc_now"]
 
 
 def generate_str_uuid():
     """str(uuid) for sqlite"""
     return str(uuid.uuid4())
+
+
+def utc_now() -> datetime:
+    """
+    The current time as naive UTC, the way timestamps are stored (and read
+    back) in SQLite
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
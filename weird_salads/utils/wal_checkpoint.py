@@ -0,0 +1,126 @@
+"""
+Periodic WAL checkpoints of the SQLite databases
+
+In WAL mode (the default SQLite profile, see `utils.engine.sqlite_pragmas`)
+commits are appended to a -wal file, which SQLite copies back into the
+database ("checkpoints") when it passes wal_autocheckpoint pages, on the
+commit that crosses the line and only as far as the oldest open read
+allows. Under steady traffic the WAL can keep growing, and every read
+searches it.
+
+`WalCheckpointer` runs `PRAGMA wal_checkpoint(WAL_CHECKPOINT_MODE)`
+(default PASSIVE, which never waits for readers or writers) on every SQLite
+database this process has opened, each WAL_CHECKPOINT_INTERVAL seconds
+(default 60; 0 disables it), from a background thread. On shutdown it
+checkpoints with TRUNCATE, leaving a self-contained database file.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from weird_salads.utils.engine import get_engine, sqlite_databases
+
+__all__ = ["WalCheckpointer", "wal_checkpointer"]
+
+logger = logging.getLogger(__name__)
+
+_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+
+class WalCheckpointer:
+    """
+    Checkpoints every SQLite database each `interval` seconds, once started
+    """
+
+    def __init__(self, interval: float = 60.0, mode: str = "PASSIVE"):
+        if mode.upper() not in _MODES:
+            raise ValueError(f"Unknown WAL checkpoint mode {mode!r}")
+        self.interval = interval
+        self.mode = mode.upper()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counts = {"checkpoints": 0, "busy": 0, "errors": 0}
+        self._last: Dict[str, Dict[str, Any]] = {}
+
+    def checkpoint(self, mode: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Checkpoint every SQLite database now, returning {database: result}
+        (`busy`: the checkpoint couldn't finish; frames in the WAL, and
+        copied into the database, both -1 outside WAL mode)
+        """
+        mode = (mode or self.mode).upper()
+        if mode not in _MODES:
+            raise ValueError(f"Unknown WAL checkpoint mode {mode!r}")
+        results = {}
+        for database in sqlite_databases():
+            try:
+                with get_engine(database).connect() as connection:
+                    busy, wal_frames, checkpointed = connection.exec_driver_sql(
+                        f"PRAGMA wal_checkpoint({mode})"
+                    ).one()
+            except SQLAlchemyError as e:
+                logger.warning(f"WAL checkpoint of {database} failed: {e}")
+                self._count("errors")
+                continue
+            self._count("busy" if busy else "checkpoints")
+            results[database] = {
+                "mode": mode,
+                "busy": bool(busy),
+                "wal_frames": wal_frames,
+                "checkpointed_frames": checkpointed,
+                "at": time.time(),
+            }
+        with self._lock:
+            self._last.update(results)
+        return results
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    # - background thread
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="wal-checkpoint", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, final_mode: Optional[str] = "TRUNCATE") -> None:
+        """
+        Stop the thread, then checkpoint once more with `final_mode`
+        (None: don't)
+        """
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            thread.join()
+        if final_mode is not None:
+            self.checkpoint(final_mode)
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            self.checkpoint()
+
+    def statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counts,
+                "interval": self.interval,
+                "running": self._thread is not None,
+                "last": {database: dict(r) for database, r in self._last.items()},
+            }
+
+
+wal_checkpointer = WalCheckpointer(
+    interval=float(os.environ.get("WAL_CHECKPOINT_INTERVAL", 60)),
+    mode=os.environ.get("WAL_CHECKPOINT_MODE", "PASSIVE"),
+)